@@ -0,0 +1,154 @@
+import numpy as np
+
+from arrivals import as_rate_table
+
+# How long a 911 call rings before it is answered, as a mixture of two parts:
+# - most calls are picked up by a free call taker after an Erlang (gamma with shape 2) wait, about 5 seconds on average
+# - the rest arrive when every call taker is busy and wait an exponential time for one to free up
+# The share of slow calls grows with the square of the load, relative to an average hour, up to MAX_SLOW_SHARE.
+FAST_SCALE = 2.5
+SLOW_MEAN = 25.0
+SLOW_SHARE = 0.04
+MAX_SLOW_SHARE = 0.5
+
+
+def load_table(rate_table=None):
+    """
+    This function turns a rate table into the load of each hour of the week relative to an average hour.
+
+    Args:
+        rate_table (array-like, optional): A 7 x 24 table of relative rates, or 24 hourly rates. Defaults to
+            arrivals.DEFAULT_RATE_TABLE.
+
+    Returns:
+        numpy.ndarray: The 7 x 24 relative load, with a mean of 1.
+    """
+    table = as_rate_table(rate_table)
+    return table / table.mean()
+
+
+def slow_share(load):
+    """
+    This function gives the share of calls that wait for a busy call taker at a given relative load.
+    """
+    return np.minimum(SLOW_SHARE * np.square(load), MAX_SLOW_SHARE)
+
+
+def draw_answer_times(load, rng):
+    """
+    This function draws the answer time of every call, in whole seconds.
+
+    Args:
+        load (numpy.ndarray): The relative load when each call arrives.
+        rng (numpy.random.Generator): The random stream.
+
+    Returns:
+        numpy.ndarray: int64 answer times.
+    """
+    num_calls = len(load)
+    answer_time = rng.gamma(2.0, FAST_SCALE, size=num_calls)
+    # Picking the slow calls with one uniform draw mixes the two parts without concatenating and shuffling
+    slow = rng.random(num_calls) < slow_share(load)
+    answer_time[slow] = rng.exponential(SLOW_MEAN, size=int(slow.sum()))
+    return answer_time.astype(np.int64)
+
+
+def component_cdfs(threshold):
+    """
+    This function gives the chance that a fast call and that a slow call are answered within threshold seconds. Answer
+    times are whole seconds rounded down, so that is the chance the underlying wait is under threshold + 1 seconds.
+    Both parts of the mixture have closed-form CDFs, and neither depends on the load.
+
+    Args:
+        threshold (float): The threshold in seconds.
+
+    Returns:
+        tuple: (fast, slow) chances.
+    """
+    x = threshold + 1.0
+    return 1 - np.exp(-x / FAST_SCALE) * (1 + x / FAST_SCALE), 1 - np.exp(-x / SLOW_MEAN)
+
+
+def answer_cdf(threshold, load):
+    """
+    This function gives the chance that a call is answered within threshold seconds at a given relative load.
+
+    Args:
+        threshold (float): The threshold in seconds.
+        load (numpy.ndarray): The relative load.
+
+    Returns:
+        numpy.ndarray: The chance for each load.
+    """
+    fast, slow = component_cdfs(threshold)
+    return fast + slow_share(load) * (slow - fast)
+
+
+def normalize_thresholds(thresholds):
+    """
+    This function checks a list of answer-time thresholds and sorts it. Negative thresholds would index the histograms
+    from the end, and repeated ones would give repeated pct columns, so both are rejected.
+
+    Args:
+        thresholds (iterable): Thresholds in whole seconds.
+
+    Returns:
+        list: The thresholds as ints, in increasing order.
+    """
+    values = []
+    for threshold in thresholds:
+        if threshold < 0 or threshold != int(threshold):
+            raise ValueError(f"Answer-time thresholds must be whole seconds of 0 or more, not {threshold}")
+        values.append(int(threshold))
+    repeated = sorted({value for value in values if values.count(value) > 1})
+    if repeated:
+        raise ValueError(f"Answer-time thresholds are repeated: {', '.join(map(str, repeated))}")
+    return sorted(values)
+
+
+def threshold_counts(answer_time, groups, num_groups, thresholds):
+    """
+    This function counts the calls of each group answered within each threshold, in one pass. Answer times are
+    binned into a histogram per group, capped just past the largest threshold, and a cumulative sum along each
+    histogram then gives the count within every threshold at once, so adding thresholds costs almost nothing.
+
+    Args:
+        answer_time (numpy.ndarray): int64 answer times in seconds.
+        groups (numpy.ndarray): The group of each call, from 0 to num_groups - 1.
+        num_groups (int): The number of groups.
+        thresholds (list): Thresholds in whole seconds, checked with normalize_thresholds.
+
+    Returns:
+        numpy.ndarray: A num_groups x len(thresholds) int64 array of counts, with the thresholds in increasing order.
+    """
+    thresholds = np.asarray(normalize_thresholds(thresholds), dtype=np.int64)
+    width = int(thresholds.max()) + 2 if len(thresholds) else 1
+    bins = np.clip(answer_time, 0, width - 1)
+    histogram = np.bincount(groups * width + bins, minlength=num_groups * width).reshape(num_groups, width)
+    return np.cumsum(histogram, axis=1)[:, thresholds]
+
+
+def draw_threshold_counts(calls, cdfs, rng):
+    """
+    This function draws how many of each interval's calls were answered within each threshold, without drawing the
+    calls one by one. The thresholds are taken in increasing order, and the calls that missed one threshold are
+    shared out to the next with a binomial draw, so the counts never decrease from one threshold to the next.
+
+    Args:
+        calls (numpy.ndarray): The number of calls in each interval.
+        cdfs (list): For each threshold in increasing order, the chance a call in each interval is answered within it.
+        rng (numpy.random.Generator): The random stream.
+
+    Returns:
+        list: An int64 array of counts per threshold.
+    """
+    counts = []
+    within = np.zeros(len(calls), dtype=np.int64)
+    answered = np.zeros(len(calls))
+    for cdf in cdfs:
+        # The chance that a call not yet answered is answered by this threshold
+        step = np.clip((cdf - answered) / np.maximum(1 - answered, 1e-12), 0.0, 1.0)
+        within = within + rng.binomial(calls - within, step)
+        answered = np.maximum(cdf, answered)
+        counts.append(within)
+    return counts
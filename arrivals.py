@@ -0,0 +1,171 @@
+import numpy as np
+
+# Relative call volume for each hour of the day, from midnight. Volume bottoms out before dawn, climbs through the
+# morning and peaks in the late afternoon and early evening.
+DEFAULT_HOURLY_PROFILE = np.array(
+    [
+        0.62, 0.52, 0.44, 0.37, 0.33, 0.34, 0.45, 0.64,
+        0.82, 0.93, 1.00, 1.06, 1.10, 1.12, 1.16, 1.22,
+        1.28, 1.30, 1.26, 1.18, 1.08, 0.97, 0.85, 0.73,
+    ]
+)
+
+# Relative call volume for each day of the week, from Monday. Fridays and Saturdays are the busiest.
+DEFAULT_DAILY_PROFILE = np.array([0.98, 0.96, 0.97, 0.99, 1.06, 1.10, 0.94])
+
+# The number of days 1970-01-01 is after a Monday, used to find the day of the week of epoch days and seconds
+EPOCH_WEEKDAY = 3
+
+
+def as_rate_table(rate_table):
+    """
+    This function checks a rate table and returns it as a 7 x 24 float array. A single 24-hour profile is used for
+    every day.
+
+    Args:
+        rate_table (array-like): 24 hourly rates or a 7 x 24 table, or None for DEFAULT_RATE_TABLE.
+
+    Returns:
+        numpy.ndarray: The 7 x 24 rate table.
+    """
+    if rate_table is None:
+        return DEFAULT_RATE_TABLE
+    table = np.asarray(rate_table, dtype=float)
+    if table.shape == (24,):
+        table = np.broadcast_to(table, (7, 24))
+    if table.shape != (7, 24):
+        raise ValueError(f"The rate table must have 24 hourly rates or 7 x 24 rates, not shape {table.shape}")
+    if not np.all(np.isfinite(table)) or np.any(table < 0):
+        raise ValueError("The rates must be finite and non-negative")
+    if not np.any(table > 0):
+        raise ValueError("At least one rate must be positive")
+    return table
+
+
+def build_rate_table(hourly=None, daily=None):
+    """
+    This function builds a 7 x 24 table of relative arrival rates, one row per day of the week from Monday and one column
+    per hour of the day, as the outer product of a daily and an hourly profile.
+
+    Args:
+        hourly (array-like, optional): 24 relative hourly rates. Defaults to DEFAULT_HOURLY_PROFILE.
+        daily (array-like, optional): 7 relative daily rates. Defaults to DEFAULT_DAILY_PROFILE.
+
+    Returns:
+        numpy.ndarray: The 7 x 24 rate table.
+    """
+    hourly = DEFAULT_HOURLY_PROFILE if hourly is None else hourly
+    daily = DEFAULT_DAILY_PROFILE if daily is None else daily
+    return as_rate_table(np.outer(np.asarray(daily, dtype=float), np.asarray(hourly, dtype=float)))
+
+
+# The rate table used when none is given
+DEFAULT_RATE_TABLE = build_rate_table()
+
+# A flat rate table, which gives the same uniform spread of calls as the old randint draw
+UNIFORM_RATE_TABLE = np.ones((7, 24))
+
+
+def hour_buckets(start_seconds, end_seconds, rate_table=None):
+    """
+    This function splits a time range into clock-hour buckets and gives each bucket its expected share of the calls.
+    The first and last buckets are cut at the ends of the range and their weight shrinks with them.
+
+    Args:
+        start_seconds (int): The start of the range in epoch seconds.
+        end_seconds (int): The end of the range in epoch seconds, exclusive.
+        rate_table (array-like, optional): A 7 x 24 table of relative rates, or 24 hourly rates. Defaults to DEFAULT_RATE_TABLE.
+
+    Returns:
+        tuple: (edges, weights), where bucket i covers [edges[i], edges[i + 1]) and has relative weight weights[i].
+    """
+    if end_seconds <= start_seconds:
+        raise ValueError("The end of the date range must be after the start")
+    table = as_rate_table(rate_table)
+
+    first_hour = -(-start_seconds // 3600) * 3600
+    edges = np.unique(np.r_[start_seconds, np.arange(first_hour, end_seconds, 3600, dtype=np.int64), end_seconds])
+    lower = edges[:-1]
+    hours = lower // 3600
+    weights = table[(hours // 24 + EPOCH_WEEKDAY) % 7, hours % 24] * np.diff(edges)
+    if not np.any(weights > 0):
+        raise ValueError("The rate table gives no calls anywhere in the date range")
+    return edges, weights
+
+
+def bucket_counts(weights, num_records, rng):
+    """
+    This function shares num_records calls out between the buckets. Given the total, the per-bucket counts of a
+    non-homogeneous Poisson process are multinomial in the bucket weights, so one multinomial draw gives exactly the
+    Poisson process conditioned on num_records calls.
+
+    Args:
+        weights (numpy.ndarray): The relative weight of each bucket.
+        num_records (int): The total number of calls.
+        rng (numpy.random.Generator): The random stream.
+
+    Returns:
+        numpy.ndarray: int64 calls per bucket.
+    """
+    return rng.multinomial(num_records, weights / weights.sum()).astype(np.int64)
+
+
+def arrival_times(edges, counts, rng):
+    """
+    This function places counts[i] calls uniformly inside each bucket and returns them already in time order, in O(N)
+    with no sort.
+
+    The sorted positions of k uniform draws have the same distribution as the running totals of k + 1 exponential gaps
+    divided by their sum. The gaps for all the buckets are drawn at once, so one cumulative sum gives every bucket's
+    positions, and each bucket only needs its own offset and scale.
+
+    Args:
+        edges (numpy.ndarray): Bucket edges in seconds, so bucket i covers [edges[i], edges[i + 1]).
+        counts (numpy.ndarray): The number of calls in each bucket.
+        rng (numpy.random.Generator): The random stream.
+
+    Returns:
+        numpy.ndarray: Sorted int64 arrival times in seconds.
+    """
+    edges = np.asarray(edges, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    buckets = np.flatnonzero(counts)
+    counts = counts[buckets]
+    if len(buckets) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # One gap per call, plus a closing gap per bucket that is only needed for the bucket's total
+    totals = np.cumsum(rng.standard_exponential(counts.sum()))
+    last = np.cumsum(counts) - 1
+    before = np.r_[0.0, totals[last[:-1]]]
+    span = totals[last] - before + rng.standard_exponential(len(buckets))
+
+    # Map each bucket's running totals onto its seconds, measured from the first edge so truncation rounds down
+    lower = edges[buckets] - edges[0]
+    scale = (edges[buckets + 1] - edges[buckets]) / span
+    times = totals
+    times *= np.repeat(scale, counts)
+    times += np.repeat(lower - before * scale, counts)
+    times = times.astype(np.int64)
+    # Rounding can land a call exactly on the end of the range, which is exclusive
+    np.minimum(times, edges[-1] - edges[0] - 1, out=times)
+    return times + edges[0]
+
+
+def generate_arrivals(start_seconds, end_seconds, num_records, rng, rate_table=None):
+    """
+    This function draws num_records call times in order from a non-homogeneous Poisson process whose rate is constant
+    within each clock hour and follows the hour-of-day and day-of-week rate table.
+
+    Args:
+        start_seconds (int): The start of the range in seconds.
+        end_seconds (int): The end of the range in seconds, exclusive.
+        num_records (int): The number of calls.
+        rng (numpy.random.Generator): The random stream.
+        rate_table (array-like, optional): A 7 x 24 table of relative rates, or 24 hourly rates. Defaults to DEFAULT_RATE_TABLE.
+
+    Returns:
+        numpy.ndarray: Sorted int64 arrival times in seconds.
+    """
+    edges, weights = hour_buckets(start_seconds, end_seconds, rate_table)
+    return arrival_times(edges, bucket_counts(weights, num_records, rng), rng)
@@ -0,0 +1,571 @@
+#! /usr/bin/env python
+
+"""
+Benchmark the data generators.
+
+Every case runs in its own Python process, so peak memory is measured per case and one case cannot warm up another.
+A case generates the data for one generator and row count, times each stage, writes the data in every output format
+and records the file sizes. The results are saved as JSON, and a later run can be compared against them to flag
+slowdowns.
+
+Examples:
+    python bench_synth.py
+    python bench_synth.py --sizes 10k 100k 1M 10M --formats csv parquet
+    python bench_synth.py --output new.json --compare bench_results.json --tolerance 0.2
+    python bench_synth.py --startup
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# opt: opt_synth911gen streamed in chunks, legacy: the original synth911gen, volume: synthvolgen
+GENERATORS = ["opt", "legacy", "volume"]
+
+DEFAULT_SIZES = ["10k", "100k", "1M", "10M"]
+
+# The legacy generator calls Faker for every row, so the larger sizes would take hours
+DEFAULT_LEGACY_MAX_ROWS = 100000
+
+# The date range is fixed so every run generates the same data
+BENCH_START_DATE = "2024-01-01"
+BENCH_END_DATE = "2024-12-31"
+BENCH_SEED = 42
+
+# Timings shorter than this are mostly noise, so they are never reported as slowdowns
+NOISE_FLOOR_SECONDS = 0.05
+
+# Cold-start budgets for the command line entry points, as the wall time of a fresh Python process in seconds. --help
+# must also answer without loading any of STARTUP_HEAVY_MODULES.
+STARTUP_BUDGETS = {
+    "synth911gen --help": 0.25,
+    "synthvolgen --help": 0.25,
+    "synth911gen 1k rows": 2.5,
+    "synthvolgen 1k rows": 2.0,
+}
+STARTUP_CODE = {
+    "synth911gen --help": "import synth_cli; synth_cli.cad_main(['--help'])",
+    "synthvolgen --help": "import synth_cli; synth_cli.volume_main(['--help'])",
+    "synth911gen 1k rows": "import synth_cli; synth_cli.cad_main(['-n', '1000', '--seed', '1', '-o', 'cad.csv', '-q'])",
+    "synthvolgen 1k rows": "import synth_cli; synth_cli.volume_main(['-n', '1000', '-o', 'volume.csv', '-q'])",
+}
+STARTUP_HEAVY_MODULES = ["numpy", "pandas", "pyarrow", "faker", "PyInquirer", "prompt_toolkit"]
+
+
+def parse_size(value):
+    """
+    This function parses a row count such as 10000, 10k or 1M.
+
+    Args:
+        value (str): The row count.
+
+    Returns:
+        int: The number of rows.
+    """
+    text = value.strip().lower()
+    multiplier = 1
+    if text[-1:] in ("k", "m"):
+        multiplier = 1000 if text[-1] == "k" else 1000000
+        text = text[:-1]
+    try:
+        rows = int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a row count")
+    if rows <= 0:
+        raise argparse.ArgumentTypeError("Row counts must be positive")
+    return rows
+
+
+def _peak_rss_mb():
+    """
+    Return the peak resident set size of this process in MB, or None where the resource module is not available.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS reports bytes
+    if sys.platform == "darwin":
+        return peak / 1024**2
+    return peak / 1024
+
+
+class _Writers:
+    """
+    One ChunkWriter per output format, timing every write.
+    """
+
+    def __init__(self, work_dir, formats, categorical_columns=None, timestamp_columns=None):
+        from output_writer import ChunkWriter
+
+        self.write_seconds = {}
+        self.errors = {}
+        self._writers = {}
+        for output_format in formats:
+            path = os.path.join(work_dir, f"bench.{output_format}")
+            self._writers[output_format] = ChunkWriter(
+                path,
+                output_format,
+                categorical_columns=categorical_columns,
+                timestamp_columns=timestamp_columns,
+            )
+            self.write_seconds[output_format] = 0.0
+
+    def write(self, df):
+        for output_format, writer in list(self._writers.items()):
+            start = time.perf_counter()
+            try:
+                writer.write(df)
+            except ImportError as e:
+                # pyarrow is optional, so a missing install skips the binary formats instead of failing the case
+                self.errors[output_format] = str(e)
+                del self._writers[output_format]
+                del self.write_seconds[output_format]
+                continue
+            self.write_seconds[output_format] += time.perf_counter() - start
+
+    def close(self):
+        output_bytes = {}
+        for output_format, writer in self._writers.items():
+            start = time.perf_counter()
+            writer.close()
+            self.write_seconds[output_format] += time.perf_counter() - start
+            output_bytes[output_format] = os.path.getsize(writer.output_file)
+        return output_bytes
+
+
+def _timed_chunks(chunks, stages):
+    """
+    Yield from a chunk iterator, adding the time spent producing each chunk to stages["generate"].
+    """
+    chunks = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        stages["generate"] += time.perf_counter() - start
+        yield chunk
+
+
+def run_case(case):
+    """
+    This function runs one benchmark case in the current process.
+
+    Args:
+        case (dict): The generator, rows, formats, work_dir, chunk_size and workers of the case.
+
+    Returns:
+        dict: The case with its timings, output sizes and peak memory added.
+    """
+    generator = case["generator"]
+    rows = case["rows"]
+    stages = {"import": 0.0, "generate": 0.0}
+
+    start = time.perf_counter()
+    if generator == "opt":
+        import opt_synth911gen as module
+    elif generator == "legacy":
+        import synth911gen as module
+    elif generator == "volume":
+        import synthvolgen as module
+    else:
+        raise ValueError(f"Unknown generator '{generator}'. Choose from {', '.join(GENERATORS)}.")
+    stages["import"] = time.perf_counter() - start
+
+    if generator == "volume":
+        writers = _Writers(case["work_dir"], case["formats"])
+    else:
+        writers = _Writers(
+            case["work_dir"],
+            case["formats"],
+            categorical_columns=getattr(module, "CATEGORICAL_COLUMNS", None),
+            timestamp_columns=getattr(module, "DATETIME_COLUMNS", None),
+        )
+
+    if generator == "opt":
+        # The stage breakdown comes from the generator's own profiling hooks, which cost next to nothing without memory
+        from profiling import StageProfiler
+
+        profiler = StageProfiler(memory=None)
+        chunks = module.iter_911_chunks(
+            num_records=rows,
+            start_date=BENCH_START_DATE,
+            end_date=BENCH_END_DATE,
+            chunk_size=case["chunk_size"],
+            seed=BENCH_SEED,
+            workers=case["workers"],
+            profiler=profiler,
+        )
+    elif generator == "legacy":
+        def legacy_chunks():
+            df, _, _ = module.generate_911_data(
+                num_records=rows, start_date=BENCH_START_DATE, end_date=BENCH_END_DATE, seed=BENCH_SEED
+            )
+            yield df
+        chunks = legacy_chunks()
+    else:
+        # 15-minute intervals keep the larger sizes within a few centuries of dates
+        chunks = module.iter_volume_chunks(
+            num_rows=rows,
+            start_date=BENCH_START_DATE,
+            freq="15min",
+            seed=BENCH_SEED,
+            chunk_size=case["chunk_size"],
+        )
+
+    rows_generated = 0
+    for chunk in _timed_chunks(chunks, stages):
+        rows_generated += len(chunk)
+        writers.write(chunk)
+    output_bytes = writers.close()
+
+    result = dict(case)
+    del result["work_dir"]
+    if generator == "opt":
+        result["generator_stages"] = {record["stage"]: record["seconds"] for record in profiler.records()}
+    result.update(
+        {
+            "status": "ok",
+            "rows_generated": rows_generated,
+            "stages": stages,
+            "rows_per_second": rows_generated / stages["generate"] if stages["generate"] else None,
+            "write_seconds": writers.write_seconds,
+            "output_bytes": output_bytes,
+            "format_errors": writers.errors,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+    )
+    return result
+
+
+def _run_case_in_subprocess(case, timeout):
+    """
+    Run a case in a fresh Python process and read its result from the last line of output.
+    """
+    with tempfile.TemporaryDirectory(prefix="bench_synth_") as work_dir:
+        # The case runs inside work_dir, so nothing a generator writes to the working directory is left behind
+        child_case = dict(case, work_dir=work_dir)
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_DIR, env.get("PYTHONPATH")]))
+        try:
+            completed = subprocess.run(
+                [sys.executable, os.path.join(REPO_DIR, "bench_synth.py"), "--run-case", json.dumps(child_case)],
+                cwd=work_dir,
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return dict(case, status="timeout")
+
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()
+        return dict(case, status="error", error=error[-1] if error else f"exit code {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_benchmarks(generators, sizes, formats, chunk_size=100000, workers=1, legacy_max_rows=DEFAULT_LEGACY_MAX_ROWS, timeout=None):
+    """
+    This function runs every generator at every size and collects the results.
+
+    Args:
+        generators (list): Names from GENERATORS.
+        sizes (list): Row counts.
+        formats (list): Output formats to write.
+        chunk_size (int, optional): The chunk size for the opt and volume generators. Defaults to 100000.
+        workers (int, optional): The worker processes for the opt generator. Defaults to 1.
+        legacy_max_rows (int, optional): Larger sizes are skipped for the legacy generator. Defaults to 100000.
+        timeout (float, optional): Seconds before a case is stopped. Defaults to no limit.
+
+    Returns:
+        dict: The environment and the list of case results.
+    """
+    import numpy as np
+    import pandas as pd
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "cases": [],
+    }
+
+    for generator in generators:
+        for rows in sizes:
+            case = {
+                "generator": generator,
+                "rows": rows,
+                "formats": list(formats),
+                "chunk_size": chunk_size,
+                "workers": workers,
+            }
+            if generator == "legacy" and legacy_max_rows is not None and rows > legacy_max_rows:
+                result = dict(case, status="skipped", error=f"more than {legacy_max_rows} rows")
+            else:
+                print(f"Running {generator} with {rows:,} rows...", flush=True)
+                result = _run_case_in_subprocess(case, timeout)
+            results["cases"].append(result)
+            print(_format_result(result), flush=True)
+
+    return results
+
+
+def _format_result(result):
+    if result["status"] != "ok":
+        return f"  {result['generator']:<7} {result['rows']:>11,} rows: {result['status']} {result.get('error', '')}".rstrip()
+    writes = ", ".join(
+        f"{fmt} {seconds:.2f}s/{result['output_bytes'][fmt] / 1024**2:.1f}MB"
+        for fmt, seconds in result["write_seconds"].items()
+    )
+    rss = f"{result['peak_rss_mb']:.0f}MB" if result["peak_rss_mb"] is not None else "n/a"
+    return (
+        f"  {result['generator']:<7} {result['rows']:>11,} rows: "
+        f"generate {result['stages']['generate']:.2f}s ({result['rows_per_second']:,.0f} rows/s), "
+        f"peak RSS {rss}, write {writes}"
+    )
+
+
+def speedups(results, baseline="legacy", candidate="opt"):
+    """
+    This function compares the generation speed of two generators at each size they both completed.
+
+    Args:
+        results (dict): The output of run_benchmarks.
+        baseline (str, optional): The generator to compare against. Defaults to "legacy".
+        candidate (str, optional): The generator being compared. Defaults to "opt".
+
+    Returns:
+        dict: Row count to candidate rows/sec divided by baseline rows/sec.
+    """
+    rates = {}
+    for result in results["cases"]:
+        if result["status"] == "ok":
+            rates[(result["generator"], result["rows"])] = result["rows_per_second"]
+    return {
+        rows: rates[(candidate, rows)] / rates[(baseline, rows)]
+        for (generator, rows) in rates
+        if generator == baseline and (candidate, rows) in rates
+    }
+
+
+def parse_importtime(stderr):
+    """
+    This function reads the report that python -X importtime writes to stderr.
+
+    Args:
+        stderr (str): The stderr of the process.
+
+    Returns:
+        tuple: (top_level, modules), where top_level maps each module imported directly by the script to its cumulative
+        import time in seconds, and modules is the set of every module imported.
+    """
+    top_level = {}
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level after the one space that follows the bar
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        modules.add(name)
+        if depth == 0:
+            top_level[name] = int(cumulative) / 1e6
+    return top_level, modules
+
+
+def measure_startup(repeats=3, timeout=None):
+    """
+    This function times each command line entry point in STARTUP_CODE from a fresh Python process and checks it
+    against STARTUP_BUDGETS. Each case is run once untimed, so the pool caches are filled and the timed runs measure
+    startup rather than the first pool build. The best of repeats runs counts. One more run under -X importtime
+    records where the import time goes and which modules were loaded.
+
+    Args:
+        repeats (int, optional): Timed runs per case. Defaults to 3.
+        timeout (float, optional): Seconds before a run is stopped.
+
+    Returns:
+        list: One result per case, with its seconds, budget, import breakdown and any failures.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_DIR, env.get("PYTHONPATH")]))
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as work_dir:
+        def run(code, *flags):
+            return subprocess.run(
+                [sys.executable, *flags, "-c", code],
+                cwd=work_dir,
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+            )
+
+        for name, code in STARTUP_CODE.items():
+            run(code)
+            best = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                completed = run(code)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            top_level, modules = parse_importtime(run(code, "-X", "importtime").stderr)
+
+            budget = STARTUP_BUDGETS[name]
+            failures = []
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()
+                failures.append(error[-1] if error else f"exit code {completed.returncode}")
+            if best > budget:
+                failures.append(f"{best:.2f}s is over the {budget:.2f}s budget")
+            heavy = [module for module in STARTUP_HEAVY_MODULES if module in modules]
+            if name.endswith("--help") and heavy:
+                failures.append(f"--help imports {', '.join(heavy)}")
+            results.append(
+                {
+                    "name": name,
+                    "seconds": best,
+                    "budget": budget,
+                    "import_seconds": sum(top_level.values()),
+                    "heaviest_imports": dict(sorted(top_level.items(), key=lambda item: -item[1])[:5]),
+                    "heavy_modules": heavy,
+                    "failures": failures,
+                }
+            )
+    return results
+
+
+def _format_startup(result):
+    heaviest = ", ".join(f"{module} {seconds:.2f}s" for module, seconds in result["heaviest_imports"].items())
+    status = "; ".join(result["failures"]) or "ok"
+    return (
+        f"  {result['name']:<20} {result['seconds']:.2f}s (budget {result['budget']:.2f}s, "
+        f"imports {result['import_seconds']:.2f}s: {heaviest}) {status}"
+    )
+
+
+def compare_results(current, previous, tolerance=0.2):
+    """
+    This function finds cases that got slower than a previous run. A case regresses when its generation rate drops,
+    or a format's write time grows, by more than the tolerance. Stages faster than NOISE_FLOOR_SECONDS are ignored.
+
+    Args:
+        current (dict): The output of run_benchmarks.
+        previous (dict): An earlier output of run_benchmarks, usually loaded from JSON.
+        tolerance (float, optional): The allowed relative slowdown. Defaults to 0.2, or 20%.
+
+    Returns:
+        list: One message per regression. An empty list means no slowdowns.
+    """
+    previous_cases = {
+        (case["generator"], case["rows"]): case for case in previous["cases"] if case["status"] == "ok"
+    }
+    regressions = []
+    for case in current["cases"]:
+        old = previous_cases.get((case["generator"], case["rows"]))
+        if case["status"] != "ok" or old is None:
+            continue
+        name = f"{case['generator']} {case['rows']:,} rows"
+        slow_enough = case["stages"]["generate"] >= NOISE_FLOOR_SECONDS
+        if slow_enough and case["rows_per_second"] < old["rows_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: generate {case['rows_per_second']:,.0f} rows/s, was {old['rows_per_second']:,.0f} rows/s"
+            )
+        for fmt, seconds in case["write_seconds"].items():
+            old_seconds = old["write_seconds"].get(fmt)
+            if old_seconds is None or seconds < NOISE_FLOOR_SECONDS:
+                continue
+            if seconds > old_seconds * (1 + tolerance):
+                regressions.append(f"{name}: {fmt} write {seconds:.2f}s, was {old_seconds:.2f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the 911 data generators.")
+    parser.add_argument("--generators", nargs="+", choices=GENERATORS, default=GENERATORS, help="Generators to run.")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[parse_size(s) for s in DEFAULT_SIZES], help="Row counts, e.g. 10k 1M.")
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet", "feather"], help="Output formats to write.")
+    parser.add_argument("--chunk-size", type=parse_size, default=100000, help="Chunk size for opt_synth911gen and synthvolgen.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for opt_synth911gen.")
+    parser.add_argument("--legacy-max-rows", type=parse_size, default=DEFAULT_LEGACY_MAX_ROWS, help="Skip larger sizes for synth911gen.")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds before a case is stopped.")
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="JSON file for the results. Defaults to bench_results.json, or startup_results.json with --startup.",
+    )
+    parser.add_argument("--compare", help="JSON results of an earlier run to check for slowdowns.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown for --compare.")
+    parser.add_argument("--startup", action="store_true", help="Check the command line cold-start times against STARTUP_BUDGETS instead.")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.output is None:
+        # The startup results go to their own file, so they never overwrite the baseline that --compare reads
+        args.output = "startup_results.json" if args.startup else "bench_results.json"
+
+    if args.startup:
+        startup = measure_startup(timeout=args.timeout)
+        print("Cold start:")
+        for result in startup:
+            print(_format_startup(result))
+        with open(args.output, "w") as f:
+            json.dump({"python": platform.python_version(), "startup": startup}, f, indent=2)
+        print(f"Results saved to {args.output}")
+        return 1 if any(result["failures"] for result in startup) else 0
+
+    if args.run_case:
+        # Child process: run one case and report it as the last line of output
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return 0
+
+    results = run_benchmarks(
+        args.generators,
+        args.sizes,
+        args.formats,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        legacy_max_rows=args.legacy_max_rows,
+        timeout=args.timeout,
+    )
+    results["speedups"] = {str(rows): ratio for rows, ratio in speedups(results).items()}
+    for rows, ratio in results["speedups"].items():
+        print(f"opt_synth911gen is {ratio:.1f}x faster than synth911gen at {int(rows):,} rows")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        regressions = compare_results(results, previous, args.tolerance)
+        if regressions:
+            print(f"\nSlower than {args.compare}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"No slowdowns compared to {args.compare}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
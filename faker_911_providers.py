@@ -1,19 +1,66 @@
-from faker import Faker
-from faker.providers import DynamicProvider
+from collections import OrderedDict
 
-law_problem_prodider = DynamicProvider(
-    provider_name="law_problem",
-    eleements = []
-)
+# Faker providers for the problem natures in faker_problems.csv. The elements are ordered dicts of problem to weight,
+# which Faker samples in proportion to the weights. These are for use with Faker directly; the generators sample the
+# catalog in bulk with problems.ProblemCatalog instead.
+#
+# The providers and the Faker instance are built on first use rather than at import time, so importing this module
+# does not load Faker or read the problem catalog.
 
-fire_problem_prodider = DynamicProvider(
-    provider_name="fire_problem",
-    elements = []
-)
+# The Faker provider name for each agency
+PROBLEM_PROVIDERS = {"LAW": "law_problem", "FIRE": "fire_problem", "EMS": "ems_problem"}
 
-ems_problem_prodider = DynamicProvider(
-    provider_name="ems_problem",
-    elements = []
-)
+# The module attributes served by __getattr__, and the agency of each provider
+_PROVIDER_ATTRIBUTES = {
+    "law_problem_provider": "LAW",
+    "fire_problem_provider": "FIRE",
+    "ems_problem_provider": "EMS",
+}
 
-fake = Faker()
\ No newline at end of file
+_memory_cache = {}
+
+
+def get_problem_providers():
+    """
+    This function returns the DynamicProviders for the problems of each agency, building them the first time.
+
+    Returns:
+        dict: Agency to a Faker DynamicProvider named after PROBLEM_PROVIDERS.
+    """
+    if "providers" not in _memory_cache:
+        from faker.providers import DynamicProvider
+
+        from problems import get_problem_catalog
+
+        catalog = get_problem_catalog()
+        _memory_cache["providers"] = {
+            agency: DynamicProvider(provider_name=name, elements=OrderedDict(catalog.problems_for(agency)))
+            for agency, name in PROBLEM_PROVIDERS.items()
+        }
+    return _memory_cache["providers"]
+
+
+def get_fake():
+    """
+    This function returns a shared Faker instance with the problem providers added, building it the first time.
+
+    Returns:
+        faker.Faker: The Faker instance.
+    """
+    if "fake" not in _memory_cache:
+        from faker import Faker
+
+        fake = Faker()
+        for provider in get_problem_providers().values():
+            fake.add_provider(provider)
+        _memory_cache["fake"] = fake
+    return _memory_cache["fake"]
+
+
+def __getattr__(name):
+    # Keep the old module attributes working, built on first access
+    if name in _PROVIDER_ATTRIBUTES:
+        return get_problem_providers()[_PROVIDER_ATTRIBUTES[name]]
+    if name == "fake":
+        return get_fake()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -9,9 +9,11 @@ import os
 # Ensure the current directory is in the path to import local modules
 sys.path.append(os.getcwd())
 
+# The generators load pandas, so they are only imported when a run starts, on the worker thread, and the window opens
+# without waiting for them
 try:
-    import opt_synth911gen
-    import synthvolgen
+    from output_writer import OUTPUT_FORMATS, write_dataframe
+    from profiling import StageProfiler
 except ImportError as e:
     print(f"Error importing modules: {e}")
     # We will handle this gracefully in the UI if needed, or let it fail if critical
@@ -19,6 +21,8 @@ except ImportError as e:
 def run_script():
     selected_script = script_var.get()
     output_file = output_file_entry.get()
+    output_format = format_var.get()
+    profile = profile_var.get()
     
     # Disable run button while running
     run_button.config(state=tk.DISABLED)
@@ -26,11 +30,28 @@ def run_script():
     status_text.see(tk.END)
 
     # Run in a separate thread to keep UI responsive
-    thread = threading.Thread(target=execute_script, args=(selected_script, output_file))
+    thread = threading.Thread(target=execute_script, args=(selected_script, output_file, output_format, profile))
     thread.start()
 
-def execute_script(selected_script, output_file):
+def show_stage(record):
+    """
+    Post one finished profiling stage to the status pane. This runs on the worker thread, so the update is handed to Tk.
+    """
+    line = f"  {record['stage']}: {record['seconds']:.3f}s"
+    if record["rows"]:
+        line += f", {record['rows']:,} rows"
+    if record["memory_delta"]:
+        line += f", {record['memory_delta'] / 1024**2:+.1f} MB"
+    root.after(0, lambda: status_text.insert(tk.END, line + "\n"))
+
+
+def execute_script(selected_script, output_file, output_format="csv", profile=False):
+    # The profiler reports each stage to the status pane as it finishes, then a table at the end
+    profiler = StageProfiler(callback=show_stage) if profile else None
     try:
+        import opt_synth911gen
+        import synthvolgen
+
         if selected_script == "CAD Data Generation":
             # Retrieve parameters (add validation as needed)
             # For this demo, we'll use defaults or parse from entries if we added them
@@ -47,13 +68,20 @@ def execute_script(selected_script, output_file):
             status_text.insert(tk.END, f"Generating {num_records} CAD records...\n")
             
             # Call the function directly
-            df, _, _ = opt_synth911gen.generate_911_data(num_records=num_records)
+            df, _, _ = opt_synth911gen.generate_911_data(num_records=num_records, profiler=profiler)
             
             # Save to the specified output file
             if not output_file:
-                output_file = "computer_aided_dispatch.csv"
+                output_file = f"computer_aided_dispatch.{output_format}"
             
-            df.to_csv(output_file, index=False)
+            write_dataframe(
+                df,
+                output_file,
+                output_format,
+                opt_synth911gen.CATEGORICAL_COLUMNS,
+                timestamp_columns=opt_synth911gen.DATETIME_COLUMNS,
+                profiler=profiler,
+            )
             status_text.insert(tk.END, f"Saved to {output_file}\n")
 
         elif selected_script == "Call Volume Generation":
@@ -69,11 +97,14 @@ def execute_script(selected_script, output_file):
             df = synthvolgen.generate_synthetic_data(num_rows=num_rows)
             
             if not output_file:
-                output_file = "911_volume_data.csv"
+                output_file = f"911_volume_data.{output_format}"
                 
-            df.to_csv(output_file, index=False)
+            write_dataframe(df, output_file, output_format, profiler=profiler)
             status_text.insert(tk.END, f"Saved to {output_file}\n")
             
+        if profiler is not None:
+            report = profiler.report()
+            root.after(0, lambda: status_text.insert(tk.END, f"Stage timings:\n{report}\n"))
         root.after(0, lambda: status_text.insert(tk.END, "Execution complete.\n"))
         root.after(0, lambda: messagebox.showinfo("Success", "Data generation complete!"))
 
@@ -84,7 +115,11 @@ def execute_script(selected_script, output_file):
         root.after(0, lambda: run_button.config(state=tk.NORMAL))
 
 def select_output_file():
-    filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+    output_format = format_var.get()
+    filename = filedialog.asksaveasfilename(
+        defaultextension=f".{output_format}",
+        filetypes=[(f"{output_format.upper()} files", f"*.{output_format}"), ("All files", "*.*")],
+    )
     if filename:
         output_file_entry.delete(0, tk.END)
         output_file_entry.insert(0, filename)
@@ -129,16 +164,30 @@ param2_label.grid(row=3, column=0, sticky="w", padx=5, pady=5)
 param2_entry = tk.Entry(root, width=20)
 param2_entry.grid(row=3, column=1, sticky="w", padx=5, pady=5)
 
+# Output format selection
+format_label = tk.Label(root, text="Output Format:")
+format_label.grid(row=4, column=0, sticky="w", padx=5, pady=5)
+
+format_var = tk.StringVar(root)
+format_dropdown = ttk.Combobox(root, textvariable=format_var, values=OUTPUT_FORMATS, state="readonly")
+format_dropdown.grid(row=4, column=1, sticky="w", padx=5, pady=5)
+format_dropdown.current(0)  # Default to CSV
+
+# Stage profiling
+profile_var = tk.BooleanVar(root, value=False)
+profile_check = tk.Checkbutton(root, text="Show stage timings", variable=profile_var)
+profile_check.grid(row=4, column=2, sticky="w", padx=5, pady=5)
+
 # Run button
 run_button = tk.Button(root, text="Run", command=run_script)
-run_button.grid(row=4, column=1, pady=10)
+run_button.grid(row=5, column=1, pady=10)
 
 # Status display
 status_label = tk.Label(root, text="Status:")
-status_label.grid(row=5, column=0, sticky="w", padx=5, pady=5)
+status_label.grid(row=6, column=0, sticky="w", padx=5, pady=5)
 
-status_text = tk.Text(root, height=10, width=60)
-status_text.grid(row=6, column=0, columnspan=3, padx=5, pady=5)
+status_text = tk.Text(root, height=10, width=80, font="TkFixedFont")
+status_text.grid(row=7, column=0, columnspan=3, padx=5, pady=5)
 
 if __name__ == "__main__":
     root.mainloop()
\ No newline at end of file
@@ -3,17 +3,23 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
 import os
-from faker import Faker
-from faker.providers import DynamicProvider
 import argparse
+import collections
 import collections.abc
-# Patch for PyInquirer compatibility with Python 3.10+
-if not hasattr(collections, 'Mapping'):
-    collections.Mapping = collections.abc.Mapping
-from PyInquirer import prompt, Validator, ValidationError
+import contextlib
 import re
+from output_writer import ChunkWriter, OUTPUT_FORMATS, TIMESTAMP_FORMATS, output_format_from_path, write_dataframe
+from pools import AddressPool, get_address_pool
+from rosters import CALL_TAKER, DISPATCHER, StaffRoster, build_roster
+from problems import get_problem_catalog
+from call_ids import CallIdAllocator
+from answer_times import draw_answer_times, load_table
+from arrivals import EPOCH_WEEKDAY, arrival_times, bucket_counts, generate_arrivals, hour_buckets
+from schedules import SCHEDULES, get_schedule
+from staffing_sim import StaffingSimulator
+from units import UNIT_CATEGORICAL_COLUMNS, UNIT_DATETIME_COLUMNS, UnitResponder, UnitRoster, draw_unit_times
+from profiling import NULL_PROFILER, StageProfiler
 
 def sanitize_input(user_input):
     # Regular expression to match allowed characters
@@ -22,164 +28,103 @@ def sanitize_input(user_input):
         raise ValueError("Input contains invalid characters. Only letters, numbers, spaces, and hyphens are allowed.")
     return user_input
 
-def main():
-    parser = argparse.ArgumentParser(description="Sanitize user input options in synth911gen.py")
-    
-    # Example of a command-line argument
-    parser.add_argument('--option', type=str, required=True, help='User input option')
-    
-    args = parser.parse_args()
-    
-    try:
-        sanitized_option = sanitize_input(args.option)
-        print(f"Sanitized Option: {sanitized_option}")
-    except ValueError as e:
-        print(e)
-
-if __name__ == "__main__":
-    main()
-
-fake = Faker("en_US")
-
-law_problem_provider = DynamicProvider(
-    provider_name="law_problem",
-    elements=[
-        "TRAFFIC STOP",
-        "PARKING COMPLAINT",
-        "DISORDERLY CONDUCT",
-        "SUSPICIOUS EVENT",
-        "MVC",
-        "POLICE INFORMATION",
-        "ALARM COMMERCIAL",
-        "DOMESTIC VIOL",
-        "TRESPASSING",
-        "ASSIST CITIZEN",
-        "PUBLIC SERVICE - LAW",
-        "MENTAL HEALTH",
-        "NOISE COMPLAINT",
-        "LARCENY",
-        "DISABLED MOTORIST",
-        "ALARM RESIDENTIAL",
-        "DRUG COMPLAINT",
-        "FLAG DOWN",
-        "ASSAULT",
-        "GLA",
-    ],
-)
-
-fire_problem_provider = DynamicProvider(
-    provider_name="fire_problem",
-    elements=[
-        "FIRE ALARM",
-        "ELEVATOR",
-        "MVC AUTO",
-        "GAS LEAK",
-        "PUBLIC SERVICE - FIRE",
-        "OUTSIDE FIRE",
-        "CO ALARM",
-        "RESIDENTIAL BUILDING FIRE",
-        "HIGHRISE BUILDING FIRE",
-        "COMMERCIAL BUILDING FIRE",
-        "ODOR OF SMOKE",
-        "APPLIANCE FIRE",
-        "LOCKOUT",
-        "ENTRAPMENT",
-        "MVC SCHOOL BUS",
-        "WIRES DOWN",
-        "HAZMAT",
-        "MVC MOTORCYCLE",
-    ],
-)
-
-ems_problem_provider = DynamicProvider(
-    provider_name="ems_problem",
-    elements=[
-        "ALS EMERGENCY",
-        "BLS EMERGENCY",
-        "TROUBLE BREATHING ALS",
-        "FALL BLS",
-        "PUBLIC SERICE EMS",
-        "CHEST PAIN ALS",
-        "CARDIAC ARREST ALS",
-        "ALTERED LOC ALS",
-        "UNCONSCIOUS ALS",
-        "HEART PROBLEMS ALS",
-        "SEIZURE ALS",
-        "STROKE ALS",
-        "INJURED PERSON BLS",
-        "BACK PAIN BLS",
-        "MENTAL HEALTH ALS",
-        "ASSAULT ALS",
-        "DIABETIC EMERGENCY ALS",
-        "OVERDOSE ALS",
-        "HEADACHE BLS",
-        "ALLERGIC REACTION ALS",
-        "PSYCHIATRIC EMERGENCY ALS",
-    ],
-)
-
-address_list = [fake.unique.street_address() for _ in range(2500)]
-
-
-street_address_provider = DynamicProvider(
-    provider_name="street_address", elements=address_list
-)
+# Low-cardinality columns that the binary output formats store dictionary-encoded.
+# address is left out because it is only categorical for list pools; an AddressPool can hold millions of addresses.
+CATEGORICAL_COLUMNS = [
+    "agency",
+    "day_night",
+    "dow",
+    "shift",
+    "shift_part",
+    "problem",
+    "call_taker",
+    "call_reception",
+    "dispatcher",
+]
+
+# Staff are referenced by employee ID in the generated chunks. Each ID column gets a name column after it when the
+# table is written, looked up in the run's StaffRoster
+STAFF_NAME_COLUMNS = {"call_taker_id": "call_taker", "dispatcher_id": "dispatcher"}
+
+# Time stamp columns, which the output writer formats according to the chosen timestamp format
+DATETIME_COLUMNS = [
+    "event_time",
+    "time_call_queued",
+    "time_call_dispatched",
+    "time_call_acknowledged",
+    "time_call_disconnected",
+    "time_unit_enroute",
+    "time_call_closed",
+]
+
+# Categories of the calendar columns
+DAYS_OF_WEEK = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
+
+# Hour of day -> day_night code. 6 <= hour <= 17 is DAY
+_DAY_NIGHT_BY_HOUR = np.where((np.arange(24) >= 6) & (np.arange(24) <= 17), 0, 1).astype(np.int8)
 
 # TODO: Add the ability to switch the faker provider to a different locale.
 # TODO: Hook this to a web interface to allow users to generate data on demand.
 
 
-def generate_911_data(num_records=10000, start_date=None, end_date=None, num_names=8):
+def add_staff_names(df_full, roster):
     """
-    This function generates synthetic 911 dispatch data for a given number of records. This will output a CSV file with the generated data.
-    The data includes various fields such as call_id, agency, event_time, day_of_year, week_no, hour, day_night, dow, shift, shift_part, problem, address, priority_number, call_taker, call_reception, dispatcher, queue_time, dispatch_time, phone_time, ack_time, enroute_time, on_scene_time, process_time, total_time and time stamps for various events.
+    This function adds the call_taker and dispatcher name columns of a chunk from its employee IDs, each right after
+    its ID column. Only the distinct names of the roster are built, and every row gets an integer code into them.
 
     Args:
-        num_records (int, optional): _description_. Defaults to 10000.
+        df_full (pandas.DataFrame): A chunk with call_taker_id and dispatcher_id columns.
+        roster (StaffRoster): The roster the IDs were drawn from.
 
-        TODO: Add the ability to switch the faker provider to a different locale.
-        This will allow for generating data in different languages or formats based on the user's needs.
-
-        This needs to be run with the following setup: python synth911gen.py -n 10000 -s 2024-01-01 -e 2024-12-31 -o computer_aided_dispatch.csv
+    Returns:
+        pandas.DataFrame: A shallow copy of the chunk with the name columns.
     """
+    df_full = df_full.copy(deep=False)
+    for id_column, name_column in STAFF_NAME_COLUMNS.items():
+        if id_column in df_full and name_column not in df_full:
+            df_full.insert(
+                df_full.columns.get_loc(id_column) + 1, name_column, roster.name_column(df_full[id_column].to_numpy())
+            )
+    return df_full
 
-    def generate_names(num_names=8):
-        """
-        This function generates a list of random names using the Faker library. The number of names generated is determined by the num_names parameter.
-        The names are generated in the format "Last, First". This function is used to create call_taker and dispatcher names for the generated data and conforms to the most commonly used formats.
 
-        Args:
-            num_names (int, optional): _description_. Defaults to 8.
+def generate_addresses(num_addresses=2500, rng=None):
+    """
+    This function returns a pool of unique street addresses to sample the address column from. The pool is built on
+    first use rather than at import time, and seeded pools are cached on disk by pools.get_address_pool.
 
-        Returns:
-            dictionary: This returns a dictionary with keys A, B, C, D and values as lists of names.
-        """
-        return [f"{fake.last_name()}, {fake.first_name()}" for _ in range(num_names)]
+    Args:
+        num_addresses (int, optional): The number of addresses in the pool. Defaults to 2500.
+        rng (numpy.random.Generator, optional): Seeds the pool. Defaults to the cached pool shared by unseeded runs.
 
-    call_taker_names = {key: generate_names(num_names) for key in ["A", "B", "C", "D"]}
-    dispatcher_names = {key: generate_names(num_names) for key in ["A", "B", "C", "D"]}
+    Returns:
+        list: The unique street addresses.
+    """
+    return get_address_pool(num_addresses, seed=_pool_seed(rng))
 
-    # Define the probabilities for each agency
-    probabilities = [0.72, 0.17, 0.11]
-    agencies = ["LAW", "EMS", "FIRE"]
 
-    # Generate the agency column with the specified distribution
-    agency_choices = np.random.choice(agencies, size=num_records, p=probabilities)
+def _pool_seed(rng):
+    """
+    Draw the Faker seed for a pool from rng, or None for an unseeded pool.
+    """
+    return None if rng is None else int(rng.integers(2**32))
 
-    # Map agency to prefix
-    agency_prefix = {"LAW": "L", "EMS": "M", "FIRE": "F"}
-    
-    # Vectorized call_id generation
-    # Create an array of prefixes corresponding to the agency choices
-    prefixes = np.array([agency_prefix[a] for a in agency_choices])
-    # Generate random 6-digit numbers
-    random_numbers = np.random.randint(0, 1000000, size=num_records)
-    # Format them as strings with leading zeros
-    random_numbers_str = [f"{x:06d}" for x in random_numbers]
-    call_ids_full = [f"25-{p}{n}" for p, n in zip(prefixes, random_numbers_str)]
+
+def _resolve_rng(seed=None, rng=None):
+    """
+    Return the Generator for a run from either a seed or an existing Generator.
+    """
+    if rng is not None:
+        if seed is not None:
+            raise ValueError("Pass either seed or rng, not both")
+        return rng
+    return np.random.default_rng(seed)
 
 
-    # Generate datetime column with random dates across 2024-2025
+def _resolve_date_range(start_date=None, end_date=None):
+    """
+    Convert the start and end dates to datetime objects and return them with the range in seconds.
+    """
     # Set default start and end dates if not provided
     if start_date is None:
         start_date = "2024-01-01"
@@ -192,272 +137,741 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
     if isinstance(end_date, str):
         end_date = datetime.strptime(end_date, "%Y-%m-%d")
 
-    # Generate random datetimes within the specified range
     date_range = int((end_date - start_date).total_seconds())
-    random_seconds = np.random.randint(0, date_range, size=num_records)
-    # Sort seconds to simulate chronological order
-    random_seconds.sort()
-    
-    # Vectorized datetime generation
-    datetimes_full = start_date + pd.to_timedelta(random_seconds, unit='s')
-
-    # Create DataFrame
-    df_full = pd.DataFrame(
-        {
-            "call_id": call_ids_full,
-            "agency": agency_choices,
-            "event_time": datetimes_full,
-        }
-    )
+    return start_date, end_date, date_range
 
-    # Add day_of_year column
-    df_full["day_of_year"] = df_full["event_time"].dt.dayofyear
 
-    # Add week_no column
-    df_full["week_no"] = df_full["event_time"].dt.isocalendar().week
+def _epoch_seconds(value):
+    """
+    Convert a datetime to integer seconds since 1970-01-01.
+    """
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+
+def generate_911_data(
+    num_records=10000,
+    start_date=None,
+    end_date=None,
+    num_names=8,
+    seed=None,
+    rng=None,
+    num_addresses=2500,
+    address_pool=None,
+    profiler=None,
+    rate_table=None,
+    simulate=False,
+    problem_catalog=None,
+    schedule=None,
+    roster=None,
+):
+    """
+    This function generates synthetic 911 dispatch data for a given number of records. This will output a CSV file with the generated data.
+    The data includes various fields such as call_id, agency, event_time, day_of_year, week_no, hour, day_night, dow, shift, shift_part, problem, address, priority_number, call_taker, call_reception, dispatcher, answer_time, queue_time, dispatch_time, phone_time, ack_time, enroute_time, on_scene_time, process_time, total_time and time stamps for various events.
 
-    # Add hour column
-    df_full["hour"] = df_full["event_time"].dt.hour
+    The time stamp columns are returned as datetime64 and are formatted by the output writer.
+    Calls arrive in time order from a non-homogeneous Poisson process that follows rate_table, so the load has daily and
+    weekly peaks.
+    The whole dataset is held in memory. For large runs use iter_911_chunks or write_911_chunks instead.
 
-    # Add day_night column based on the hour column
-    # Vectorized: 6 <= hour <= 17 is DAY
-    df_full["day_night"] = np.where(
-        (df_full["hour"] >= 6) & (df_full["hour"] <= 17), "DAY", "NIGHT"
-    )
+    Args:
+        num_records (int, optional): _description_. Defaults to 10000.
+        seed (int, optional): Makes the run reproducible. Every random draw, including the names and addresses, comes from one numpy Generator built from this seed.
+        rng (numpy.random.Generator, optional): An existing Generator to draw from instead of a seed.
+        num_addresses (int, optional): The size of the address pool. Defaults to 2500.
+        address_pool (list, AddressPool or str, optional): The addresses to sample from instead of a Faker pool. An AddressPool,
+            or the path of one, adds address_id, latitude, longitude, beat and district columns.
+        profiler (StageProfiler, optional): Records the wall time, rows and memory of each stage of the run. Print
+            profiler.report() afterwards for a timing table.
+        rate_table (array-like, optional): Relative call rates as a 7 x 24 table, one row per day from Monday, or 24 hourly
+            rates used for every day. Defaults to arrivals.DEFAULT_RATE_TABLE. Use arrivals.UNIFORM_RATE_TABLE for a flat load.
+        simulate (bool, optional): Assign call takers and dispatchers with the queueing simulation in staffing_sim, so the
+            answer, queue, dispatch and phone times come from contention for the staff on shift. Defaults to False,
+            which draws them independently per call.
+        problem_catalog (ProblemCatalog or str, optional): The problem natures and their weights per agency, or the path
+            of a catalog CSV. Defaults to problems.get_problem_catalog(), the cached faker_problems.csv.
+        schedule (ShiftSchedule, dict or str, optional): The shift rotation that sets the shift and shift_part columns:
+            the name of a built-in schedule in schedules.SCHEDULES, the path of a JSON definition, a definition dict or
+            a ShiftSchedule. Defaults to the 12-hour "pitman" rotation.
+        roster (StaffRoster, optional): The call takers and dispatchers. Defaults to rosters.build_roster with num_names
+            per shift. The table has each person's employee ID and name.
+
+    Returns:
+        tuple: (df_full, call_taker_names, dispatcher_names), the records and the names on each shift.
 
-    # Add dow column with the day of the week in 3-character format
-    df_full["dow"] = df_full["event_time"].dt.strftime("%a").str.upper()
-
-    # Vectorized Shift Determination
-    # Logic:
-    # Week even:
-    #   DAY & (MON, TUE, FRI, SAT) -> A
-    #   NIGHT & (MON, TUE, FRI, SAT) -> C
-    #   DAY & (WED, THU, SUN) -> B
-    #   NIGHT & (WED, THU, SUN) -> D
-    # Week odd:
-    #   DAY & (WED, THU, SUN) -> A
-    #   NIGHT & (WED, THU, SUN) -> C
-    #   DAY & (MON, TUE, FRI, SAT) -> B
-    #   NIGHT & (MON, TUE, FRI, SAT) -> D
-    
-    is_even_week = (df_full["week_no"] % 2 == 0)
-    is_day = (df_full["day_night"] == "DAY")
-    dow = df_full["dow"]
-    group1_days = dow.isin(["MON", "TUE", "FRI", "SAT"])
-    group2_days = dow.isin(["WED", "THU", "SUN"])
-    
-    conditions = [
-        is_even_week & is_day & group1_days,      # A
-        is_even_week & ~is_day & group1_days,     # C
-        is_even_week & is_day & group2_days,      # B
-        is_even_week & ~is_day & group2_days,     # D
-        ~is_even_week & is_day & group2_days,     # A
-        ~is_even_week & ~is_day & group2_days,    # C
-        ~is_even_week & is_day & group1_days,     # B
-        ~is_even_week & ~is_day & group1_days,    # D
-    ]
-    choices = ["A", "C", "B", "D", "A", "C", "B", "D"]
-    
-    df_full["shift"] = np.select(conditions, choices, default="UNKNOWN")
-
-    # Vectorized Shift Part
-    # EARLY: 6-9, 18-21
-    # MIDS: 10-13, 22-1, 0-1 (so 22, 23, 0, 1)
-    # LATE: else (2-5, 14-17)
-    
-    hour = df_full["hour"]
-    early_hours = hour.isin([6, 7, 8, 9, 18, 19, 20, 21])
-    mids_hours = hour.isin([10, 11, 12, 13, 22, 23, 0, 1])
-    
-    df_full["shift_part"] = np.select(
-        [early_hours, mids_hours],
-        ["EARLY", "MIDS"],
-        default="LATE"
-    )
+        TODO: Add the ability to switch the faker provider to a different locale.
+        This will allow for generating data in different languages or formats based on the user's needs.
 
-    # Assign problem type based on agency
-    # Pre-generate lists from providers
-    law_problems = law_problem_provider.elements
-    fire_problems = fire_problem_provider.elements
-    ems_problems = ems_problem_provider.elements
-    
-    # Vectorized assignment
-    # We can use np.select or map, but since we need random choices, we can do this:
-    # Generate random indices for each type
-    n_law = (df_full["agency"] == "LAW").sum()
-    n_fire = (df_full["agency"] == "FIRE").sum()
-    n_ems = (df_full["agency"] == "EMS").sum()
-    
-    law_choices = np.random.choice(law_problems, size=n_law)
-    fire_choices = np.random.choice(fire_problems, size=n_fire)
-    ems_choices = np.random.choice(ems_problems, size=n_ems)
-    
-    # Place them in the dataframe
-    df_full.loc[df_full["agency"] == "LAW", "problem"] = law_choices
-    df_full.loc[df_full["agency"] == "FIRE", "problem"] = fire_choices
-    df_full.loc[df_full["agency"] == "EMS", "problem"] = ems_choices
-
-    # Add address column with a street address
-    # Use the pre-generated address_list
-    df_full["address"] = np.random.choice(address_list, size=len(df_full))
-
-    # Add priority_number column with random integers between 1 and 5
-    df_full["priority_number"] = np.random.randint(1, 6, size=len(df_full))
-
-    # Assign call_taker based on shift
-    # Vectorized approach:
-    # For each shift (A, B, C, D), sample names
-    for shift in ["A", "B", "C", "D"]:
-        mask = df_full["shift"] == shift
-        count = mask.sum()
-        if count > 0:
-            df_full.loc[mask, "call_taker"] = np.random.choice(call_taker_names[shift], size=count)
-
-    # Define the probabilities for each call reception method
-    probabilities_reception = [0.55, 0.20, 0.10, 0.10, 0.05]
-
-    # Define the call reception categories
-    reception_methods = ["E-911", "PHONE", "OFFICER", "TEXT", "C2C"]
-
-    # Generate the call_reception column with the specified distribution
-    df_full["call_reception"] = np.random.choice(
-        reception_methods, size=len(df_full), p=probabilities_reception
-    )
+        This needs to be run with the following setup: python synth911gen.py -n 10000 -s 2024-01-01 -e 2024-12-31 -o computer_aided_dispatch.csv
+    """
+    seeded = seed is not None or rng is not None
+    rng = _resolve_rng(seed, rng)
+    if profiler is None:
+        profiler = NULL_PROFILER
+
+    with profiler.stage("pools"):
+        # An unseeded run shares the cached unseeded address pool, a seeded run gets its own from rng
+        schedule = get_schedule(schedule)
+        if roster is None:
+            roster = build_roster(num_names, shifts=schedule.shifts, rng=rng if seeded else None)
+        if address_pool is None:
+            address_pool = generate_addresses(num_addresses, rng=rng if seeded else None)
+
+        start_date, end_date, date_range = _resolve_date_range(start_date, end_date)
+        context = _chunk_context(start_date, roster, address_pool, problem_catalog, schedule, rate_table)
+
+    with profiler.stage("arrivals", num_records):
+        # Generate the event times in order from the hourly rate table, with no sort, as offsets from start_date
+        start_seconds = _epoch_seconds(start_date)
+        random_seconds = (
+            generate_arrivals(start_seconds, start_seconds + date_range, num_records, rng, rate_table) - start_seconds
+        )
+
+    df_full = _build_chunk(random_seconds, context, rng, profiler)
+    if simulate:
+        simulator = StaffingSimulator(context["call_taker_ids"], context["dispatcher_ids"], schedule.shifts)
+        (df_full,) = _simulate_staffing([df_full], simulator, profiler)
+    with profiler.stage("ids", num_records):
+        _assign_call_ids(df_full, CallIdAllocator(digits=_call_id_digits(num_records)))
+    with profiler.stage("names", num_records):
+        # The whole table is returned, so this is where its names are written in
+        df_full = add_staff_names(df_full, roster)
+
+    return df_full, roster.names_by_shift(CALL_TAKER), roster.names_by_shift(DISPATCHER)
+
+
+def iter_911_chunks(
+    num_records=10000,
+    start_date=None,
+    end_date=None,
+    num_names=8,
+    chunk_size=100000,
+    call_taker_names=None,
+    dispatcher_names=None,
+    seed=None,
+    workers=1,
+    rng=None,
+    num_addresses=2500,
+    address_pool=None,
+    profiler=None,
+    rate_table=None,
+    simulate=False,
+    units=False,
+    problem_catalog=None,
+    schedule=None,
+    roster=None,
+):
+    """
+    This function generates the same data as generate_911_data, but yields it as a series of DataFrame chunks so that
+    peak memory depends on chunk_size rather than num_records.
 
-    # Assign dispatcher based on shift
-    for shift in ["A", "B", "C", "D"]:
-        mask = df_full["shift"] == shift
-        count = mask.sum()
-        if count > 0:
-            df_full.loc[mask, "dispatcher"] = np.random.choice(dispatcher_names[shift], size=count)
-
-    mu = 3.5
-    sigma = 1.2
-
-    # Generate columns with distributions
-    df_full["queue_time"] = np.random.lognormal(
-        mean=mu, sigma=sigma, size=len(df_full)
-    ).astype(int)
-    df_full["queue_time"] = (
-        df_full["queue_time"] * 200 / df_full["queue_time"].mean()
-    ).astype(int)
-    df_full["queue_time"] = df_full["queue_time"].clip(lower=0, upper=90)
-
-    # dispatch_time
-    df_full["dispatch_time"] = (
-        np.random.chisquare(df=5, size=len(df_full)) * 2
-    ).astype(int)
-    df_full["dispatch_time"] = df_full["dispatch_time"].clip(lower=5, upper=600)
-
-    # More varied phone_time using gamma
-    # Vectorized generation without concatenation if possible, but concat is fine here
-    # To keep it simple and fast, we can generate all at once with a mix, but the original logic split 80/20.
-    # Let's keep the logic but optimize if needed. Concat is fast enough.
-    n_fast = int(len(df_full) * 0.8)
-    n_slow = len(df_full) - n_fast
-    
-    phone_time_fast = np.random.exponential(scale=80, size=n_fast)
-    phone_time_slow = np.random.gamma(shape=2, scale=200, size=n_slow)
-    # Shuffle to mix them up since we are concatenating
-    phone_times = np.concatenate([phone_time_fast, phone_time_slow])
-    np.random.shuffle(phone_times)
-    df_full["phone_time"] = phone_times.astype(int)
-
-    # ack_time describes the time from the first dispatch to the time the unit marks enroute
-    shape, scale = 2.0, 30.0
-    df_full["ack_time"] = np.random.gamma(shape, scale, size=len(df_full)).astype(int)
-    df_full["ack_time"] = df_full["ack_time"].clip(lower=2, upper=40)
-
-    # More varied enroute_time using gamma with different parameters
-    shape, scale = 6.0, 70.0
-    df_full["enroute_time"] = np.random.gamma(shape, scale, size=len(df_full)).astype(
-        int
-    )
-    df_full["enroute_time"] = df_full["enroute_time"].clip(lower=300, upper=900)
+    The date range is split into clock-hour buckets, and one multinomial draw over the rate_table weights gives the number
+    of calls in every hour. Consecutive hours are then grouped into chunks of about chunk_size calls, and each chunk
+    places its calls in time order inside its hours, so event_time is sorted within every chunk and across chunks without
+    ever sorting. A chunk can be larger than chunk_size when a single hour holds more calls than that.
 
-    # More varied on_scene_time using gamma with heavy tail
-    shape, scale = 3.0, 800.0
-    df_full["on_scene_time"] = np.random.gamma(shape, scale, size=len(df_full)).astype(
-        int
-    )
-    df_full["on_scene_time"] = df_full["on_scene_time"].clip(lower=300, upper=7200)
+    Every chunk draws from its own child of a numpy SeedSequence, so the chunks can be built in any process and the
+    output for a given seed and chunk_size is identical no matter how many workers are used.
+
+    Args:
+        num_records (int, optional): The total number of records to generate. Defaults to 10000.
+        start_date (str or datetime, optional): The start of the date range. Defaults to 2024-01-01.
+        end_date (str or datetime, optional): The end of the date range. Defaults to 2024-12-31.
+        num_names (int, optional): The number of names per shift, used when no roster is passed in. Defaults to 8.
+        chunk_size (int, optional): The target number of records per chunk. Defaults to 100000.
+        call_taker_names (dict, optional): Call taker names per shift, turned into a roster with StaffRoster.from_names.
+        dispatcher_names (dict, optional): Dispatcher names per shift, used with call_taker_names.
+        seed (int, optional): The seed for the run. Defaults to fresh entropy from the operating system.
+        workers (int, optional): The number of worker processes. Defaults to 1, which generates in this process.
+        rng (numpy.random.Generator, optional): An existing Generator to derive the run's seed streams from instead of a seed.
+        num_addresses (int, optional): The size of the address pool. Defaults to 2500.
+        address_pool (list, AddressPool or str, optional): The addresses to sample from instead of a Faker pool. An
+            AddressPool is memory-mapped, and worker processes reopen it rather than receiving a copy.
+        profiler (StageProfiler, optional): Records the wall time, rows and memory of each stage, added up over all
+            chunks. Chunks built in worker processes are profiled there and merged in as they arrive.
+        rate_table (array-like, optional): Relative call rates by day of week and hour, as for generate_911_data.
+        simulate (bool, optional): Use the staffing simulation, as for generate_911_data. It runs in this process, in
+            event_time order, so the staff carry their workload from one chunk to the next.
+        units (bool or UnitRoster, optional): Also build the unit response table from units.UnitResponder, using the
+            default roster for True. The units' busy time carries over between chunks. Defaults to False.
+        problem_catalog (ProblemCatalog or str, optional): The problem catalog, as for generate_911_data.
+        schedule (ShiftSchedule, dict or str, optional): The shift rotation, as for generate_911_data. Rosters passed
+            in must have staff on every shift of the schedule.
+        roster (StaffRoster, optional): The call takers and dispatchers, shared by every chunk. Defaults to
+            rosters.build_roster with num_names per shift. The chunks only carry employee IDs, so pass the same roster
+            to write_911_chunks to write the names.
+
+    Yields:
+        pandas.DataFrame: The next chunk of records in event_time order, with call_taker_id and dispatcher_id columns
+            but no names. With units, a (calls, unit_responses) pair of
+            DataFrames, where unit_responses links to calls by call_id.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive number")
+    if workers <= 0:
+        raise ValueError("workers must be a positive number")
+
+    seeded = seed is not None or rng is not None
+    rng = _resolve_rng(seed, rng)
+    if profiler is None:
+        profiler = NULL_PROFILER
+
+    # Seed streams for the hourly counts, the pools, the chunks and the unit responses
+    root_seed = np.random.SeedSequence(int(rng.integers(2**63)))
+    count_seed, roster_seed, address_seed, chunk_root_seed, unit_seed = root_seed.spawn(5)
+
+    with profiler.stage("pools"):
+        schedule = get_schedule(schedule)
+        if roster is None and call_taker_names is not None and dispatcher_names is not None:
+            roster = StaffRoster.from_names(call_taker_names, dispatcher_names, schedule.shifts)
+        elif roster is None:
+            roster = build_roster(
+                num_names, shifts=schedule.shifts, rng=np.random.default_rng(roster_seed) if seeded else None
+            )
+        if address_pool is None:
+            address_pool = generate_addresses(num_addresses, rng=np.random.default_rng(address_seed) if seeded else None)
+
+        start_date, end_date, date_range = _resolve_date_range(start_date, end_date)
+        context = _chunk_context(start_date, roster, address_pool, problem_catalog, schedule, rate_table)
+    with profiler.stage("arrivals"):
+        # Draw the calls per hour for the whole range, with the bucket edges as offsets from start_date
+        start_seconds = _epoch_seconds(start_date)
+        edges, weights = hour_buckets(start_seconds, start_seconds + date_range, rate_table)
+        edges -= start_seconds
+        counts = bucket_counts(weights, num_records, np.random.default_rng(count_seed))
+
+        # Cut the hours into chunks of about chunk_size calls
+        num_chunks = max(1, -(-num_records // chunk_size))
+        cuts = np.searchsorted(np.cumsum(counts), np.arange(1, num_chunks) * chunk_size) + 1
+        bucket_bounds = np.unique(np.r_[0, cuts, len(counts)])
+        chunk_seeds = chunk_root_seed.spawn(len(bucket_bounds) - 1)
+
+        specs = [
+            (edges[first:last + 1], counts[first:last], chunk_seed)
+            for first, last, chunk_seed in zip(bucket_bounds[:-1], bucket_bounds[1:], chunk_seeds)
+            if counts[first:last].sum() > 0
+        ]
+
+    # Call IDs are allocated here, in event_time order, so the per-agency sequences run on across chunks and workers
+    allocator = CallIdAllocator(digits=_call_id_digits(num_records))
+    chunks = _iter_chunk_results(specs, context, workers, profiler)
+    if simulate:
+        simulator = StaffingSimulator(context["call_taker_ids"], context["dispatcher_ids"], schedule.shifts)
+        chunks = _simulate_staffing(chunks, simulator, profiler)
+    responder = None
+    if units is not False and units is not None:
+        unit_roster = units if isinstance(units, UnitRoster) else None
+        responder = UnitResponder(unit_roster, np.random.default_rng(unit_seed))
+
+    for chunk in chunks:
+        with profiler.stage("ids", len(chunk)):
+            _assign_call_ids(chunk, allocator)
+        if responder is None:
+            yield chunk
+            continue
+        # Units are sent in the parent, in event_time order, so their busy time carries across chunks
+        with profiler.stage("units", len(chunk)):
+            unit_responses = responder.respond(chunk)
+        yield chunk, unit_responses
+
+
+def _iter_chunk_results(specs, context, workers, profiler=NULL_PROFILER):
+    """
+    Build the chunks for the window specs in order, either in this process or in a process pool.
+    """
+    if workers == 1:
+        for spec in specs:
+            yield _generate_chunk(spec, context, profiler)
+        return
+
+    # Workers profile their own chunks and send the stage records back with them
+    profile = profiler.memory if profiler.enabled else False
+
+    # Keep a few chunks in flight per worker so memory stays bounded by chunk_size.
+    # The windows do not overlap, so yielding the results in submission order merges them in event_time order.
+    # Only runs with workers start the process pool machinery
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(context, profile)
+    ) as executor:
+        pending = collections.deque()
+        for spec in specs:
+            pending.append(executor.submit(_generate_chunk_in_worker, spec))
+            if len(pending) >= 2 * workers:
+                chunk, records = pending.popleft().result()
+                profiler.merge(records)
+                yield chunk
+        while pending:
+            chunk, records = pending.popleft().result()
+            profiler.merge(records)
+            yield chunk
+
+
+def _simulate_staffing(chunks, simulator, profiler=NULL_PROFILER):
+    """
+    Run chunks through the staffing simulation in order, rebuilding the totals and time stamps of each finished chunk.
+    A chunk comes out once all of its calls have been dispatched, which can be after the next chunk goes in.
+    """
+    def rebuild(finished):
+        for chunk in finished:
+            _add_derived_times(chunk, chunk["event_time"].to_numpy().astype("datetime64[s]").view(np.int64))
+        return finished
 
-    # Add process_time column - sum of queue_time and dispatch_time
-    df_full["process_time"] = df_full["queue_time"] + df_full["dispatch_time"]
+    for chunk in chunks:
+        with profiler.stage("simulation", len(chunk)):
+            finished = rebuild(simulator.push(chunk))
+        yield from finished
+    with profiler.stage("simulation"):
+        finished = rebuild(simulator.finish())
+    yield from finished
 
-    df_full["total_time"] = (
-        df_full["queue_time"]
-        + df_full["dispatch_time"]
-        + df_full["ack_time"]
-        + df_full["enroute_time"]
-        + df_full["on_scene_time"]
-    )
+
+def _call_id_digits(num_records):
+    """
+    Pick a sequence width that can never overflow, since no agency-year can have more calls than the whole run.
+    """
+    return max(6, len(str(num_records)))
+
+
+def _assign_call_ids(df_full, allocator):
+    """
+    Add the call_id column as the first column of a chunk.
+    """
+    years = df_full["event_time"].to_numpy().astype("datetime64[Y]").astype(np.int64) + 1970
+    df_full.insert(0, "call_id", allocator.allocate(df_full["agency"].cat.codes.to_numpy(), years))
+
+
+def _chunk_context(start_date, roster, address_pool, problem_catalog=None, schedule=None, rate_table=None):
+    """
+    Collect the settings shared by every chunk. The address pool, problem catalog and shift schedule are passed along
+    explicitly so that worker processes sample from the same addresses, problems and rotation as the parent. Only the
+    employee IDs of the roster are passed, one array per shift in schedule order, since chunks never hold names. The
+    load of each hour of the week, which sets how long calls ring, comes from the same rate table as the arrivals.
+    """
+    schedule = get_schedule(schedule)
+    staff_ids = []
+    for role in (CALL_TAKER, DISPATCHER):
+        ids_by_shift = roster.ids_by_shift(role)
+        missing = [shift for shift in schedule.shifts if not len(ids_by_shift.get(shift, ()))]
+        if missing:
+            raise ValueError(f"The roster has no staff for shifts {', '.join(missing)} of the schedule")
+        staff_ids.append({shift: ids_by_shift[shift] for shift in schedule.shifts})
+    if isinstance(address_pool, str):
+        address_pool = AddressPool(address_pool)
+    if problem_catalog is None:
+        problem_catalog = get_problem_catalog()
+    elif isinstance(problem_catalog, str):
+        problem_catalog = get_problem_catalog(problem_catalog)
+    return {
+        "start_date": start_date,
+        "call_taker_ids": staff_ids[0],
+        "dispatcher_ids": staff_ids[1],
+        "address_pool": address_pool,
+        "problem_catalog": problem_catalog,
+        "schedule": schedule,
+        "answer_load": load_table(rate_table).ravel(),
+    }
+
+
+def _generate_chunk(spec, context, profiler=NULL_PROFILER):
+    """
+    Build one chunk from its (edges, counts, seed) spec, where counts[i] calls fall between edges[i] and edges[i + 1].
+    """
+    edges, counts, chunk_seed = spec
+    rng = np.random.default_rng(chunk_seed)
+    with profiler.stage("arrivals", counts.sum()):
+        random_seconds = arrival_times(edges, counts, rng)
+    return _build_chunk(random_seconds, context, rng, profiler)
+
+
+_worker_context = None
+_worker_profile = False
+
+
+def _init_worker(context, profile=False):
+    """
+    Store the shared settings once per worker process. profile is False for no profiling, otherwise the memory mode.
+    """
+    global _worker_context, _worker_profile
+    _worker_context = context
+    _worker_profile = profile
+
+
+def _generate_chunk_in_worker(spec):
+    if _worker_profile is False:
+        return _generate_chunk(spec, _worker_context), []
+    with StageProfiler(memory=_worker_profile) as profiler:
+        chunk = _generate_chunk(spec, _worker_context, profiler)
+    return chunk, profiler.records()
+
+
+def write_911_chunks(
+    output_file,
+    chunks,
+    output_format=None,
+    timestamp_format="default",
+    profiler=None,
+    units_output_file=None,
+    roster=None,
+):
+    """
+    This function writes the chunks from iter_911_chunks straight to disk, so only one chunk is held in memory at a time.
+    When the chunks carry unit responses, those are streamed to units_output_file in the same format. With the run's
+    roster, the call_taker and dispatcher names are added to each chunk as it is written.
+
+    Args:
+        output_file (str): The output file path.
+        chunks (iterable): The DataFrame chunks to write, in order.
+        output_format (str, optional): csv, parquet or feather. Defaults to the format matching the file extension.
+        timestamp_format (str, optional): default ('YYYY-MM-DD HH:MM:SS'), iso8601 or epoch. Defaults to "default".
+        profiler (StageProfiler, optional): Records the formatting and write stages.
+        units_output_file (str, optional): The file for the unit responses, required when the chunks are
+            (calls, unit_responses) pairs from iter_911_chunks(units=True).
+        roster (StaffRoster, optional): The roster passed to iter_911_chunks. Without it only the employee IDs are
+            written.
+
+    Returns:
+        int: The total number of records written.
+    """
+    if output_format is None:
+        output_format = output_format_from_path(output_file)
+    with ChunkWriter(
+        output_file,
+        output_format,
+        categorical_columns=CATEGORICAL_COLUMNS,
+        timestamp_columns=DATETIME_COLUMNS,
+        timestamp_format=timestamp_format,
+        profiler=profiler,
+    ) as writer, contextlib.ExitStack() as stack:
+        unit_writer = None
+        if units_output_file is not None:
+            unit_writer = stack.enter_context(
+                ChunkWriter(
+                    units_output_file,
+                    output_format,
+                    categorical_columns=UNIT_CATEGORICAL_COLUMNS,
+                    timestamp_columns=UNIT_DATETIME_COLUMNS,
+                    timestamp_format=timestamp_format,
+                    profiler=profiler,
+                )
+            )
+        for chunk in chunks:
+            if isinstance(chunk, tuple):
+                chunk, unit_responses = chunk
+                if unit_writer is None:
+                    raise ValueError("The chunks include unit responses, so units_output_file is required")
+                unit_writer.write(unit_responses)
+            if roster is not None:
+                with writer.profiler.stage("names", len(chunk)):
+                    chunk = add_staff_names(chunk, roster)
+            writer.write(chunk)
+    return writer.rows_written
+
+
+def _build_chunk(random_seconds, context, rng, profiler=NULL_PROFILER):
+    """
+    This function builds the DataFrame for a block of sorted event offsets. Every column other than event_time is drawn
+    independently per row, so a chunk can be built without knowing anything about the other chunks.
+
+    Args:
+        random_seconds (numpy.ndarray): Sorted event offsets in seconds from start_date.
+        context (dict): The shared run settings from _chunk_context.
+        rng (numpy.random.Generator): The random stream for this chunk.
+        profiler (StageProfiler, optional): Records the time and memory of each column group. Defaults to no profiling.
+
+    Returns:
+        pandas.DataFrame: The generated records.
+    """
+    num_records = len(random_seconds)
+    start_date = context["start_date"]
+    call_taker_ids = context["call_taker_ids"]
+    dispatcher_ids = context["dispatcher_ids"]
+    address_pool = context["address_pool"]
+    problem_catalog = context["problem_catalog"]
+    schedule = context["schedule"]
+
+    # The low-cardinality columns are built as pandas Categoricals straight from integer codes into the
+    # lookup lists, so no per-row string array is ever created.
+    # Every column is collected as an array in columns, in output order, and the DataFrame is assembled once at the end.
+    # call_id is added by _assign_call_ids once the chunk is back in event_time order with the others
+    columns = {}
+
+    with profiler.stage("events", num_records):
+        # Define the probabilities for each agency, in the same order as the problem catalog's agencies
+        probabilities = [0.72, 0.17, 0.11]
+        agencies = problem_catalog.agencies
+
+        # Generate the agency codes with the specified distribution
+        agency_codes = rng.choice(len(agencies), size=num_records, p=probabilities)
+
+        # Time stamps are kept as int64 epoch seconds and only viewed as datetime64[s], which needs no per-row conversion
+        event_seconds = np.datetime64(start_date, "s").astype(np.int64) + random_seconds.astype(np.int64)
+
+        columns["agency"] = pd.Categorical.from_codes(agency_codes, categories=agencies)
+        columns["event_time"] = event_seconds.view("datetime64[s]")
+
+    with profiler.stage("calendar", num_records):
+        # Every calendar column comes from integer arithmetic on the epoch seconds and small lookup tables
+        calendar = _calendar_fields(event_seconds)
+        hour = calendar["hour"]
+        columns["day_of_year"] = calendar["day_of_year"]
+        columns["week_no"] = calendar["week_no"]
+        columns["hour"] = hour
+        columns["day_night"] = pd.Categorical.from_codes(_DAY_NIGHT_BY_HOUR[hour], categories=["DAY", "NIGHT"])
+        columns["dow"] = pd.Categorical.from_codes(calendar["dow"], categories=DAYS_OF_WEEK)
+
+    with profiler.stage("shift", num_records):
+        # Look the shift and shift_part up in the schedule's hour-of-cycle tables
+        shifts = schedule.shifts
+        shift_codes, part_codes = schedule.lookup(event_seconds)
+        columns["shift"] = pd.Categorical.from_codes(shift_codes, categories=shifts)
+        columns["shift_part"] = pd.Categorical.from_codes(part_codes, categories=schedule.parts)
+
+    with profiler.stage("problems", num_records):
+        # Assign problem type based on agency
+        # One weighted draw from the catalog picks every call's problem from its own agency's problems
+        problem_codes = problem_catalog.sample(agency_codes, rng)
+        columns["problem"] = pd.Categorical.from_codes(problem_codes, categories=problem_catalog.categories)
+
+    with profiler.stage("addresses", num_records):
+        # Add address column with a street address
+        if isinstance(address_pool, AddressPool):
+            # Only the sampled rows of a memory-mapped pool are read and decoded
+            address_ids = address_pool.sample(rng, num_records)
+            columns["address"] = address_pool.addresses_at(address_ids)
+            columns["address_id"] = address_ids
+            columns.update(address_pool.columns_at(address_ids))
+        else:
+            # Use the pre-generated address list
+            columns["address"] = pd.Categorical.from_codes(
+                rng.integers(0, len(address_pool), size=num_records), categories=address_pool
+            )
+
+    with profiler.stage("priority", num_records):
+        # Add priority_number column, drawn from the response profile of each call's problem
+        columns["priority_number"] = problem_catalog.sample_priorities(problem_codes, rng)
+
+    with profiler.stage("staffing", num_records):
+        # Assign a call_taker from each call's shift, with one draw for all the shifts. Staff are kept as employee IDs,
+        # and their names are only looked up when the table is written
+        columns["call_taker_id"] = _sample_within_groups([call_taker_ids[shift] for shift in shifts], shift_codes, rng)
+
+        # Define the probabilities for each call reception method
+        probabilities_reception = [0.55, 0.20, 0.10, 0.10, 0.05]
+
+        # Define the call reception categories
+        reception_methods = ["E-911", "PHONE", "OFFICER", "TEXT", "C2C"]
+
+        # Generate the call_reception column with the specified distribution
+        columns["call_reception"] = pd.Categorical.from_codes(
+            rng.choice(len(reception_methods), size=num_records, p=probabilities_reception),
+            categories=reception_methods,
+        )
+
+        # Assign dispatcher based on shift
+        columns["dispatcher_id"] = _sample_within_groups([dispatcher_ids[shift] for shift in shifts], shift_codes, rng)
+
+    with profiler.stage("durations", num_records):
+        # answer_time is how long the call rang. Calls wait longer in the busy hours of the week, when more of them find
+        # every call taker busy. The ring time is part of both the queue time and the phone time.
+        answer_time = draw_answer_times(context["answer_load"][calendar["dow"].astype(np.int64) * 24 + hour], rng)
+        columns["answer_time"] = answer_time
+
+        # Each duration is drawn from one shared distribution and then scaled by the response profile of the call's
+        # problem, looked up by problem code
+        def scaled(values, stage):
+            return (values * problem_catalog.duration_scale(problem_codes, stage)).astype(np.int64)
+
+        mu = 3.5
+        sigma = 1.2
+
+        # Generate columns with distributions
+        queue_time = rng.lognormal(mean=mu, sigma=sigma, size=num_records).astype(np.int64)
+        queue_time = (queue_time * 200 / queue_time.mean()).astype(np.int64)
+        columns["queue_time"] = answer_time + scaled(np.clip(queue_time, 0, 90), "queue")
+
+        # dispatch_time
+        dispatch_time = (rng.chisquare(df=5, size=num_records) * 2).astype(np.int64)
+        columns["dispatch_time"] = scaled(np.clip(dispatch_time, 5, 600), "dispatch")
+
+        # More varied phone_time using gamma
+        # 80% of calls are quick and exponential, and the other 20% are long and drawn from a gamma. Picking the slow
+        # calls with one uniform draw mixes the two without concatenating and shuffling
+        phone_time = rng.exponential(scale=80, size=num_records)
+        slow = rng.random(num_records) < 0.2
+        phone_time[slow] = rng.gamma(shape=2, scale=200, size=int(slow.sum()))
+        columns["phone_time"] = answer_time + phone_time.astype(np.int64)
+
+        # The unit times come from the gamma distributions in units.UNIT_TIME_DISTRIBUTIONS, which extra units share
+        # ack_time describes the time from the first dispatch to the time the unit marks enroute
+        columns["ack_time"] = draw_unit_times("ack_time", rng, num_records)
+
+        # More varied enroute_time using gamma with different parameters
+        columns["enroute_time"] = scaled(draw_unit_times("enroute_time", rng, num_records), "enroute")
+
+        # More varied on_scene_time using gamma with heavy tail
+        columns["on_scene_time"] = scaled(draw_unit_times("on_scene_time", rng, num_records), "on_scene")
+
+    with profiler.stage("timestamps", num_records):
+        columns.update(_derived_times(columns, event_seconds))
+
+        # The time stamp columns stay datetime64[s]. The output writer formats them for CSV,
+        # and the binary formats store them as native timestamps or epoch seconds.
+        df_full = pd.DataFrame(columns, copy=False)
+
+    return df_full
+
+
+def _calendar_fields(event_seconds):
+    """
+    Work out the calendar columns of epoch-second event times with integer arithmetic. The date parts are only computed
+    once per run of equal days, which for sorted event times is once per day, and then repeated out to the rows.
+
+    Args:
+        event_seconds (numpy.ndarray): int64 epoch seconds.
+
+    Returns:
+        dict: int32 day_of_year (1-366), uint32 ISO week_no, int8 dow (Monday = 0) and int32 hour arrays.
+    """
+    event_seconds = np.asarray(event_seconds, dtype=np.int64)
+    days = event_seconds // 86400
+    hour = (event_seconds // 3600 % 24).astype(np.int32)
+
+    # One entry per run of equal days
+    run_starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if len(days) else np.empty(0, dtype=np.int64)
+    run_lengths = np.diff(np.r_[run_starts, len(days)])
+    run_days = days[run_starts]
+
+    dow = (run_days + EPOCH_WEEKDAY) % 7
+    day_of_year = run_days - _year_start(run_days) + 1
+    # The ISO week belongs to the year of its Thursday, and counts the weeks from that year's first Thursday
+    thursday = run_days - dow + 3
+    week_no = (thursday - _year_start(thursday)) // 7 + 1
+
+    return {
+        "day_of_year": np.repeat(day_of_year.astype(np.int32), run_lengths),
+        "week_no": np.repeat(week_no.astype(np.uint32), run_lengths),
+        "dow": np.repeat(dow.astype(np.int8), run_lengths),
+        "hour": hour,
+    }
+
+
+def _year_start(days):
+    """
+    Return the epoch day of 1 January of the year each epoch day falls in.
+    """
+    return days.astype("datetime64[D]").astype("datetime64[Y]").astype("datetime64[D]").astype(np.int64)
+
+
+def _add_derived_times(df_full, event_seconds):
+    """
+    Replace process_time, total_time and the event time stamps of a chunk. The staffing simulation calls this after it
+    replaces the queue, dispatch and phone times.
+    """
+    for name, values in _derived_times(df_full, event_seconds).items():
+        df_full[name] = values
+
+
+def _derived_times(columns, event_seconds):
+    """
+    Work out process_time, total_time and the event time stamps from the duration columns.
+
+    Args:
+        columns (dict or pandas.DataFrame): The duration columns.
+        event_seconds (numpy.ndarray): int64 epoch seconds of the events.
+
+    Returns:
+        dict: The new columns, in output order.
+    """
+    def duration(col):
+        return np.asarray(columns[col], dtype=np.int64)
+
+    # process_time is the sum of queue_time and dispatch_time
+    process_time = duration("queue_time") + duration("dispatch_time")
+    total_time = process_time + duration("ack_time") + duration("enroute_time") + duration("on_scene_time")
+
+    # Build the time stamps with integer arithmetic on the epoch seconds
 
     # Time stamp for when call was sent to dispatch queue
-    df_full["time_call_queued"] = df_full["event_time"] + pd.to_timedelta(
-        df_full["queue_time"], unit="s"
-    )
+    queued_seconds = event_seconds + duration("queue_time")
 
     # Time stamp for when call was dispatched to a unit
-    df_full["time_call_dispatched"] = df_full["time_call_queued"] + pd.to_timedelta(
-        df_full["dispatch_time"], unit="s"
-    )
+    dispatched_seconds = queued_seconds + duration("dispatch_time")
 
     # Time stamp for when unit acknowledged the call
-    df_full["time_call_acknowledged"] = df_full[
-        "time_call_dispatched"
-    ] + pd.to_timedelta(df_full["ack_time"], unit="s")
+    acknowledged_seconds = dispatched_seconds + duration("ack_time")
 
     # Time stamp for when phone call was disconnected
-    df_full["time_call_disconnected"] = df_full["event_time"] + pd.to_timedelta(
-        df_full["phone_time"], unit="s"
-    )
+    disconnected_seconds = event_seconds + duration("phone_time")
 
     # Time stamp for when unit arrived on scene
-    df_full["time_unit_enroute"] = df_full["time_call_acknowledged"] + pd.to_timedelta(
-        df_full["enroute_time"], unit="s"
-    )
+    enroute_seconds = acknowledged_seconds + duration("enroute_time")
 
     # Time stamp for close of call
-    df_full["time_call_closed"] = df_full["event_time"] + pd.to_timedelta(
-        df_full["total_time"], unit="s"
-    )
+    closed_seconds = event_seconds + total_time
 
-    # List all your datetime columns
-    datetime_cols = [
-        "event_time",
-        "time_call_queued",
-        "time_call_dispatched",
-        "time_call_acknowledged",
-        "time_call_disconnected",
-        "time_unit_enroute",
-        "time_call_closed",
-    ]
+    return {
+        "process_time": process_time,
+        "total_time": total_time,
+        "time_call_queued": queued_seconds.view("datetime64[s]"),
+        "time_call_dispatched": dispatched_seconds.view("datetime64[s]"),
+        "time_call_acknowledged": acknowledged_seconds.view("datetime64[s]"),
+        "time_call_disconnected": disconnected_seconds.view("datetime64[s]"),
+        "time_unit_enroute": enroute_seconds.view("datetime64[s]"),
+        "time_call_closed": closed_seconds.view("datetime64[s]"),
+    }
 
-    # Format each datetime column as 'MMMM-YY-DD HH:mm:ss'
-    for col in datetime_cols:
-        df_full[col] = df_full[col].dt.strftime("%Y-%m-%d %H:%M:%S")
 
-    return df_full, call_taker_names, dispatcher_names
+def _sample_within_groups(groups, group_codes, rng):
+    """
+    Draw one value per row, uniformly from the array of the row's group, for all the groups at once.
 
+    The groups are laid end to end in one flat array. Each row's pick is its group's offset into that array plus a
+    uniform draw scaled by the group's size, so one random draw and one gather fill every row with no per-group masks
+    or scans.
 
-class DateValidator(Validator):
-    def validate(self, document):
-        try:
-            datetime.strptime(document.text, '%Y-%m-%d')
-        except ValueError:
-            raise ValidationError(
-                message='Please enter a valid date in YYYY-MM-DD format',
-                cursor_position=len(document.text)
-            )
+    Args:
+        groups (list): A non-empty array of values for each group, such as the employee IDs on each shift.
+        group_codes (numpy.ndarray): The group of each row, as an index into groups.
+        rng (numpy.random.Generator): The random stream.
+
+    Returns:
+        numpy.ndarray: The value drawn for each row.
+    """
+    groups = [np.asarray(group) for group in groups]
+    sizes = np.array([len(group) for group in groups], dtype=np.int64)
+    if np.any(sizes == 0):
+        raise ValueError("Every group needs at least one value to sample from")
+    offsets = np.cumsum(sizes) - sizes
+    group_codes = np.asarray(group_codes)
+    picks = offsets[group_codes] + (rng.random(len(group_codes)) * sizes[group_codes]).astype(np.int64)
+    return np.concatenate(groups)[picks]
 
 
-def main():
+def _validate_date(value):
     """
-    This is the main entry point of the script. It provides an interactive command line interface
-    to generate 911 dispatch data and saves it to a CSV file.
+    Check a YYYY-MM-DD date for the interactive prompts, which show the returned message when it is not True.
     """
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return 'Please enter a valid date in YYYY-MM-DD format'
+    return True
+
+
+def interactive_settings():
+    """
+    Ask for the settings with PyInquirer prompts. PyInquirer, and the prompt_toolkit it loads, are only imported here,
+    so scripted runs start without them.
+
+    Returns:
+        argparse.Namespace: The settings, with the same names as the command line flags.
+    """
+    # Patch for PyInquirer compatibility with Python 3.10+
+    if not hasattr(collections, 'Mapping'):
+        collections.Mapping = collections.abc.Mapping
+    from PyInquirer import prompt
+
     questions = [
         {
             'type': 'input',
@@ -471,14 +885,14 @@ def main():
             'name': 'start_date',
             'message': 'Enter start date (YYYY-MM-DD):',
             'default': '2024-01-01',
-            'validate': DateValidator
+            'validate': _validate_date
         },
         {
             'type': 'input',
             'name': 'end_date',
             'message': 'Enter end date (YYYY-MM-DD):',
             'default': '2024-12-31',
-            'validate': DateValidator
+            'validate': _validate_date
         },
         {
             'type': 'input',
@@ -489,40 +903,181 @@ def main():
         },
         {
             'type': 'input',
-            'name': 'output_file',
+            'name': 'output',
             'message': 'Enter the output file path:',
             'default': 'computer_aided_dispatch.csv'
+        },
+        {
+            'type': 'list',
+            'name': 'format',
+            'message': 'Choose the output format:',
+            'choices': OUTPUT_FORMATS,
+            'default': 'csv'
+        },
+        {
+            'type': 'list',
+            'name': 'timestamp_format',
+            'message': 'Choose the time stamp format:',
+            'choices': TIMESTAMP_FORMATS,
+            'default': 'default'
+        },
+        {
+            'type': 'input',
+            'name': 'chunk_size',
+            'message': 'How many records should be generated and written at a time?',
+            'default': '100000',
+            'validate': lambda val: val.isdigit() and int(val) > 0 or 'Please enter a positive number'
+        },
+        {
+            'type': 'input',
+            'name': 'workers',
+            'message': 'How many worker processes should generate the data?',
+            'default': '1',
+            'validate': lambda val: val.isdigit() and int(val) > 0 or 'Please enter a positive number'
+        },
+        {
+            'type': 'input',
+            'name': 'seed',
+            'message': 'Enter a random seed (leave blank for a random run):',
+            'default': '',
+            'validate': lambda val: val == '' or val.isdigit() or 'Please enter a non-negative number'
+        },
+        {
+            'type': 'list',
+            'name': 'schedule',
+            'message': 'Choose the shift schedule:',
+            'choices': list(SCHEDULES)
+        },
+        {
+            'type': 'input',
+            'name': 'units_output',
+            'message': 'Enter a file path for the unit responses (leave blank to skip them):',
+            'default': ''
+        },
+        {
+            'type': 'confirm',
+            'name': 'simulate',
+            'message': 'Simulate call taker and dispatcher workload so queue times follow the load?',
+            'default': False
+        },
+        {
+            'type': 'confirm',
+            'name': 'profile',
+            'message': 'Print a timing report for each stage of the run?',
+            'default': False
         }
     ]
 
     answers = prompt(questions)
+    for key in ('num_records', 'num_names', 'chunk_size', 'workers'):
+        answers[key] = int(answers[key])
+    answers['seed'] = int(answers['seed']) if answers['seed'] else None
+    answers['units_output'] = answers['units_output'] or None
+    answers['roster_output'] = None
+    answers['quiet'] = False
+    return argparse.Namespace(**answers)
+
+
+def run(settings):
+    """
+    This function generates the data for a set of command line or prompt settings, streams it to disk and prints a
+    summary.
+
+    Args:
+        settings (argparse.Namespace): The settings from synth_cli.build_cad_parser or the interactive prompts.
 
-    # Generate data with specified number of names
-    df_full, call_taker_names, dispatcher_names = generate_911_data(
-        num_records=int(answers['num_records']),
-        start_date=answers['start_date'],
-        end_date=answers['end_date'],
-        num_names=int(answers['num_names'])
+    Returns:
+        int: The total number of records written.
+    """
+    # Build the roster once so every chunk shares the same staff
+    rng = np.random.default_rng(settings.seed) if settings.seed is not None else None
+    schedule = get_schedule(settings.schedule)
+    roster = build_roster(settings.num_names, shifts=schedule.shifts, rng=rng)
+    profiler = StageProfiler() if settings.profile else None
+
+    chunks = iter_911_chunks(
+        num_records=settings.num_records,
+        start_date=settings.start_date,
+        end_date=settings.end_date,
+        chunk_size=settings.chunk_size,
+        roster=roster,
+        workers=settings.workers,
+        rng=rng,
+        profiler=profiler,
+        simulate=settings.simulate,
+        units=settings.units_output is not None,
+        schedule=schedule,
     )
 
-    # Save the DataFrame to a CSV file
-    output_file = answers['output_file']
-    df_full.to_csv(output_file, index=False)
+    # Keep running totals for the summary so the full dataset never has to be in memory
+    summary_cols = ["phone_time", "process_time", "total_time"]
+    summary = pd.DataFrame(
+        {"count": 0, "sum": 0, "min": np.inf, "max": -np.inf}, index=summary_cols
+    )
 
-    print(f"\nCSV file saved to {output_file}")
-    print(f"Total records generated: {len(df_full)}")
+    def summarize(chunks):
+        for chunk in chunks:
+            calls = chunk[0] if isinstance(chunk, tuple) else chunk
+            values = calls[summary_cols]
+            summary["count"] += values.count()
+            summary["sum"] += values.sum()
+            summary["min"] = np.minimum(summary["min"], values.min())
+            summary["max"] = np.maximum(summary["max"], values.max())
+            yield chunk
+
+    # Stream the chunks straight to the output file
+    output_file = settings.output
+    output_format = settings.format or output_format_from_path(output_file)
+    total_records = write_911_chunks(
+        output_file,
+        summarize(chunks),
+        output_format,
+        settings.timestamp_format,
+        profiler,
+        units_output_file=settings.units_output,
+        roster=roster,
+    )
+    if settings.roster_output:
+        write_dataframe(roster.to_frame(), settings.roster_output, output_format, ["role", "shift"], profiler=profiler)
+    if profiler is not None:
+        profiler.close()
+    if settings.quiet:
+        return total_records
+
+    print(f"\n{output_format.upper()} file saved to {output_file}")
+    if settings.units_output:
+        print(f"Unit responses saved to {settings.units_output}")
+    if settings.roster_output:
+        print(f"Staff roster saved to {settings.roster_output}")
+    print(f"Total records generated: {total_records}")
 
     # Quick summary statistics of the new columns
+    summary["mean"] = summary["sum"] / summary["count"]
     print("\nSummary Statistics for New Columns:")
-    print(df_full[["phone_time", "process_time", "total_time"]].describe())
+    print(summary[["count", "mean", "min", "max"]].T)
+
+    # Rosters can run to thousands of people, so only the head count and seniority of each shift are printed
+    print("\nStaff per Shift:")
+    staff = roster.to_frame()
+    print(
+        staff.groupby(["role", "shift"], observed=True)["seniority"]
+        .agg(staff="count", mean_seniority="mean")
+        .round(1)
+    )
+
+    if profiler is not None:
+        print("\nStage Timings:")
+        print(profiler.report())
+    return total_records
+
 
-    print("\nCall Taker Names per Shift:")
-    for shift, names in call_taker_names.items():
-        print(f"Shift {shift}: {names}")
+def main(argv=None):
+    """
+    This is the main entry point of the script. See synth_cli.cad_main.
+    """
+    from synth_cli import cad_main
 
-    print("\nDispatcher Names per Shift:")
-    for shift, names in dispatcher_names.items():
-        print(f"Shift {shift}: {names}")
+    cad_main(argv)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+import os
+
+# This module only holds the names of the output formats, so the command line can list them without loading numpy
+
+OUTPUT_FORMATS = ["csv", "parquet", "feather"]
+
+# Layouts for time stamp columns:
+# - default: 'YYYY-MM-DD HH:MM:SS', the layout the CAD files have always used
+# - iso8601: 'YYYY-MM-DDTHH:MM:SS'
+# - epoch: integer seconds since 1970-01-01
+TIMESTAMP_FORMATS = ["default", "iso8601", "epoch"]
+
+# File extensions used to pick a format when none is given
+FORMAT_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+}
+
+
+def output_format_from_path(output_file, default="csv"):
+    """
+    This function picks the output format from the extension of the output file.
+
+    Args:
+        output_file (str): The output file path.
+        default (str, optional): The format used when the extension is not recognised. Defaults to "csv".
+
+    Returns:
+        string: One of OUTPUT_FORMATS.
+    """
+    extension = os.path.splitext(output_file)[1].lower()
+    return FORMAT_EXTENSIONS.get(extension, default)
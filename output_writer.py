@@ -0,0 +1,272 @@
+import numpy as np
+
+# The format names live in output_formats so the command line can use them without numpy, and are re-exported here
+from output_formats import FORMAT_EXTENSIONS, OUTPUT_FORMATS, TIMESTAMP_FORMATS, output_format_from_path
+from profiling import NULL_PROFILER
+
+# Two ASCII digits for every number from 0 to 99, used to fill the fixed-width time stamp buffer
+_DIGIT_PAIRS = np.array([f"{i:02d}" for i in range(100)], dtype="S2").view(np.uint8).reshape(100, 2)
+
+
+def _civil_from_days(days):
+    """
+    Convert days since 1970-01-01 to proleptic Gregorian (year, month, day) arrays with integer arithmetic only.
+    This follows Howard Hinnant's civil_from_days algorithm.
+    """
+    z = days + 719468
+    era = np.floor_divide(z, 146097)
+    day_of_era = z - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = np.where(shifted_month < 10, shifted_month + 3, shifted_month - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def format_timestamps(values, timestamp_format="default"):
+    """
+    This function formats an array of time stamps without creating a Python object per value. The fields are computed
+    from the epoch seconds with integer arithmetic and copied into a fixed-width byte buffer, which is several times
+    faster than Series.dt.strftime.
+
+    Args:
+        values (array-like): datetime64 values, or int64 epoch seconds. Sub-second parts are truncated.
+        timestamp_format (str, optional): One of TIMESTAMP_FORMATS. Defaults to "default".
+
+    Returns:
+        numpy.ndarray: int64 epoch seconds for "epoch", otherwise fixed-width strings.
+    """
+    if timestamp_format not in TIMESTAMP_FORMATS:
+        raise ValueError(f"Unknown timestamp format '{timestamp_format}'. Choose from {', '.join(TIMESTAMP_FORMATS)}.")
+
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        seconds = values.astype("datetime64[s]").view(np.int64)
+    else:
+        seconds = values.astype(np.int64)
+    if timestamp_format == "epoch":
+        return seconds
+
+    days, seconds_of_day = np.divmod(seconds, 86400)
+    year, month, day = _civil_from_days(days)
+    hour, seconds_of_hour = np.divmod(seconds_of_day, 3600)
+    minute, second = np.divmod(seconds_of_hour, 60)
+
+    # 'YYYY-MM-DD HH:MM:SS' is 19 bytes per value
+    buffer = np.empty((len(seconds), 19), dtype=np.uint8)
+    buffer[:, 0:2] = _DIGIT_PAIRS[year // 100]
+    buffer[:, 2:4] = _DIGIT_PAIRS[year % 100]
+    buffer[:, 5:7] = _DIGIT_PAIRS[month]
+    buffer[:, 8:10] = _DIGIT_PAIRS[day]
+    buffer[:, 11:13] = _DIGIT_PAIRS[hour]
+    buffer[:, 14:16] = _DIGIT_PAIRS[minute]
+    buffer[:, 17:19] = _DIGIT_PAIRS[second]
+    buffer[:, [4, 7]] = ord("-")
+    buffer[:, 10] = ord("T") if timestamp_format == "iso8601" else ord(" ")
+    buffer[:, [13, 16]] = ord(":")
+    return buffer.view("S19").ravel().astype("U19")
+
+
+def _import_pyarrow():
+    """
+    Import pyarrow on first use, since it is only needed for the binary formats.
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Writing parquet or feather files requires pyarrow. Install it with 'pip install pyarrow'."
+        ) from e
+    return pyarrow
+
+
+class ChunkWriter:
+    """
+    This class writes a dataset to disk one DataFrame chunk at a time, so the full dataset never has to be held in memory.
+
+    CSV chunks are appended to the file. Parquet chunks are appended as row groups, and feather chunks as record batches
+    of a single Arrow IPC file. For the binary formats, the listed categorical columns are stored dictionary-encoded and
+    datetime64 columns are stored as native timestamps.
+
+    Each categorical column keeps one growing list of categories across chunks, and new values are appended to the end.
+    Arrow IPC files only accept dictionary deltas, not replacements, so this is what lets feather files be written in
+    chunks.
+
+    The listed time stamp columns are written with format_timestamps for CSV. The binary formats keep them as native
+    timestamps, or store int64 epoch seconds when timestamp_format is "epoch".
+
+    Args:
+        output_file (str): The output file path.
+        output_format (str, optional): One of OUTPUT_FORMATS. Defaults to the format matching the file extension.
+        categorical_columns (list, optional): Columns to store as categoricals. Columns that are already categorical are always included.
+        row_group_size (int, optional): The maximum number of rows per parquet row group. Defaults to one row group per chunk.
+        timestamp_columns (list, optional): Time stamp columns to format. Other datetime columns are left to pandas and pyarrow.
+        timestamp_format (str, optional): One of TIMESTAMP_FORMATS. Defaults to "default".
+        profiler (StageProfiler, optional): Records the formatting and write stages of every chunk.
+    """
+
+    def __init__(
+        self,
+        output_file,
+        output_format=None,
+        categorical_columns=None,
+        row_group_size=None,
+        timestamp_columns=None,
+        timestamp_format="default",
+        profiler=None,
+    ):
+        if output_format is None:
+            output_format = output_format_from_path(output_file)
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}'. Choose from {', '.join(OUTPUT_FORMATS)}.")
+        if timestamp_format not in TIMESTAMP_FORMATS:
+            raise ValueError(f"Unknown timestamp format '{timestamp_format}'. Choose from {', '.join(TIMESTAMP_FORMATS)}.")
+
+        self.output_file = output_file
+        self.output_format = output_format
+        self.categorical_columns = list(categorical_columns or [])
+        self.timestamp_columns = list(timestamp_columns or [])
+        self.timestamp_format = timestamp_format
+        self.row_group_size = row_group_size
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        self.rows_written = 0
+        self._categories = {}
+        self._schema = None
+        self._writer = None
+
+    def write(self, df):
+        """
+        Append one chunk to the output file.
+
+        Args:
+            df (pandas.DataFrame): The chunk to write. Every chunk must have the same columns.
+        """
+        with self.profiler.stage("formatting", len(df)):
+            df = self._convert_timestamps(df)
+            if self.output_format != "csv":
+                df = self._align_categories(df)
+        with self.profiler.stage("write", len(df)):
+            if self.output_format == "csv":
+                df.to_csv(
+                    self.output_file,
+                    mode="w" if self.rows_written == 0 else "a",
+                    header=(self.rows_written == 0),
+                    index=False,
+                )
+            else:
+                self._write_arrow(df)
+        self.rows_written += len(df)
+
+    def close(self):
+        """
+        Finish the file. Nothing is written for the binary formats until the first chunk arrives.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _convert_timestamps(self, df):
+        """
+        Format the time stamp columns for CSV, or convert them to epoch seconds. Binary formats otherwise keep datetime64.
+        """
+        columns = [col for col in self.timestamp_columns if col in df.columns]
+        if not columns or (self.output_format != "csv" and self.timestamp_format != "epoch"):
+            return df
+        df = df.copy(deep=False)
+        for col in columns:
+            df[col] = format_timestamps(df[col].to_numpy(), self.timestamp_format)
+        return df
+
+    def _align_categories(self, df):
+        """
+        Convert the categorical columns so that their categories extend the categories of every earlier chunk.
+        """
+        df = df.copy(deep=False)
+        columns = self.categorical_columns + [
+            col for col in df.columns
+            if df[col].dtype == "category" and col not in self.categorical_columns
+        ]
+        for col in columns:
+            if col not in df.columns:
+                continue
+            values = df[col].astype("category")
+            known, known_set = self._categories.setdefault(col, ([], set()))
+            new = [c for c in values.cat.categories if c not in known_set]
+            known.extend(new)
+            known_set.update(new)
+            df[col] = values.cat.set_categories(known)
+        return df
+
+    def _write_arrow(self, df):
+        pa = _import_pyarrow()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        if self._writer is None:
+            # Fix the dictionary index width up front so that chunks with more categories still match the schema
+            fields = [
+                pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+                if pa.types.is_dictionary(field.type)
+                else field
+                for field in table.schema
+            ]
+            self._schema = pa.schema(fields, metadata=table.schema.metadata)
+            if self.output_format == "parquet":
+                self._writer = pa.parquet.ParquetWriter(self.output_file, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(
+                    self.output_file,
+                    self._schema,
+                    options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True),
+                )
+
+        table = table.cast(self._schema)
+        if self.output_format == "parquet":
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_table(table)
+
+
+def write_dataframe(
+    df,
+    output_file,
+    output_format=None,
+    categorical_columns=None,
+    timestamp_columns=None,
+    timestamp_format="default",
+    profiler=None,
+):
+    """
+    This function writes a whole DataFrame in one of OUTPUT_FORMATS.
+
+    Args:
+        df (pandas.DataFrame): The data to write.
+        output_file (str): The output file path.
+        output_format (str, optional): One of OUTPUT_FORMATS. Defaults to the format matching the file extension.
+        categorical_columns (list, optional): Columns to store as categoricals in the binary formats.
+        timestamp_columns (list, optional): Time stamp columns to format.
+        timestamp_format (str, optional): One of TIMESTAMP_FORMATS. Defaults to "default".
+        profiler (StageProfiler, optional): Records the formatting and write stages.
+
+    Returns:
+        int: The number of records written.
+    """
+    with ChunkWriter(
+        output_file,
+        output_format,
+        categorical_columns,
+        timestamp_columns=timestamp_columns,
+        timestamp_format=timestamp_format,
+        profiler=profiler,
+    ) as writer:
+        writer.write(df)
+    return writer.rows_written
@@ -0,0 +1,439 @@
+import json
+import os
+from importlib import metadata
+
+import numpy as np
+
+DEFAULT_LOCALE = "en_US"
+
+# Set this environment variable to move the on-disk pool cache
+CACHE_DIR_ENV = "SYNTH911_CACHE_DIR"
+
+# Pools already built or loaded in this process, keyed by (kind, locale, size, seed)
+_memory_cache = {}
+
+# Name word lists already read from Faker in this process, keyed by locale, and the arrays of their cache files
+_name_words = {}
+_NAME_WORD_KEYS = ["last_names", "last_probabilities", "first_names", "first_probabilities"]
+
+
+def default_cache_dir():
+    """
+    This function returns the directory used for cached pools, which is $SYNTH911_CACHE_DIR or ~/.cache/synth911gen.
+    """
+    return os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.expanduser("~"), ".cache", "synth911gen")
+
+
+def _faker(locale, seed):
+    """
+    Create a Faker instance for one pool. Faker is imported here so that it is only loaded when a pool is actually built.
+    """
+    from faker import Faker
+
+    faker = Faker(locale)
+    if seed is not None:
+        faker.seed_instance(seed)
+    return faker
+
+
+def build_address_pool(size=2500, seed=None, locale=DEFAULT_LOCALE):
+    """
+    This function generates a pool of unique street addresses with Faker.
+
+    Args:
+        size (int, optional): The number of addresses. Defaults to 2500.
+        seed (int, optional): The Faker seed. Defaults to an unseeded run.
+        locale (str, optional): The Faker locale. Defaults to en_US.
+
+    Returns:
+        list: The unique street addresses.
+    """
+    faker = _faker(locale, seed)
+    return [faker.unique.street_address() for _ in range(size)]
+
+
+def name_words(locale=DEFAULT_LOCALE, cache_dir=None):
+    """
+    This function reads Faker's last name and first name lists for a locale into numpy arrays, once per process. Faker
+    weights some lists by how common each name is, and those weights are kept as probabilities. Lists without weights
+    get equal ones. The arrays are also saved to the cache directory, keyed by locale and Faker version, so later runs
+    load them without importing Faker.
+
+    Args:
+        locale (str, optional): The Faker locale. Defaults to en_US.
+        cache_dir (str, optional): The cache directory. Defaults to default_cache_dir().
+
+    Returns:
+        tuple: (last_names, last_probabilities, first_names, first_probabilities) arrays.
+    """
+    if locale in _name_words:
+        return _name_words[locale]
+
+    path = os.path.join(cache_dir or default_cache_dir(), f"name-words-{locale}-faker{_faker_version()}.npz")
+    try:
+        with np.load(path) as cached:
+            words = tuple(cached[key] for key in _NAME_WORD_KEYS)
+    except (OSError, ValueError, KeyError):
+        import importlib
+
+        person_provider = importlib.import_module(f"faker.providers.person.{locale}").Provider
+        words = (*_weighted_words(person_provider.last_names), *_weighted_words(person_provider.first_names))
+        _save_cache_file(path, lambda f: np.savez(f, **dict(zip(_NAME_WORD_KEYS, words))))
+    _name_words[locale] = words
+    return words
+
+
+def _weighted_words(words):
+    """
+    Turn a Faker word list, either a sequence or a dict of word -> weight, into (words, probabilities) arrays.
+    """
+    if isinstance(words, dict):
+        weights = np.array(list(words.values()), dtype=np.float64)
+        words = list(words)
+    else:
+        words = list(dict.fromkeys(words))
+        weights = np.ones(len(words))
+    return np.array(words, dtype=str), weights / weights.sum()
+
+
+def draw_names(size, rng, locale=DEFAULT_LOCALE):
+    """
+    This function draws unique (last name, first name) pairs from the Faker word lists, with the same weights Faker
+    uses, without calling Faker once per name. Pairs that come up twice are redrawn together until every pair is
+    unique, which takes a round or two even for thousands of names.
+
+    Args:
+        size (int): The number of names.
+        rng (numpy.random.Generator): The random stream.
+        locale (str, optional): The Faker locale. Defaults to en_US.
+
+    Returns:
+        tuple: (last_codes, first_codes) int32 arrays of indices into the word lists from name_words.
+    """
+    last_names, last_p, first_names, first_p = name_words(locale)
+    if size > len(last_names) * len(first_names):
+        raise ValueError(f"A {locale} roster can hold at most {len(last_names) * len(first_names)} unique names")
+
+    last_codes = np.empty(size, dtype=np.int32)
+    first_codes = np.empty(size, dtype=np.int32)
+    redraw = np.arange(size)
+    while len(redraw):
+        last_codes[redraw] = rng.choice(len(last_names), size=len(redraw), p=last_p)
+        first_codes[redraw] = rng.choice(len(first_names), size=len(redraw), p=first_p)
+        # Keep the first row of every pair and redraw the later copies
+        pairs = last_codes.astype(np.int64) * len(first_names) + first_codes
+        first_seen = np.zeros(size, dtype=bool)
+        first_seen[np.unique(pairs, return_index=True)[1]] = True
+        redraw = np.flatnonzero(~first_seen)
+    return last_codes, first_codes
+
+
+def format_names(last_codes, first_codes, locale=DEFAULT_LOCALE):
+    """
+    This function composes "Last, First" names from word list indices, for all the names at once.
+
+    Args:
+        last_codes (numpy.ndarray): Indices into the last names of name_words.
+        first_codes (numpy.ndarray): Indices into the first names of name_words.
+        locale (str, optional): The Faker locale. Defaults to en_US.
+
+    Returns:
+        numpy.ndarray: The names as strings.
+    """
+    last_names, _, first_names, _ = name_words(locale)
+    return np.char.add(np.char.add(last_names[last_codes], ", "), first_names[first_codes])
+
+
+def build_name_pool(size=8, seed=None, locale=DEFAULT_LOCALE):
+    """
+    This function generates a pool of unique names in the format "Last, First" from Faker's word lists.
+
+    Args:
+        size (int, optional): The number of names. Defaults to 8.
+        seed (int, optional): The seed. Defaults to an unseeded run.
+        locale (str, optional): The Faker locale. Defaults to en_US.
+
+    Returns:
+        list: The names.
+    """
+    return format_names(*draw_names(size, np.random.default_rng(seed), locale), locale).tolist()
+
+
+def get_address_pool(size=2500, seed=None, locale=DEFAULT_LOCALE, cache_dir=None):
+    """
+    This function returns an address pool, building it on first use.
+
+    Every pool is saved to the cache directory, keyed by locale, size, seed and Faker version, so later runs load it from
+    disk instead of calling Faker thousands of times. Unseeded runs share one pool under the key "unseeded", like the
+    old module-level address_list, and only their sampling from it differs from run to run.
+
+    Args:
+        size (int, optional): The number of addresses. Defaults to 2500.
+        seed (int, optional): The Faker seed. Defaults to None.
+        locale (str, optional): The Faker locale. Defaults to en_US.
+        cache_dir (str, optional): The cache directory. Defaults to default_cache_dir().
+
+    Returns:
+        list: The unique street addresses.
+    """
+    return _cached_pool("addresses", build_address_pool, size, seed, locale, cache_dir)
+
+
+def get_name_pool(size=8, seed=None, locale=DEFAULT_LOCALE):
+    """
+    This function returns a name pool. Names are composed from the word lists in one vectorized draw, which is faster
+    than reading a cached pool, so nothing is saved to disk. A seed always gives the same names, and every unseeded
+    call gets new ones.
+
+    Args:
+        size (int, optional): The number of names. Defaults to 8.
+        seed (int, optional): The seed. Defaults to None.
+        locale (str, optional): The Faker locale. Defaults to en_US.
+
+    Returns:
+        list: The names in the format "Last, First".
+    """
+    return build_name_pool(size, seed, locale)
+
+
+def _faker_version():
+    try:
+        return metadata.version("faker")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _cache_path(kind, size, seed, locale, cache_dir):
+    """
+    Build the cache file path. The Faker version is part of the name because its word lists change between releases.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+    seed = "unseeded" if seed is None else seed
+    return os.path.join(cache_dir, f"{kind}-{locale}-{size}-{seed}-faker{_faker_version()}.npy")
+
+
+def _cached_pool(kind, builder, size, seed, locale, cache_dir):
+    key = (kind, locale, size, seed)
+    if key in _memory_cache:
+        return _memory_cache[key]
+
+    path = _cache_path(kind, size, seed, locale, cache_dir)
+    try:
+        pool = np.load(path).tolist()
+    except (OSError, ValueError):
+        pool = builder(size, seed, locale)
+        _save_pool(path, pool)
+
+    _memory_cache[key] = pool
+    return pool
+
+
+def _save_pool(path, pool):
+    """
+    Save a pool as a .npy string array.
+    """
+    _save_cache_file(path, lambda f: np.save(f, np.array(pool, dtype=str)))
+
+
+def _save_cache_file(path, save):
+    """
+    Write a cache file with save(f). The file is written under a temporary name and renamed, so concurrent runs never
+    read a partial file. The cache is only an optimisation, so failures to write it are ignored.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            save(f)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+class AddressPool:
+    """
+    This class is an on-disk address universe that is opened with numpy memory maps instead of being loaded into
+    Python objects, so pools with millions of addresses open instantly and use almost no memory.
+
+    A pool is a directory of .npy files:
+    - addresses.npy: fixed-width UTF-8 byte strings, one row per address
+    - optional numeric columns with one value per address, such as latitude.npy, longitude.npy, beat.npy and district.npy
+    - pool.json: the row count and the names of the numeric columns
+
+    Addresses are sampled by integer index, and strings are only decoded for the rows being written.
+
+    Args:
+        path (str): The pool directory.
+    """
+
+    ADDRESS_FILE = "addresses.npy"
+    META_FILE = "pool.json"
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, self.META_FILE)) as f:
+            meta = json.load(f)
+        self.column_names = list(meta["columns"])
+        self._addresses = np.load(os.path.join(path, self.ADDRESS_FILE), mmap_mode="r")
+        self._columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in self.column_names
+        }
+
+    @classmethod
+    def create(cls, path, addresses, **columns):
+        """
+        Write a pool directory and open it.
+
+        Args:
+            path (str): The pool directory. It is created if needed.
+            addresses (array-like): The address strings.
+            **columns: Numeric arrays with one value per address, for example latitude=..., beat=...
+
+        Returns:
+            AddressPool: The opened pool.
+        """
+        addresses = np.asarray(addresses)
+        if addresses.dtype.kind != "S":
+            addresses = np.char.encode(addresses.astype(str), "utf-8")
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, cls.ADDRESS_FILE), addresses)
+        for name, values in columns.items():
+            values = np.asarray(values)
+            if len(values) != len(addresses):
+                raise ValueError(f"Column '{name}' has {len(values)} values but the pool has {len(addresses)} addresses")
+            np.save(os.path.join(path, f"{name}.npy"), values)
+        with open(os.path.join(path, cls.META_FILE), "w") as f:
+            json.dump({"size": len(addresses), "columns": list(columns)}, f)
+        return cls(path)
+
+    def __len__(self):
+        return len(self._addresses)
+
+    def __getstate__(self):
+        # Memory maps would be pickled by value, so worker processes reopen the files instead
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def sample(self, rng, size):
+        """
+        Draw row indices uniformly from the pool.
+
+        Args:
+            rng (numpy.random.Generator): The random stream.
+            size (int): The number of rows.
+
+        Returns:
+            numpy.ndarray: int64 row indices.
+        """
+        return rng.integers(0, len(self), size=size)
+
+    def addresses_at(self, index):
+        """
+        Decode the address strings for the given rows only.
+
+        Args:
+            index (numpy.ndarray): Row indices.
+
+        Returns:
+            numpy.ndarray: The addresses as strings.
+        """
+        return np.char.decode(self._addresses[index], "utf-8")
+
+    def columns_at(self, index):
+        """
+        Read the numeric columns for the given rows only.
+
+        Args:
+            index (numpy.ndarray): Row indices.
+
+        Returns:
+            dict: Column name to values.
+        """
+        return {name: np.asarray(values[index]) for name, values in self._columns.items()}
+
+
+def build_city_pool(
+    path,
+    size=1000000,
+    seed=None,
+    locale=DEFAULT_LOCALE,
+    center=(38.9, -77.04),
+    spread=0.08,
+    beats_per_side=12,
+    districts_per_side=3,
+):
+    """
+    This function builds a city-scale AddressPool without calling Faker once per address. Street names are made from
+    Faker's first name, last name and street suffix lists for the locale, combined with house numbers. Each street gets a
+    random centre and bearing around the city centre, and each address is placed along its street. Beats and districts
+    are cells of a square grid over the city.
+
+    Args:
+        path (str): The pool directory.
+        size (int, optional): The number of unique addresses. Defaults to 1000000.
+        seed (int, optional): The seed for the pool. Defaults to an unseeded run.
+        locale (str, optional): The Faker locale for the word lists. Defaults to en_US.
+        center (tuple, optional): The (latitude, longitude) of the city centre. Defaults to Washington, DC.
+        spread (float, optional): The standard deviation of street centres in degrees. Defaults to 0.08.
+        beats_per_side (int, optional): The beat grid is beats_per_side x beats_per_side. Defaults to 12.
+        districts_per_side (int, optional): The district grid is districts_per_side x districts_per_side. Defaults to 3.
+
+    Returns:
+        AddressPool: The opened pool.
+    """
+    import importlib
+
+    address_provider = importlib.import_module(f"faker.providers.address.{locale}").Provider
+    person_provider = importlib.import_module(f"faker.providers.person.{locale}").Provider
+
+    rng = np.random.default_rng(seed)
+    roots = np.array(sorted(set(person_provider.first_names) | set(person_provider.last_names)), dtype="S")
+    suffixes = np.array(sorted(set(address_provider.street_suffixes)), dtype="S")
+    num_streets = len(roots) * len(suffixes)
+    max_house_number = 99999
+
+    if size > num_streets * max_house_number:
+        raise ValueError(f"A {locale} pool can hold at most {num_streets * max_house_number} unique addresses")
+
+    # Draw (street, house number) ids with a little headroom, drop duplicates and shuffle back into random order
+    ids = np.empty(0, dtype=np.int64)
+    while len(ids) < size:
+        extra = rng.integers(0, num_streets * max_house_number, size=int((size - len(ids)) * 1.05) + 16)
+        ids = np.unique(np.concatenate([ids, extra]))
+    ids = rng.permutation(ids)[:size]
+    street, house_number = np.divmod(ids, max_house_number)
+    house_number += 1
+    root, suffix = np.divmod(street, len(suffixes))
+
+    addresses = np.char.add(
+        np.char.add(np.char.add(house_number.astype("S5"), b" "), np.char.add(roots[root], b" ")),
+        suffixes[suffix],
+    )
+
+    # Place each street around the city centre and each address along its street
+    street_lat = rng.normal(center[0], spread, size=num_streets)
+    street_lon = rng.normal(center[1], spread, size=num_streets)
+    bearing = rng.uniform(0, np.pi, size=num_streets)
+    offset = (house_number / max_house_number - 0.5) * 0.02
+    latitude = street_lat[street] + offset * np.sin(bearing[street])
+    longitude = street_lon[street] + offset * np.cos(bearing[street])
+
+    def grid_cell(cells_per_side):
+        lat_edges = np.linspace(latitude.min(), latitude.max(), cells_per_side + 1)[1:-1]
+        lon_edges = np.linspace(longitude.min(), longitude.max(), cells_per_side + 1)[1:-1]
+        return (np.searchsorted(lat_edges, latitude) * cells_per_side + np.searchsorted(lon_edges, longitude)).astype(np.int16) + 1
+
+    return AddressPool.create(
+        path,
+        addresses,
+        latitude=latitude.astype(np.float32),
+        longitude=longitude.astype(np.float32),
+        beat=grid_cell(beats_per_side),
+        district=grid_cell(districts_per_side),
+    )
@@ -0,0 +1,450 @@
+import csv
+import os
+import re
+
+import numpy as np
+
+from pools import default_cache_dir
+
+# The problem catalog shipped with the generator, one row per problem nature tagged with its agency
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faker_problems.csv")
+
+# The agencies calls are generated for, in the same order as the agency column's categories
+AGENCIES = ["LAW", "EMS", "FIRE"]
+
+# The catalog tags medical calls as FIRE, because the fire department runs EMS. Problems that match this pattern are
+# moved to EMS. DEC (the communications center itself) is not dispatched, so its rows are left out.
+_EMS_PATTERN = re.compile(r"\b(?:ALS|BLS|EMS|CPR)\d*\b|MEDIC|HEALTHCARE|INTERFACILITY")
+_SKIPPED_AGENCIES = {"DEC"}
+
+# How often each kind of problem comes up relative to the others. The first keyword found in a problem sets its weight,
+# and problems that match no keyword get a weight of 1. Routine calls dominate real CAD data, and test calls, mutual aid
+# and major incidents are rare.
+PROBLEM_WEIGHTS = [
+    ("TEST", 0.02),
+    ("NOT WORKING", 0.02),
+    ("MUTUAL", 0.2),
+    ("911 TRANSFER", 0.5),
+    ("CRASH", 0.05),
+    ("COLLAPSE", 0.05),
+    ("MASS CASUALTY", 0.05),
+    ("HOSTAGE", 0.05),
+    ("HOMICIDE", 0.1),
+    ("ACTIVE SHOOTER", 0.05),
+    ("TRAFFIC STOP", 40),
+    ("SUSPICIOUS EVENT", 20),
+    ("911 HANG UP", 15),
+    ("POLICE INFORMATION", 10),
+    ("PARKING", 10),
+    ("DISABLED MOTORIST", 10),
+    ("ASSIST CITIZEN", 8),
+    ("ON VIEW", 8),
+    ("DISORDERLY", 8),
+    ("ALARM RESIDENTIAL", 6),
+    ("ALARM COMMERCIAL", 6),
+    ("NOISE", 5),
+    ("TRESPASS", 4),
+    ("DOMESTIC", 4),
+    ("FLAG DOWN", 4),
+    ("MENTAL HEALTH", 3),
+    ("MVC PROPERTY DAMAGE", 6),
+    ("MVC", 2),
+    ("LARCENY", 2),
+    ("SICK PERSON", 12),
+    ("FALL", 12),
+    ("BLS EMERGENCY", 10),
+    ("CHEST PAIN", 8),
+    ("TROUBLE BREATHING", 8),
+    ("INJURED PERSON", 6),
+    ("UNCONSCIOUS", 5),
+    ("ALTERED LOC", 5),
+    ("UNKNOWN MEDICAL", 4),
+    ("PSYCHIATRIC", 4),
+    ("OVERDOSE", 3),
+    ("SEIZURE", 3),
+    ("FIRE ALARM", 20),
+    ("PUBLIC SERVICE", 6),
+    ("CO ALARM", 5),
+    ("GAS LEAK", 4),
+    ("ELEVATOR", 4),
+    ("ODOR OF SMOKE", 3),
+    ("OUTSIDE FIRE", 3),
+    ("WIRES DOWN", 3),
+    ("LOCKOUT", 3),
+    ("VEHICLE FIRE", 2),
+]
+
+# The number of priority levels, from 1 (most urgent) to PRIORITY_LEVELS
+PRIORITY_LEVELS = 5
+
+# How each kind of call is handled. priority gives the chance of each priority level, and the other entries scale the
+# generator's queue, dispatch, enroute and on-scene times, so life threats are dispatched faster and held on scene
+# longer, and officer-initiated calls have almost no queue or travel time.
+RESPONSE_PROFILES = {
+    "LIFE_THREAT": {"priority": [0.85, 0.15, 0, 0, 0], "queue": 0.8, "dispatch": 0.5, "enroute": 0.75, "on_scene": 1.4},
+    "EMERGENCY": {"priority": [0.25, 0.6, 0.15, 0, 0], "queue": 0.9, "dispatch": 0.7, "enroute": 0.85, "on_scene": 1.1},
+    "URGENT": {"priority": [0, 0.2, 0.6, 0.2, 0], "queue": 1.0, "dispatch": 1.0, "enroute": 1.0, "on_scene": 1.0},
+    "ROUTINE": {"priority": [0, 0, 0.15, 0.5, 0.35], "queue": 1.2, "dispatch": 1.5, "enroute": 1.2, "on_scene": 0.7},
+    "SELF_INITIATED": {"priority": [0, 0, 0.2, 0.5, 0.3], "queue": 0.3, "dispatch": 0.3, "enroute": 0.05, "on_scene": 0.4},
+}
+
+# Which profile each problem gets. The first rule with a keyword found in the problem wins, keywords match from the
+# start of a word like PROBLEM_WEIGHTS, and problems that match no rule get DEFAULT_PROFILE. Delayed reports are routine
+# whatever happened.
+PROFILE_RULES = [
+    ("SELF_INITIATED", ("TRAFFIC STOP", "ON VIEW", "ONVIEW", "FLAG DOWN", "SUBJECT STOP", "WALK IN", "WALKIN")),
+    ("ROUTINE", ("DELAY", "TEST", "NOT WORKING")),
+    (
+        "LIFE_THREAT",
+        (
+            "CARDIAC ARREST", "CPR", "SHOOTING", "STABBING", "GUNSHOT", "STAB", "UNCONSCIOUS", "DROWNING", "CHOKING",
+            "ACTIVE SHOOTER", "HOSTAGE", "BUILDING FIRE", "STRUCTURE FIRE", "BOX ALARM", "GREATER ALARM", "TRAUMA",
+            "ENTRAP", "COLLAPSE", "CRASH", "MASS CASUALTY", "HOMICIDE", "SUICIDE IN PROG", "ABDUCTION", "SIGNAL 1",
+            "HELP SIGNAL", "WORKING INCIDENT", "RAPID INTERVENTION", "WATER RESCUE", "STRUCK",
+        ),
+    ),
+    (
+        "EMERGENCY",
+        (
+            "IN PROG", "ALS", "ASSAULT", "DOMESTIC", "FIGHT", "WEAPON", "ROBBERY", "CARJACKING", "MVC INJURY",
+            "HIT/RUN INJ", "SCHOOL-INJURY", "SITE INJURY", "GAS LEAK",
+            "HAZ MAT", "HAZMAT", "CARBON MONOXIDE", "CO INCIDENT", "EXPLOSION", "BOMB", "HOLDUP", "PANIC",
+            "MISSING PERSON CRITICAL", "APPLIANCE FIRE", "CHIMNEY FIRE", "ELECTRICAL FIRE", "OUTSIDE FIRE",
+            "VEHICLE FIRE", "TRUCK FIRE", "BUS FIRE", "BOAT FIRE", "SHIP FIRE", "TUNNEL FIRE", "METRO FIRE",
+            "MARINA FIRE", "FIRE-VEHICLE", "FLAM LIQ", "ODOR OF SMOKE", "ODOR SMOKE", "RESCUE",
+        ),
+    ),
+    (
+        "ROUTINE",
+        (
+            "PARKING", "NOISE", "ABANDONED", "PROPERTY", "CIVIL", "PUBLIC SERVICE", "LOCKOUT", "ANIMAL",
+            "ASSIST CITIZEN", "DISABLED MOTORIST", "POLICE INFORMATION", "TRANSPORT", "TRNSPORT", "TRNSPRT",
+            "PRISONER", "WARRANT", "ESCORT", "EXTRADIT", "OFF DUTY", "ADMINISTRATIVE", "BOOT", "BOLO", "TELEPHONE",
+            "REFERRAL", "INTERFACILITY", "FIRE MARSHAL", "INSPECTOR", "SPECIAL EVENT", "PROTECTIVE ORDER",
+            "VEHICLE CHECK", "HOLD CALL", "PREA", "BWC", "MOBILE INTEGRATED", "HANG UP", "911 TRANSFER", "RETURNED",
+        ),
+    ),
+]
+DEFAULT_PROFILE = "URGENT"
+
+# The priority tables have this many slots per profile, so each priority's chance is exact to within 1 / 65536
+_PRIORITY_SLOTS = 2**16
+
+# The duration columns that response profiles scale
+DURATION_STAGES = ["queue", "dispatch", "enroute", "on_scene"]
+
+# Problem catalogs already loaded in this process, keyed by their cache file path
+_memory_cache = {}
+
+
+def problem_weight(problem, weights=None):
+    """
+    This function returns the relative frequency of a problem from the first keyword of weights found in it.
+
+    Args:
+        problem (str): The problem nature.
+        weights (list, optional): (keyword, weight) pairs. Defaults to PROBLEM_WEIGHTS.
+
+    Returns:
+        float: The weight, or 1.0 when no keyword matches.
+    """
+    weights = PROBLEM_WEIGHTS if weights is None else weights
+    problem = problem.upper()
+    for keyword, weight in weights:
+        # Keywords match from the start of a word, so FALL does not match FALSE PRETENSE
+        if re.search(r"\b" + re.escape(keyword), problem):
+            return float(weight)
+    return 1.0
+
+
+def _keyword_pattern(keywords):
+    """
+    Compile one regular expression that finds any of the keywords at the start of a word.
+    """
+    return re.compile(r"\b(?:" + "|".join(re.escape(keyword) for keyword in keywords) + ")")
+
+
+def profile_codes(problems, profiles=None, rules=None):
+    """
+    This function finds the response profile of each problem from the profile rules.
+
+    Args:
+        problems (list): Problem natures.
+        profiles (dict, optional): Profile name to profile. Defaults to RESPONSE_PROFILES.
+        rules (list, optional): (profile name, keywords) pairs, checked in order. Defaults to PROFILE_RULES.
+
+    Returns:
+        numpy.ndarray: int64 codes into the profiles, one per problem.
+    """
+    names = list(RESPONSE_PROFILES if profiles is None else profiles)
+    rules = PROFILE_RULES if rules is None else rules
+    patterns = [(names.index(name), _keyword_pattern(keywords)) for name, keywords in rules]
+    default = names.index(DEFAULT_PROFILE)
+    codes = np.full(len(problems), default, dtype=np.int64)
+    for i, problem in enumerate(problems):
+        problem = problem.upper()
+        for code, pattern in patterns:
+            if pattern.search(problem):
+                codes[i] = code
+                break
+    return codes
+
+
+class ProblemCatalog:
+    """
+    This class holds the problem natures of each agency as compact arrays, with a weight per problem, and draws the
+    problem of every call in one vectorized step.
+
+    The weights of each agency are turned into a cumulative table scaled to [agency, agency + 1), and the tables of all
+    the agencies are laid end to end. Adding a uniform draw to each call's agency code then lands in that agency's part
+    of the table, so one searchsorted over all the calls picks every problem at once. The cost per call grows with the
+    log of the catalog size, so a large catalog does not slow down generation.
+
+    Every problem also has a response profile from PROFILE_RULES. The profiles are turned into lookup tables indexed by
+    problem code when the catalog is built, so a chunk's priorities and duration scales take one gather each.
+
+    Args:
+        categories (list): Every problem nature, used as the problem column's categories.
+        problem_codes (numpy.ndarray): Codes into categories, one per catalog entry.
+        agency_codes (numpy.ndarray): The agency of each entry, as a code into agencies.
+        weights (numpy.ndarray): The relative frequency of each entry within its agency.
+        agencies (list, optional): The agency names. Defaults to AGENCIES.
+    """
+
+    def __init__(self, categories, problem_codes, agency_codes, weights, agencies=None):
+        self.categories = list(categories)
+        self.agencies = list(AGENCIES if agencies is None else agencies)
+        problem_codes = np.asarray(problem_codes, dtype=np.int32)
+        agency_codes = np.asarray(agency_codes, dtype=np.int64)
+        weights = np.asarray(weights, dtype=float)
+        if not len(problem_codes) == len(agency_codes) == len(weights):
+            raise ValueError("The catalog needs one agency and one weight per problem")
+        if np.any(weights < 0) or not np.all(np.isfinite(weights)):
+            raise ValueError("The problem weights must be finite and non-negative")
+
+        # Group the entries by agency and build each agency's scaled cumulative weights
+        order = np.argsort(agency_codes, kind="stable")
+        self.problem_codes = problem_codes[order]
+        self.agency_codes = agency_codes[order]
+        self.weights = weights[order]
+        self._cumulative = np.empty(len(order))
+        self._last = np.empty(len(self.agencies), dtype=np.int64)
+        for code, agency in enumerate(self.agencies):
+            rows = np.flatnonzero(self.agency_codes == code)
+            total = self.weights[rows].sum()
+            if len(rows) == 0 or total <= 0:
+                raise ValueError(f"The catalog has no {agency} problems")
+            self._cumulative[rows] = code + np.cumsum(self.weights[rows]) / total
+            self._last[code] = rows[-1]
+
+        # Lookup tables by problem code. Each profile's priorities fill _PRIORITY_SLOTS slots in proportion to their
+        # chances, so a uniform slot number picks a priority with one gather instead of a search
+        self.profile_names = list(RESPONSE_PROFILES)
+        self.profile_codes = profile_codes(self.categories)
+        priority = np.array([RESPONSE_PROFILES[name]["priority"] for name in self.profile_names], dtype=float)
+        cumulative = np.cumsum(priority, axis=1) / priority.sum(axis=1, keepdims=True)
+        midpoints = (np.arange(_PRIORITY_SLOTS) + 0.5) / _PRIORITY_SLOTS
+        self._priority_table = np.concatenate(
+            [np.searchsorted(row, midpoints, side="right") + 1 for row in cumulative]
+        ).astype(np.int8)
+        self._priority_offsets = self.profile_codes * _PRIORITY_SLOTS
+        self._duration_scales = {
+            stage: np.array([RESPONSE_PROFILES[name][stage] for name in self.profile_names])[self.profile_codes]
+            for stage in DURATION_STAGES
+        }
+
+    @classmethod
+    def from_csv(cls, path=CATALOG_FILE, weights=None):
+        """
+        Parse a problem catalog CSV with Problem and Agency columns and an optional Weight column. FIRE problems that
+        are medical are moved to EMS, and rows of agencies that are not dispatched are dropped. Problems without a Weight
+        are weighted by problem_weight.
+
+        Args:
+            path (str, optional): The CSV file. Defaults to CATALOG_FILE.
+            weights (list, optional): (keyword, weight) pairs for problem_weight. Defaults to PROBLEM_WEIGHTS.
+
+        Returns:
+            ProblemCatalog: The catalog.
+        """
+        position = {agency: code for code, agency in enumerate(AGENCIES)}
+        categories = {}
+        entries = {}
+        # The file is saved with a byte order mark, which utf-8-sig strips from the first header
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                problem = row["Problem"].strip()
+                agency = row["Agency"].strip().upper()
+                if not problem or agency in _SKIPPED_AGENCIES:
+                    continue
+                if agency == "FIRE" and _EMS_PATTERN.search(problem.upper()):
+                    agency = "EMS"
+                if agency not in position:
+                    raise ValueError(f"Unknown agency '{agency}' for problem '{problem}' in {path}")
+                weight = row.get("Weight")
+                weight = float(weight) if weight not in (None, "") else problem_weight(problem, weights)
+                # A problem listed twice for the same agency keeps its first weight
+                key = (categories.setdefault(problem, len(categories)), position[agency])
+                entries.setdefault(key, weight)
+
+        keys = list(entries)
+        return cls(
+            list(categories),
+            [problem_code for problem_code, _ in keys],
+            [agency_code for _, agency_code in keys],
+            list(entries.values()),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a catalog saved with save().
+
+        Args:
+            path (str): The .npz file.
+
+        Returns:
+            ProblemCatalog: The catalog.
+        """
+        with np.load(path) as data:
+            return cls(
+                data["categories"].tolist(),
+                data["problem_codes"],
+                data["agency_codes"],
+                data["weights"],
+                data["agencies"].tolist(),
+            )
+
+    def save(self, path):
+        """
+        Save the catalog as a .npz file. It is written under a temporary name and renamed, so concurrent runs never read
+        a partial file.
+
+        Args:
+            path (str): The .npz file.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        try:
+            np.savez(
+                tmp_path,
+                categories=np.array(self.categories, dtype=str),
+                problem_codes=self.problem_codes,
+                agency_codes=self.agency_codes,
+                weights=self.weights,
+                agencies=np.array(self.agencies, dtype=str),
+            )
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def problems_for(self, agency):
+        """
+        Return the problems of one agency and their weights.
+
+        Args:
+            agency (str): The agency name.
+
+        Returns:
+            dict: Problem nature to weight, in catalog order.
+        """
+        rows = np.flatnonzero(self.agency_codes == self.agencies.index(agency))
+        return {self.categories[code]: weight for code, weight in zip(self.problem_codes[rows].tolist(), self.weights[rows].tolist())}
+
+    def profile_of(self, problem):
+        """
+        Return the name of a problem's response profile.
+
+        Args:
+            problem (str): A problem nature from categories.
+
+        Returns:
+            string: The profile name.
+        """
+        return self.profile_names[self.profile_codes[self.categories.index(problem)]]
+
+    def sample_priorities(self, problem_codes, rng):
+        """
+        Draw a priority level for every call from its problem's response profile.
+
+        Args:
+            problem_codes (numpy.ndarray): Codes into categories, as returned by sample().
+            rng (numpy.random.Generator): The random stream.
+
+        Returns:
+            numpy.ndarray: int64 priorities from 1 to PRIORITY_LEVELS.
+        """
+        slots = self._priority_offsets[problem_codes] + rng.integers(0, _PRIORITY_SLOTS, size=len(problem_codes))
+        return self._priority_table[slots].astype(np.int64)
+
+    def duration_scale(self, problem_codes, stage):
+        """
+        Return how much each call's problem stretches or shrinks one of the duration columns.
+
+        Args:
+            problem_codes (numpy.ndarray): Codes into categories.
+            stage (str): One of DURATION_STAGES.
+
+        Returns:
+            numpy.ndarray: The scale of each call.
+        """
+        return self._duration_scales[stage][problem_codes]
+
+    def sample(self, agency_codes, rng):
+        """
+        Draw a problem for every call from the problems of its agency, in proportion to their weights.
+
+        Args:
+            agency_codes (numpy.ndarray): The agency of each call, as a code into agencies.
+            rng (numpy.random.Generator): The random stream.
+
+        Returns:
+            numpy.ndarray: int32 codes into categories.
+        """
+        agency_codes = np.asarray(agency_codes, dtype=np.int64)
+        entries = np.searchsorted(self._cumulative, agency_codes + rng.random(len(agency_codes)), side="right")
+        # A draw that rounds up to the end of its agency's range stays on that agency's last problem
+        np.minimum(entries, self._last[agency_codes], out=entries)
+        return self.problem_codes[entries]
+
+
+def _cache_path(path, cache_dir):
+    """
+    Build the cache file path from the catalog's name, size and modification time, so an edited catalog is parsed again.
+    """
+    stat = os.stat(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+    return os.path.join(cache_dir, f"{name}-{stat.st_size}-{stat.st_mtime_ns}.npz")
+
+
+def get_problem_catalog(path=CATALOG_FILE, cache_dir=None):
+    """
+    This function returns the problem catalog, parsing the CSV only the first time. The parsed catalog is kept in memory
+    for the rest of the process and saved as a binary in the cache directory, so later runs skip the CSV entirely.
+
+    Args:
+        path (str, optional): The catalog CSV. Defaults to CATALOG_FILE.
+        cache_dir (str, optional): The cache directory. Defaults to pools.default_cache_dir().
+
+    Returns:
+        ProblemCatalog: The catalog.
+    """
+    cache_path = _cache_path(path, cache_dir)
+    if cache_path in _memory_cache:
+        return _memory_cache[cache_path]
+
+    try:
+        catalog = ProblemCatalog.load(cache_path)
+    except (OSError, ValueError, KeyError):
+        catalog = ProblemCatalog.from_csv(path)
+        # The cache is only an optimisation, so failures to write it are ignored
+        try:
+            catalog.save(cache_path)
+        except OSError:
+            pass
+
+    _memory_cache[cache_path] = catalog
+    return catalog
@@ -0,0 +1,223 @@
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+
+# How each stage's memory is measured:
+# - rss: the change in resident memory, which is cheap and works on Linux or with psutil installed
+# - tracemalloc: bytes allocated and the peak allocation, which is exact but makes Python-heavy stages much slower
+# - None: timings only
+MEMORY_MODES = ["rss", "tracemalloc", None]
+
+
+def _rss_bytes():
+    """
+    Return the resident memory of this process in bytes, or None when it cannot be read cheaply.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class StageProfiler:
+    """
+    This class records the wall time, rows processed and memory use of the named stages of a run. Pass one to
+    generate_911_data, iter_911_chunks or a ChunkWriter as profiler=..., then print report() or save to_json().
+
+    A stage that runs many times, such as once per chunk, is added up into one row. memory_delta is the memory the stage
+    left allocated. With memory="tracemalloc", memory_peak is the most it had allocated at once, and stages should not be
+    nested because each stage resets the tracemalloc peak.
+
+    Args:
+        memory (str, optional): One of MEMORY_MODES. Defaults to "rss".
+        callback (callable, optional): Called with the record of every finished stage, for example to show progress.
+    """
+
+    def __init__(self, memory="rss", callback=None):
+        if memory not in MEMORY_MODES:
+            raise ValueError(f"Unknown memory mode '{memory}'. Choose from {', '.join(map(str, MEMORY_MODES))}.")
+        if memory == "rss" and _rss_bytes() is None:
+            memory = None
+        self.enabled = True
+        self.memory = memory
+        self.callback = callback
+        self._stages = {}
+        self._started_tracemalloc = False
+        if memory == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=0):
+        """
+        Time the code in a with block as one run of the named stage.
+
+        Args:
+            name (str): The stage name.
+            rows (int, optional): The number of rows the stage processed. Defaults to 0.
+        """
+        if self.memory == "tracemalloc":
+            memory_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        elif self.memory == "rss":
+            memory_before = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            memory_delta = memory_peak = 0
+            if self.memory == "tracemalloc":
+                memory_after, peak = tracemalloc.get_traced_memory()
+                memory_delta = memory_after - memory_before
+                memory_peak = peak - memory_before
+            elif self.memory == "rss":
+                memory_delta = _rss_bytes() - memory_before
+            self.add(name, seconds, rows, memory_delta, memory_peak)
+
+    def add(self, name, seconds, rows=0, memory_delta=0, memory_peak=0, calls=1):
+        """
+        Add a measurement to a stage.
+
+        Args:
+            name (str): The stage name.
+            seconds (float): The wall time.
+            rows (int, optional): The rows processed. Defaults to 0.
+            memory_delta (int, optional): Bytes left allocated. Defaults to 0.
+            memory_peak (int, optional): Peak bytes allocated. Defaults to 0.
+            calls (int, optional): The number of runs being added. Defaults to 1.
+        """
+        record = {
+            "stage": name,
+            "calls": calls,
+            "seconds": seconds,
+            "rows": int(rows),
+            "memory_delta": int(memory_delta),
+            "memory_peak": int(memory_peak),
+        }
+        total = self._stages.setdefault(name, dict(record, calls=0, seconds=0.0, rows=0, memory_delta=0, memory_peak=0))
+        total["calls"] += calls
+        total["seconds"] += seconds
+        total["rows"] += record["rows"]
+        total["memory_delta"] += record["memory_delta"]
+        total["memory_peak"] = max(total["memory_peak"], record["memory_peak"])
+        if self.callback is not None:
+            self.callback(record)
+
+    def merge(self, records):
+        """
+        Add the records of another profiler, for example one that ran in a worker process.
+
+        Args:
+            records (list): The output of records() from the other profiler.
+        """
+        for record in records:
+            self.add(
+                record["stage"],
+                record["seconds"],
+                record["rows"],
+                record["memory_delta"],
+                record["memory_peak"],
+                record["calls"],
+            )
+
+    def records(self):
+        """
+        Return one record per stage, in the order the stages first ran.
+
+        Returns:
+            list: Dicts with stage, calls, seconds, rows, memory_delta and memory_peak.
+        """
+        return [dict(record) for record in self._stages.values()]
+
+    def report(self):
+        """
+        Format the stages as a text table with the share of the total time and the rows per second of each stage. The
+        memory columns are only shown when memory is measured.
+
+        Returns:
+            string: The table.
+        """
+        records = self.records()
+        total_seconds = sum(record["seconds"] for record in records)
+        header = f"{'stage':<12} {'calls':>6} {'seconds':>9} {'share':>6} {'rows':>11} {'rows/s':>12}"
+        if self.memory is not None:
+            header += f" {'mem +MB':>8}"
+        if self.memory == "tracemalloc":
+            header += f" {'peak MB':>8}"
+        lines = [header]
+        for record in records:
+            rate = f"{record['rows'] / record['seconds']:,.0f}" if record["rows"] and record["seconds"] else ""
+            line = (
+                f"{record['stage']:<12} {record['calls']:>6} {record['seconds']:>9.3f} "
+                f"{record['seconds'] / (total_seconds or 1.0):>6.1%} {record['rows']:>11,} {rate:>12}"
+            )
+            if self.memory is not None:
+                line += f" {record['memory_delta'] / 1024**2:>8.1f}"
+            if self.memory == "tracemalloc":
+                line += f" {record['memory_peak'] / 1024**2:>8.1f}"
+            lines.append(line)
+        lines.append(f"{'total':<12} {'':>6} {total_seconds:>9.3f}")
+        return "\n".join(lines)
+
+    def to_json(self, path=None):
+        """
+        Return the stage records as JSON, and save them when a path is given.
+
+        Args:
+            path (str, optional): The JSON file to write.
+
+        Returns:
+            string: The JSON text.
+        """
+        text = json.dumps({"memory": self.memory, "stages": self.records()}, indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def close(self):
+        """
+        Stop tracemalloc if this profiler started it.
+        """
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class NullProfiler:
+    """
+    A profiler that records nothing. It is the default, so the instrumented code has no branches for profiling.
+    """
+
+    enabled = False
+    memory = None
+
+    def stage(self, name, rows=0):
+        return contextlib.nullcontext()
+
+    def add(self, name, seconds, rows=0, memory_delta=0, memory_peak=0, calls=1):
+        pass
+
+    def merge(self, records):
+        pass
+
+    def records(self):
+        return []
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+
+from pools import DEFAULT_LOCALE, draw_names, format_names
+
+# The roles on a staff roster, in the order of the role codes
+ROLES = ["CALL_TAKER", "DISPATCHER"]
+CALL_TAKER = 0
+DISPATCHER = 1
+
+# Years of service follow a geometric distribution with this mean, capped at MAX_SENIORITY, so a center has many
+# recent hires and a few long-serving staff
+MEAN_SENIORITY = 6.0
+MAX_SENIORITY = 35
+
+# Employee IDs are handed out in hire order from FIRST_EMPLOYEE_ID, with gaps of 1 to EMPLOYEE_ID_STEP for the staff
+# who have since left
+FIRST_EMPLOYEE_ID = 1001
+EMPLOYEE_ID_STEP = 4
+
+
+class StaffRoster:
+    """
+    This class holds the call takers and dispatchers of a center as parallel numpy arrays, one entry per person,
+    sorted by employee ID. The CAD table refers to staff by employee ID only, and the "Last, First" names are composed
+    from the name word lists the first time they are asked for, which is when a table is written.
+
+    Args:
+        employee_ids (array-like): Unique employee IDs, in increasing order.
+        roles (array-like): The role of each person, as a code into ROLES.
+        shift_codes (array-like): The shift of each person, as a code into shifts.
+        seniority (array-like): Whole years of service.
+        shifts (list): The shift names.
+        last_codes (array-like, optional): Indices into the last names of pools.name_words.
+        first_codes (array-like, optional): Indices into the first names of pools.name_words.
+        names (array-like, optional): The names, instead of last_codes and first_codes.
+        locale (str, optional): The Faker locale of the word lists. Defaults to en_US.
+    """
+
+    def __init__(
+        self,
+        employee_ids,
+        roles,
+        shift_codes,
+        seniority,
+        shifts,
+        last_codes=None,
+        first_codes=None,
+        names=None,
+        locale=DEFAULT_LOCALE,
+    ):
+        self.employee_ids = np.asarray(employee_ids, dtype=np.int32)
+        self.roles = np.asarray(roles, dtype=np.int8)
+        self.shift_codes = np.asarray(shift_codes, dtype=np.int8)
+        self.seniority = np.asarray(seniority, dtype=np.int16)
+        self.shifts = list(shifts)
+        self.locale = locale
+        self._last_codes = last_codes
+        self._first_codes = first_codes
+        self._names = None if names is None else np.asarray(names, dtype=str)
+        self._name_categories = None
+
+        if names is None and (last_codes is None or first_codes is None):
+            raise ValueError("A roster needs either names or last_codes and first_codes")
+        if np.any(np.diff(self.employee_ids) <= 0):
+            raise ValueError("Employee IDs must be unique and in increasing order")
+        if not len(self.roles) == len(self.shift_codes) == len(self.seniority) == len(self.employee_ids):
+            raise ValueError("Every roster column needs one value per employee")
+
+    @classmethod
+    def from_names(cls, call_taker_names, dispatcher_names, shifts=None):
+        """
+        Build a roster from lists of names per shift, such as the ones generate_911_data returns. Everyone gets an
+        employee ID in the order listed and no seniority.
+
+        Args:
+            call_taker_names (dict): Call taker names per shift.
+            dispatcher_names (dict): Dispatcher names per shift.
+            shifts (list, optional): The shift names, in order. Defaults to the keys of call_taker_names.
+
+        Returns:
+            StaffRoster: The roster.
+        """
+        shifts = list(call_taker_names) if shifts is None else list(shifts)
+        for names_by_shift in (call_taker_names, dispatcher_names):
+            missing = [shift for shift in shifts if not names_by_shift.get(shift)]
+            if missing:
+                raise ValueError(f"The rosters have no names for shifts {', '.join(missing)} of the schedule")
+        names, roles, shift_codes = [], [], []
+        for role, names_by_shift in ((CALL_TAKER, call_taker_names), (DISPATCHER, dispatcher_names)):
+            for code, shift in enumerate(shifts):
+                names.extend(names_by_shift[shift])
+                roles.extend([role] * len(names_by_shift[shift]))
+                shift_codes.extend([code] * len(names_by_shift[shift]))
+        employee_ids = FIRST_EMPLOYEE_ID + np.arange(len(names))
+        return cls(employee_ids, roles, shift_codes, np.zeros(len(names)), shifts, names=names)
+
+    def __len__(self):
+        return len(self.employee_ids)
+
+    @property
+    def names(self):
+        """
+        The "Last, First" name of every person, composed on first use.
+        """
+        if self._names is None:
+            self._names = format_names(self._last_codes, self._first_codes, self.locale)
+        return self._names
+
+    def ids_by_shift(self, role):
+        """
+        The employee IDs of one role on each shift.
+
+        Args:
+            role (int): CALL_TAKER or DISPATCHER.
+
+        Returns:
+            dict: Shift name to an int32 array of employee IDs.
+        """
+        in_role = self.roles == role
+        return {shift: self.employee_ids[in_role & (self.shift_codes == code)] for code, shift in enumerate(self.shifts)}
+
+    def names_by_shift(self, role):
+        """
+        The names of one role on each shift, in the layout generate_911_data returns.
+
+        Args:
+            role (int): CALL_TAKER or DISPATCHER.
+
+        Returns:
+            dict: Shift name to a list of names.
+        """
+        in_role = self.roles == role
+        return {shift: self.names[in_role & (self.shift_codes == code)].tolist() for code, shift in enumerate(self.shifts)}
+
+    def name_column(self, employee_ids):
+        """
+        Look up the names of a column of employee IDs. Each distinct name is built once, and the rows only get an
+        integer code into them. An ID that is not on the roster raises a ValueError.
+
+        Args:
+            employee_ids (array-like): Employee IDs on this roster.
+
+        Returns:
+            pandas.Categorical: The names.
+        """
+        if self._name_categories is None:
+            self._name_categories = np.unique(self.names, return_inverse=True)
+        categories, codes = self._name_categories
+        employee_ids = np.asarray(employee_ids)
+        # searchsorted gives the slot an ID would go in, so check the roster really has that ID there
+        positions = np.minimum(np.searchsorted(self.employee_ids, employee_ids), len(self.employee_ids) - 1)
+        unknown = self.employee_ids[positions] != employee_ids
+        if np.any(unknown):
+            missing = np.unique(employee_ids[unknown])
+            raise ValueError(f"Employee IDs {', '.join(map(str, missing.tolist()))} are not on the roster")
+        return pd.Categorical.from_codes(codes[positions], categories=categories)
+
+    def to_frame(self):
+        """
+        The roster as a DataFrame with one row per person: employee_id, name, role, shift and seniority.
+
+        Returns:
+            pandas.DataFrame: The roster.
+        """
+        return pd.DataFrame(
+            {
+                "employee_id": self.employee_ids,
+                "name": self.names,
+                "role": pd.Categorical.from_codes(self.roles, categories=ROLES),
+                "shift": pd.Categorical.from_codes(self.shift_codes, categories=self.shifts),
+                "seniority": self.seniority,
+            }
+        )
+
+
+def build_roster(num_call_takers=8, num_dispatchers=None, shifts=None, rng=None, locale=DEFAULT_LOCALE):
+    """
+    This function builds a roster of call takers and dispatchers for every shift in a few vectorized draws, so a regional
+    center with thousands of staff takes milliseconds. Names are unique and drawn with Faker's weights, seniority is
+    drawn per person, and employee IDs go up with hire date, so the longest-serving staff have the lowest IDs.
+
+    Args:
+        num_call_takers (int, optional): Call takers per shift. Defaults to 8.
+        num_dispatchers (int, optional): Dispatchers per shift. Defaults to num_call_takers.
+        shifts (list, optional): The shift names, such as ShiftSchedule.shifts. Defaults to A, B, C, D.
+        rng (numpy.random.Generator, optional): The random stream. Defaults to an unseeded run.
+        locale (str, optional): The Faker locale of the names. Defaults to en_US.
+
+    Returns:
+        StaffRoster: The roster.
+    """
+    shifts = ["A", "B", "C", "D"] if shifts is None else list(shifts)
+    if num_dispatchers is None:
+        num_dispatchers = num_call_takers
+    if num_call_takers <= 0 or num_dispatchers <= 0:
+        raise ValueError("Every shift needs at least one call taker and one dispatcher")
+    if rng is None:
+        rng = np.random.default_rng()
+
+    # Call takers then dispatchers, shift by shift
+    per_shift = np.array([num_call_takers, num_dispatchers])
+    roles = np.repeat(np.arange(len(ROLES)), per_shift * len(shifts))
+    shift_codes = np.concatenate([np.repeat(np.arange(len(shifts)), count) for count in per_shift])
+    size = len(roles)
+    seniority = np.minimum(rng.geometric(1 / (MEAN_SENIORITY + 1), size=size) - 1, MAX_SENIORITY)
+
+    # Hand out the IDs in hire order, with ties broken at random, and keep the roster sorted by ID
+    hire_order = np.lexsort((rng.random(size), -seniority))
+    employee_ids = FIRST_EMPLOYEE_ID + np.cumsum(rng.integers(1, EMPLOYEE_ID_STEP + 1, size=size)) - 1
+    last_codes, first_codes = draw_names(size, rng, locale)
+    return StaffRoster(
+        employee_ids,
+        roles[hire_order],
+        shift_codes[hire_order],
+        seniority[hire_order],
+        shifts,
+        last_codes,
+        first_codes,
+        locale=locale,
+    )
@@ -0,0 +1,192 @@
+import json
+import os
+
+import numpy as np
+
+# A shift schedule is defined by:
+# - tours: the working periods of a day, each with a name, a start hour and a length in hours. A tour may run past
+#   midnight, and it then belongs to the day it started on.
+# - rotation: one entry per day of the cycle, naming the team (shift) that works each tour on that day
+# - anchor: the date on which day 0 of the rotation falls
+# - parts (optional): the names shift_part splits every tour into, in equal parts. Defaults to EARLY, MIDS and LATE.
+# - shifts (optional): the team names, in category order. Defaults to the teams in the rotation, sorted.
+# Where tours overlap, each hour goes to the tour that started most recently.
+
+_TWELVE_HOUR_TOURS = [
+    {"name": "DAY", "start": 6, "hours": 12},
+    {"name": "NIGHT", "start": 18, "hours": 12},
+]
+_EIGHT_HOUR_TOURS = [
+    {"name": "DAY", "start": 7, "hours": 8},
+    {"name": "EVENING", "start": 15, "hours": 8},
+    {"name": "NIGHT", "start": 23, "hours": 8},
+]
+_TEN_HOUR_TOURS = [
+    {"name": "DAY", "start": 6, "hours": 10},
+    {"name": "EVENING", "start": 14, "hours": 10},
+    {"name": "NIGHT", "start": 22, "hours": 10},
+]
+
+# The built-in schedules. A definition in the same format can also be passed as a dict or loaded from a JSON file.
+SCHEDULES = {
+    # 2-2-3 Pitman rotation on 12-hour tours: A and B share the days and C and D the nights, swapping every 2-3 days
+    "pitman": {
+        "tours": _TWELVE_HOUR_TOURS,
+        "anchor": "2024-01-08",
+        "rotation": [["A", "C"], ["A", "C"], ["B", "D"], ["B", "D"], ["A", "C"], ["A", "C"], ["B", "D"]]
+        + [["B", "D"], ["B", "D"], ["A", "C"], ["A", "C"], ["B", "D"], ["B", "D"], ["A", "C"]],
+    },
+    # 4 on, 4 off on 12-hour tours
+    "4-on-4-off": {
+        "tours": _TWELVE_HOUR_TOURS,
+        "anchor": "2024-01-01",
+        "rotation": [["A", "C"]] * 4 + [["B", "D"]] * 4,
+    },
+    # Southern swing on 8-hour tours: each team works a week of days, then evenings, then nights, then has a week off
+    "southern-swing": {
+        "tours": _EIGHT_HOUR_TOURS,
+        "anchor": "2024-01-01",
+        "rotation": [["ABCD"[(tour - day // 7) % 4] for tour in range(3)] for day in range(28)],
+    },
+    # 4-10 plan on overlapping 10-hour tours: A, B and C work four days and D, E and F cover the rest
+    "4-10": {
+        "tours": _TEN_HOUR_TOURS,
+        "anchor": "2024-01-01",
+        "rotation": [["A", "B", "C"]] * 4 + [["D", "E", "F"]] * 3 + [["A", "B", "C"]] * 3 + [["D", "E", "F"]] * 4,
+    },
+}
+DEFAULT_SCHEDULE = "pitman"
+DEFAULT_PARTS = ["EARLY", "MIDS", "LATE"]
+
+
+class ShiftSchedule:
+    """
+    This class turns a rotation into two lookup tables with one entry per hour of the cycle: the shift working that hour
+    and how far into its tour the hour is, as a shift_part. Finding the shift and shift_part of every call is then one
+    subtraction, one modulo and two gathers, whatever the schedule.
+
+    Args:
+        tours (list): Dicts with name, start (hour of day) and hours (length).
+        rotation (list): One list per day of the cycle, naming the shift that works each tour.
+        anchor (str, optional): The date of day 0 of the rotation. Defaults to 2024-01-01.
+        parts (list, optional): The shift_part names. Defaults to DEFAULT_PARTS.
+        shifts (list, optional): The shift names. Defaults to the sorted shifts of the rotation.
+        name (str, optional): A label for the schedule.
+    """
+
+    def __init__(self, tours, rotation, anchor="2024-01-01", parts=None, shifts=None, name=None):
+        self.name = name
+        self.tours = [dict(tour) for tour in tours]
+        self.rotation = [list(day) for day in rotation]
+        self.parts = list(DEFAULT_PARTS if parts is None else parts)
+        self.shifts = list(shifts) if shifts is not None else sorted({team for day in self.rotation for team in day})
+        self.anchor = str(anchor)
+        self._anchor_seconds = int(np.datetime64(self.anchor, "s").astype(np.int64))
+
+        if not self.tours or not self.rotation or not self.parts:
+            raise ValueError("A schedule needs at least one tour, one day of rotation and one shift part")
+        for tour in self.tours:
+            if not 0 <= tour["start"] < 24 or not 0 < tour["hours"] <= 24:
+                raise ValueError(f"Tour {tour.get('name')} must start between hours 0 and 23 and last 1 to 24 hours")
+        position = {shift: code for code, shift in enumerate(self.shifts)}
+        for day, teams in enumerate(self.rotation):
+            if len(teams) != len(self.tours):
+                raise ValueError(f"Day {day} of the rotation names {len(teams)} shifts for {len(self.tours)} tours")
+            unknown = set(teams) - set(position)
+            if unknown:
+                raise ValueError(f"Day {day} of the rotation uses unknown shifts {sorted(unknown)}")
+
+        # Every (day, tour) in the cycle, with its start as an hour of the cycle
+        cycle_hours = 24 * len(self.rotation)
+        starts = np.array([24 * day + tour["start"] for day in range(len(self.rotation)) for tour in self.tours])
+        lengths = np.array([tour["hours"] for _ in self.rotation for tour in self.tours])
+        teams = np.array([position[team] for day in self.rotation for team in day])
+
+        # For each hour of the cycle, how long ago each tour started, wrapping around the end of the cycle
+        elapsed = (np.arange(cycle_hours)[:, None] - starts[None, :]) % cycle_hours
+        elapsed = np.where(elapsed < lengths[None, :], elapsed, cycle_hours)
+        working = elapsed.argmin(axis=1)
+        since_start = elapsed[np.arange(cycle_hours), working]
+        gaps = np.flatnonzero(since_start == cycle_hours)
+        if len(gaps):
+            raise ValueError(f"No tour covers hour {gaps[0] % 24} of day {gaps[0] // 24} of the rotation")
+
+        self.cycle_hours = cycle_hours
+        self._shift_by_hour = teams[working].astype(np.int8)
+        self._part_by_hour = (since_start * len(self.parts) // lengths[working]).astype(np.int8)
+
+    @classmethod
+    def from_definition(cls, definition, name=None):
+        """
+        Build a schedule from a definition dict, such as an entry of SCHEDULES or a parsed JSON file.
+
+        Args:
+            definition (dict): The schedule definition.
+            name (str, optional): A label for the schedule.
+
+        Returns:
+            ShiftSchedule: The schedule.
+        """
+        unknown = set(definition) - {"tours", "rotation", "anchor", "parts", "shifts", "name"}
+        if unknown:
+            raise ValueError(f"Unknown schedule settings {sorted(unknown)}")
+        return cls(
+            definition["tours"],
+            definition["rotation"],
+            definition.get("anchor", "2024-01-01"),
+            definition.get("parts"),
+            definition.get("shifts"),
+            definition.get("name", name),
+        )
+
+    def lookup(self, event_seconds):
+        """
+        Find the shift and shift_part of each event.
+
+        Args:
+            event_seconds (numpy.ndarray): int64 epoch seconds.
+
+        Returns:
+            tuple: (shift_codes, part_codes) int8 arrays of codes into shifts and parts.
+        """
+        hour_of_cycle = (np.asarray(event_seconds, dtype=np.int64) - self._anchor_seconds) // 3600 % self.cycle_hours
+        return self._shift_by_hour[hour_of_cycle], self._part_by_hour[hour_of_cycle]
+
+
+def load_schedule(path):
+    """
+    This function reads a schedule definition from a JSON file.
+
+    Args:
+        path (str): The JSON file.
+
+    Returns:
+        ShiftSchedule: The schedule, named after the file.
+    """
+    with open(path) as f:
+        definition = json.load(f)
+    return ShiftSchedule.from_definition(definition, os.path.splitext(os.path.basename(path))[0])
+
+
+def get_schedule(schedule=None):
+    """
+    This function resolves the schedule argument of the generators.
+
+    Args:
+        schedule (ShiftSchedule, dict or str, optional): A schedule, a definition dict, the name of a built-in schedule or
+            the path of a JSON definition. Defaults to DEFAULT_SCHEDULE.
+
+    Returns:
+        ShiftSchedule: The schedule.
+    """
+    if schedule is None:
+        schedule = DEFAULT_SCHEDULE
+    if isinstance(schedule, ShiftSchedule):
+        return schedule
+    if isinstance(schedule, dict):
+        return ShiftSchedule.from_definition(schedule)
+    if schedule in SCHEDULES:
+        return ShiftSchedule.from_definition(SCHEDULES[schedule], schedule)
+    if os.path.exists(schedule):
+        return load_schedule(schedule)
+    raise ValueError(f"Unknown schedule '{schedule}'. Choose from {', '.join(SCHEDULES)} or pass a JSON file.")
@@ -0,0 +1,210 @@
+import collections
+import heapq
+
+import numpy as np
+
+
+def _roster_codes(ids_by_shift, shifts):
+    """
+    Merge the shift rosters into one array of employee IDs and return the position in it of every person on each
+    shift. The heaps hold these positions, which are small and compare quickly.
+    """
+    employee_ids = np.unique(np.concatenate([np.asarray(ids_by_shift[shift], dtype=np.int32) for shift in shifts]))
+    return employee_ids, [np.searchsorted(employee_ids, ids_by_shift[shift]).tolist() for shift in shifts]
+
+
+def _talk_and_entry(df_full):
+    """
+    The drawn talk and entry times of a chunk. When the generator drew an answer_time, it is part of the phone_time and
+    queue_time and is taken back out, because the simulation works out its own.
+    """
+    talk = df_full["phone_time"].to_numpy(dtype=np.int64)
+    entry = df_full["queue_time"].to_numpy(dtype=np.int64)
+    if "answer_time" in df_full:
+        answer_time = df_full["answer_time"].to_numpy(dtype=np.int64)
+        talk = talk - answer_time
+        entry = entry - answer_time
+    return talk, entry
+
+
+def _new_pools(codes_by_shift):
+    """
+    One heap of (free_at, person) per shift. Everyone starts free, so the heap order falls back to roster order.
+    """
+    return [[(np.iinfo(np.int64).min, code) for code in codes] for codes in codes_by_shift]
+
+
+def serve_in_order(arrivals, shift_codes, busy_for, pools):
+    """
+    This function runs calls through pools of staff or units, first come first served. Each call goes to whoever in its
+    pool has been free the longest, or waits for whoever frees up first. Every pool is a heap of (free_at, person)
+    pairs, so each call costs one heap replace.
+
+    Args:
+        arrivals (numpy.ndarray): When each call reaches the pool, in seconds, sorted.
+        shift_codes (numpy.ndarray): The pool of each call, such as its shift, as an index into pools.
+        busy_for (numpy.ndarray): How long each call keeps its person busy once they start on it.
+        pools (list): Heaps of (free_at, person) per pool. They are updated in place, so a later block of calls carries
+            on from this one.
+
+    Returns:
+        tuple: (start, person) arrays giving when each call was picked up and by whom.
+    """
+    start = []
+    person = []
+    replace = heapq.heapreplace
+    for arrival, shift_code, busy in zip(arrivals.tolist(), shift_codes.tolist(), busy_for.tolist()):
+        pool = pools[shift_code]
+        free_at, who = pool[0]
+        begin = arrival if free_at < arrival else free_at
+        replace(pool, (begin + busy, who))
+        start.append(begin)
+        person.append(who)
+    return np.array(start, dtype=np.int64), np.array(person, dtype=np.int32)
+
+
+class StaffingSimulator:
+    """
+    This class is a discrete-event simulation of the call takers and dispatchers on each shift. It replaces the
+    independently drawn queue, dispatch and phone times and staff IDs with ones that come from contention for the
+    people on the shift roster, so waits grow with load and nobody works two calls at once.
+
+    A call rings until a call taker on its shift is free, and answer_time is that wait. The call taker is then busy for
+    the longer of the talk time and the entry time, which are the phone_time and queue_time drawn by the generator less
+    the drawn answer_time they include. The
+    call enters the dispatch queue when entry is done, waits for a dispatcher on the shift, and is dispatched after the
+    drawn dispatch_time of work.
+
+    Chunks are pushed in event_time order. Calls are answered in arrival order, and the dispatch queue is worked in
+    queued order across chunk boundaries, so a chunk is only handed back once every call in it has been dispatched.
+
+    Args:
+        call_taker_ids (dict): Call taker employee IDs per shift, such as StaffRoster.ids_by_shift(CALL_TAKER).
+        dispatcher_ids (dict): Dispatcher employee IDs per shift.
+        shifts (list, optional): The shift names, in the order of the shift column's categories. Defaults to A-D.
+    """
+
+    def __init__(self, call_taker_ids, dispatcher_ids, shifts=("A", "B", "C", "D")):
+        self.shifts = list(shifts)
+        self.call_taker_ids, call_taker_codes = _roster_codes(call_taker_ids, self.shifts)
+        self.dispatcher_ids, dispatcher_codes = _roster_codes(dispatcher_ids, self.shifts)
+        self._call_takers = _new_pools(call_taker_codes)
+        self._dispatchers = _new_pools(dispatcher_codes)
+        # Chunks waiting for their last calls to be dispatched, in order
+        self._chunks = collections.deque()
+        # Calls queued for dispatch but not yet worked, as parallel arrays sorted by queued time
+        self._pending = None
+        self._chunks_pushed = 0
+
+    def push(self, df_full):
+        """
+        Simulate a chunk and return the chunks that are now complete.
+
+        Args:
+            df_full (pandas.DataFrame): The next chunk from the generator, in event_time order.
+
+        Returns:
+            list: Finished chunks in order. A chunk may come back on a later call, once its dispatch queue has cleared.
+        """
+        event_seconds = df_full["event_time"].to_numpy().astype("datetime64[s]").view(np.int64)
+        shift_codes = df_full["shift"].cat.codes.to_numpy()
+        talk, entry = _talk_and_entry(df_full)
+
+        # Call takers work the calls in arrival order, which is the chunk order
+        answered, call_taker = serve_in_order(event_seconds, shift_codes, np.maximum(talk, entry), self._call_takers)
+        queued = answered + entry
+
+        state = {
+            "index": self._chunks_pushed,
+            "df": df_full,
+            "event_seconds": event_seconds,
+            "answered": answered,
+            "call_taker": call_taker,
+            "dispatched": np.empty(len(df_full), dtype=np.int64),
+            "dispatcher": np.empty(len(df_full), dtype=np.int32),
+            "remaining": len(df_full),
+        }
+        self._chunks.append(state)
+        self._chunks_pushed += 1
+
+        # Calls queued before this chunk's first call can no longer be overtaken, so work the queue up to that point
+        if len(df_full):
+            self._work_queue(event_seconds[0])
+
+        rows = np.arange(len(df_full))
+        self._add_pending(
+            queued,
+            shift_codes,
+            df_full["dispatch_time"].to_numpy(dtype=np.int64),
+            np.full(len(df_full), state["index"]),
+            rows,
+        )
+        return self._pop_finished()
+
+    def finish(self):
+        """
+        Work the rest of the dispatch queue and return the remaining chunks.
+
+        Returns:
+            list: The remaining chunks in order.
+        """
+        self._work_queue(None)
+        return self._pop_finished()
+
+    def _add_pending(self, queued, shift_codes, work, owners, rows):
+        order = np.argsort(queued, kind="stable")
+        new = [queued[order], shift_codes[order], work[order], owners[order], rows[order]]
+        if self._pending is None:
+            self._pending = new
+        else:
+            merged = [np.concatenate([old, extra]) for old, extra in zip(self._pending, new)]
+            order = np.argsort(merged[0], kind="stable")
+            self._pending = [values[order] for values in merged]
+
+    def _work_queue(self, until):
+        """
+        Dispatch the pending calls queued before until, or all of them when until is None.
+        """
+        if self._pending is None:
+            return
+        queued, shift_codes, work, owners, rows = self._pending
+        count = len(queued) if until is None else int(np.searchsorted(queued, until, side="left"))
+        if count == 0:
+            return
+
+        started, dispatcher = serve_in_order(queued[:count], shift_codes[:count], work[:count], self._dispatchers)
+        states = {state["index"]: state for state in self._chunks}
+        for owner in np.unique(owners[:count]).tolist():
+            mask = owners[:count] == owner
+            state = states[owner]
+            state["dispatched"][rows[:count][mask]] = started[mask] + work[:count][mask]
+            state["dispatcher"][rows[:count][mask]] = dispatcher[mask]
+            state["remaining"] -= int(mask.sum())
+        self._pending = [values[count:] for values in self._pending]
+
+    def _pop_finished(self):
+        finished = []
+        while self._chunks and self._chunks[0]["remaining"] == 0:
+            finished.append(self._finalize(self._chunks.popleft()))
+        return finished
+
+    def _finalize(self, state):
+        """
+        Write the simulated times and staff into the chunk. The caller rebuilds the totals and time stamps from them.
+        """
+        df_full = state["df"]
+        event_seconds = state["event_seconds"]
+        answer_time = state["answered"] - event_seconds
+        talk, entry = _talk_and_entry(df_full)
+        queued = state["answered"] + entry
+
+        df_full["call_taker_id"] = self.call_taker_ids[state["call_taker"]]
+        df_full["dispatcher_id"] = self.dispatcher_ids[state["dispatcher"]]
+        df_full["queue_time"] = answer_time + entry
+        df_full["dispatch_time"] = state["dispatched"] - queued
+        df_full["phone_time"] = answer_time + talk
+        if "answer_time" in df_full:
+            df_full["answer_time"] = answer_time
+        else:
+            df_full.insert(df_full.columns.get_loc("queue_time"), "answer_time", answer_time)
+        return df_full
@@ -3,13 +3,18 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
 import os
 from faker import Faker
 from faker.providers import DynamicProvider
 import argparse
+import collections
+import collections.abc
+# Patch for PyInquirer compatibility with Python 3.10+
+if not hasattr(collections, 'Mapping'):
+    collections.Mapping = collections.abc.Mapping
 from PyInquirer import prompt, Validator, ValidationError
 import re
+from pools import get_address_pool
 
 def sanitize_input(user_input):
     # Regular expression to match allowed characters
@@ -35,8 +40,6 @@ def main():
 if __name__ == "__main__":
     main()
 
-fake = Faker("en_US")
-
 law_problem_provider = DynamicProvider(
     provider_name="law_problem",
     elements=[
@@ -114,24 +117,19 @@ ems_problem_provider = DynamicProvider(
     ],
 )
 
-address_list = [fake.unique.street_address() for _ in range(2500)]
-
-
-street_address_provider = DynamicProvider(
-    provider_name="street_address", elements=address_list
-)
-
 # TODO: Add the ability to switch the faker provider to a different locale.
 # TODO: Hook this to a web interface to allow users to generate data on demand.
 
 
-def generate_911_data(num_records=10000, start_date=None, end_date=None, num_names=8):
+def generate_911_data(num_records=10000, start_date=None, end_date=None, num_names=8, seed=None, rng=None):
     """
     This function generates synthetic 911 dispatch data for a given number of records. This will output a CSV file with the generated data.
     The data includes various fields such as call_id, agency, event_time, day_of_year, week_no, hour, day_night, dow, shift, shift_part, problem, address, priority_number, call_taker, call_reception, dispatcher, queue_time, dispatch_time, phone_time, ack_time, enroute_time, on_scene_time, process_time, total_time and time stamps for various events.
 
     Args:
         num_records (int, optional): _description_. Defaults to 10000.
+        seed (int, optional): Makes the run reproducible. Every random draw, including the Faker names, addresses and problems, comes from one numpy Generator built from this seed.
+        rng (numpy.random.Generator, optional): An existing Generator to draw from instead of a seed.
 
         TODO: Add the ability to switch the faker provider to a different locale.
         This will allow for generating data in different languages or formats based on the user's needs.
@@ -139,6 +137,17 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
         This needs to be run with the following setup: python synth911gen.py -n 10000 -s 2024-01-01 -e 2024-12-31 -o computer_aided_dispatch.csv
     """
 
+    # An unseeded run shares the cached unseeded address pool, a seeded run gets its own from rng
+    seeded = seed is not None or rng is not None
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    elif seed is not None:
+        raise ValueError("Pass either seed or rng, not both")
+
+    # Use a Faker instance seeded from rng so that the names, addresses and problems follow the same seed
+    faker = Faker("en_US")
+    faker.seed_instance(int(rng.integers(2**32)))
+
     def generate_names(num_names=8):
         """
         This function generates a list of random names using the Faker library. The number of names generated is determined by the num_names parameter.
@@ -150,7 +159,7 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
         Returns:
             dictionary: This returns a dictionary with keys A, B, C, D and values as lists of names.
         """
-        return [f"{fake.last_name()}, {fake.first_name()}" for _ in range(num_names)]
+        return [f"{faker.last_name()}, {faker.first_name()}" for _ in range(num_names)]
 
     call_taker_names = {key: generate_names(num_names) for key in ["A", "B", "C", "D"]}
     dispatcher_names = {key: generate_names(num_names) for key in ["A", "B", "C", "D"]}
@@ -160,14 +169,14 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
     agencies = ["LAW", "EMS", "FIRE"]
 
     # Generate the agency column with the specified distribution
-    agency_choices = np.random.choice(agencies, size=num_records, p=probabilities)
+    agency_choices = rng.choice(agencies, size=num_records, p=probabilities)
 
     # Map agency to prefix
     agency_prefix = {"LAW": "L", "EMS": "M", "FIRE": "F"}
 
     # Generate call_id column with agency-specific prefix
     call_ids_full = [
-        f"25-{agency_prefix[agency]}{fake.bothify(text='######')}"
+        f"25-{agency_prefix[agency]}{faker.bothify(text='######')}"
         for agency in agency_choices
     ]
 
@@ -184,12 +193,12 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
 
     # Generate random datetimes within the specified range
     date_range = int((end_date - start_date).total_seconds())
-    random_seconds = np.random.randint(0, date_range, size=num_records)
+    random_seconds = rng.integers(0, date_range, size=num_records)
     datetimes_full = [
         start_date + timedelta(seconds=int(sec)) for sec in sorted(random_seconds)
     ]
 
-    random_seconds = np.random.randint(0, date_range, size=num_records)
+    random_seconds = rng.integers(0, date_range, size=num_records)
     # Convert numpy integers to Python integers before using in timedelta
     datetimes_full = [
         start_date + timedelta(seconds=int(sec)) for sec in sorted(random_seconds)
@@ -309,29 +318,27 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
             string: A random problem type based on the agency.
         """
         if agency == "LAW":
-            return fake.law_problem()
+            return faker.random_element(law_problem_provider.elements)
         elif agency == "FIRE":
-            return fake.fire_problem()
+            return faker.random_element(fire_problem_provider.elements)
         elif agency == "EMS":
-            return fake.ems_problem()
+            return faker.random_element(ems_problem_provider.elements)
         else:
             return None
 
-    # Register the dynamic providers with Faker
-    fake.add_provider(law_problem_provider)
-    fake.add_provider(fire_problem_provider)
-    fake.add_provider(ems_problem_provider)
-
+    # The dynamic providers are bound to Faker's shared random instance, so sample their elements
+    # through the seeded instance instead of registering them
     df_full["problem"] = df_full["agency"].apply(assign_problem)
 
     # Add address column with a street address
 
-    fake.add_provider(street_address_provider)
+    # The address pool is built on first use and cached by pools.get_address_pool
+    address_list = get_address_pool(2500, seed=int(rng.integers(2**32)) if seeded else None)
 
-    df_full["address"] = [fake.street_address() for _ in range(len(df_full))]
+    df_full["address"] = [faker.random_element(address_list) for _ in range(len(df_full))]
 
     # Add priority_number column with random integers between 1 and 5
-    df_full["priority_number"] = np.random.randint(1, 6, size=len(df_full))
+    df_full["priority_number"] = rng.integers(1, 6, size=len(df_full))
 
     # Define a function to assign call_taker based on shift
     def assign_call_taker(shift):
@@ -344,7 +351,7 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
         Returns:
             string: The name of the call_taker based on the shift.
         """
-        return random.choice(call_taker_names[shift])
+        return rng.choice(call_taker_names[shift])
 
     # Apply the function to create the call_taker column
     df_full["call_taker"] = df_full["shift"].apply(assign_call_taker)
@@ -356,7 +363,7 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
     reception_methods = ["E-911", "PHONE", "OFFICER", "TEXT", "C2C"]
 
     # Generate the call_reception column with the specified distribution
-    df_full["call_reception"] = np.random.choice(
+    df_full["call_reception"] = rng.choice(
         reception_methods, size=len(df_full), p=probabilities_reception
     )
 
@@ -371,7 +378,7 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
         Returns:
             string: The name of the dispatcher based on the shift.
         """
-        return random.choice(dispatcher_names[shift])
+        return rng.choice(dispatcher_names[shift])
 
     # Apply the function to create the dispatcher column
     df_full["dispatcher"] = df_full["shift"].apply(assign_dispatcher)
@@ -380,7 +387,7 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
     sigma = 1.2
 
     # Generate columns with distributions
-    df_full["queue_time"] = np.random.lognormal(
+    df_full["queue_time"] = rng.lognormal(
         mean=mu, sigma=sigma, size=len(df_full)
     ).astype(int)
     df_full["queue_time"] = (
@@ -390,15 +397,15 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
 
     shape, scale = 3.0, 45.0
     df_full["dispatch_time"] = (
-        np.random.chisquare(df=5, size=len(df_full)) * 2
+        rng.chisquare(df=5, size=len(df_full)) * 2
     ).astype(int)
     df_full["dispatch_time"] = df_full["dispatch_time"].clip(lower=5, upper=600)
 
     # More varied phone_time using gamma
     df_full["phone_time"] = np.concatenate(
         [
-            np.random.exponential(scale=80, size=int(len(df_full) * 0.8)),  # Fast calls
-            np.random.gamma(
+            rng.exponential(scale=80, size=int(len(df_full) * 0.8)),  # Fast calls
+            rng.gamma(
                 shape=2, scale=200, size=int(len(df_full) * 0.2)
             ),  # Slower calls
         ]
@@ -406,19 +413,19 @@ def generate_911_data(num_records=10000, start_date=None, end_date=None, num_nam
 
     # ack_time describes the time from the first dispatch to the time the unit marks enroute
     shape, scale = 2.0, 30.0
-    df_full["ack_time"] = np.random.gamma(shape, scale, size=len(df_full)).astype(int)
+    df_full["ack_time"] = rng.gamma(shape, scale, size=len(df_full)).astype(int)
     df_full["ack_time"] = df_full["ack_time"].clip(lower=2, upper=40)
 
     # More varied enroute_time using gamma with different parameters
     shape, scale = 6.0, 70.0
-    df_full["enroute_time"] = np.random.gamma(shape, scale, size=len(df_full)).astype(
+    df_full["enroute_time"] = rng.gamma(shape, scale, size=len(df_full)).astype(
         int
     )
     df_full["enroute_time"] = df_full["enroute_time"].clip(lower=300, upper=900)
 
     # More varied on_scene_time using gamma with heavy tail
     shape, scale = 3.0, 800.0
-    df_full["on_scene_time"] = np.random.gamma(shape, scale, size=len(df_full)).astype(
+    df_full["on_scene_time"] = rng.gamma(shape, scale, size=len(df_full)).astype(
         int
     )
     df_full["on_scene_time"] = df_full["on_scene_time"].clip(lower=300, upper=7200)
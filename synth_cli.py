@@ -0,0 +1,142 @@
+#! /usr/bin/env python
+
+"""
+Command line entry points for the generators, installed as the synth911gen and synthvolgen commands.
+
+Only argparse and the format names in output_formats are imported until the flags have been parsed, so --help and bad
+flags answer at once. numpy, pandas and the generator modules are loaded when a run actually starts, and PyInquirer
+only for --interactive. Schedules and frequencies are defined next to the generators, so their names are checked when
+the run starts.
+
+Examples:
+    synth911gen -n 10000 -s 2024-01-01 -e 2024-12-31 -o computer_aided_dispatch.csv
+    synthvolgen -s 2000-01-01 -e 2030-01-01 --freq 15min --psaps 20 -o volumes.parquet
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from output_formats import OUTPUT_FORMATS, TIMESTAMP_FORMATS
+
+
+def _positive_int(value):
+    """
+    argparse type for the counts, which must be at least 1.
+    """
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number")
+    return number
+
+
+def _date(value):
+    """
+    argparse type for the YYYY-MM-DD dates.
+    """
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError("Please enter a valid date in YYYY-MM-DD format")
+    return value
+
+
+def build_cad_parser():
+    """
+    This function builds the parser for the CAD generator. Every setting of the interactive prompts has a flag, so
+    runs can be scripted from batch schedulers and job arrays without a terminal.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="synth911gen",
+        description="Generate synthetic 911 CAD data and stream it to a file.",
+        epilog="Example: synth911gen -n 10000 -s 2024-01-01 -e 2024-12-31 -o computer_aided_dispatch.csv",
+    )
+    parser.add_argument("-i", "--interactive", action="store_true", help="Ask for the settings with prompts instead.")
+    parser.add_argument("-n", "--num-records", type=_positive_int, default=10000, help="Records to generate. Defaults to 10000.")
+    parser.add_argument("-s", "--start-date", type=_date, default="2024-01-01", help="Start date, YYYY-MM-DD.")
+    parser.add_argument("-e", "--end-date", type=_date, default="2024-12-31", help="End date, YYYY-MM-DD.")
+    parser.add_argument("--num-names", type=_positive_int, default=8, help="Call takers and dispatchers per shift.")
+    parser.add_argument("-o", "--output", default="computer_aided_dispatch.csv", help="The output file.")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default=None, help="Defaults to the file extension.")
+    parser.add_argument("--timestamp-format", choices=TIMESTAMP_FORMATS, default="default", help="The time stamp layout.")
+    parser.add_argument("--chunk-size", type=_positive_int, default=100000, help="Records generated and written at a time.")
+    parser.add_argument("-w", "--workers", type=_positive_int, default=1, help="Worker processes. Defaults to 1.")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed. Defaults to a random run.")
+    parser.add_argument("--schedule", default=None, help="A built-in shift schedule or a JSON file. Defaults to pitman.")
+    parser.add_argument("--units-output", default=None, help="Also write the unit responses to this file.")
+    parser.add_argument("--roster-output", default=None, help="Also write the staff roster, with employee IDs, to this file.")
+    parser.add_argument("--simulate", action="store_true", help="Simulate call taker and dispatcher workload.")
+    parser.add_argument("--profile", action="store_true", help="Print a timing report for each stage of the run.")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print errors.")
+    return parser
+
+
+def build_volume_parser():
+    """
+    This function builds the parser for the volume generator.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="synthvolgen",
+        description="Generate synthetic 911 call center volumes and stream them to a file.",
+        epilog="Example: synthvolgen -s 2000-01-01 -e 2030-01-01 --freq 15min --psaps 20 -o volumes.parquet",
+    )
+    parser.add_argument("-n", "--num-rows", type=_positive_int, default=None, help="Intervals per center. Defaults to 366 without --end-date.")
+    parser.add_argument("-s", "--start-date", type=_date, default="2024-01-01", help="The first day, YYYY-MM-DD.")
+    parser.add_argument("-e", "--end-date", type=_date, default=None, help="The day after the last one, YYYY-MM-DD.")
+    parser.add_argument("--freq", default="D", help="The interval length: D, h or 15min. Defaults to D.")
+    parser.add_argument("--psaps", type=_positive_int, default=1, help="The number of centers. Defaults to 1.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed. Defaults to 42.")
+    parser.add_argument("--growth", type=float, default=0.0, help="Yearly growth in volume, such as 0.02.")
+    parser.add_argument("--thresholds", type=int, nargs="+", default=[15, 20], help="Answer-time thresholds in seconds.")
+    parser.add_argument("--chunk-size", type=_positive_int, default=1000000, help="Rows generated and written at a time.")
+    parser.add_argument("-o", "--output", default="./911_volume_data.csv", help="The output file.")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default=None, help="Defaults to the file extension.")
+    parser.add_argument("--profile", action="store_true", help="Print a timing report for each stage of the run.")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print errors.")
+    return parser
+
+
+def cad_main(argv=None):
+    """
+    This is the synth911gen command. By default it runs headless from the command line flags, and with --interactive it
+    asks for the settings with prompts instead.
+
+    Args:
+        argv (list, optional): The command line arguments. Defaults to sys.argv[1:].
+    """
+    settings = build_cad_parser().parse_args(argv)
+    import opt_synth911gen
+
+    if settings.interactive:
+        settings = opt_synth911gen.interactive_settings()
+    try:
+        opt_synth911gen.run(settings)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+
+
+def volume_main(argv=None):
+    """
+    This is the synthvolgen command. With no flags it writes a year of daily volumes from 2024-01-01 to
+    911_volume_data.csv.
+
+    Args:
+        argv (list, optional): The command line arguments. Defaults to sys.argv[1:].
+    """
+    settings = build_volume_parser().parse_args(argv)
+    import synthvolgen
+
+    try:
+        synthvolgen.run(settings)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    cad_main()
@@ -1,83 +1,520 @@
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-import os
-
-def generate_synthetic_data(num_rows, start_date=None):
-    
-    """
-    Generate synthetic data with controlled distributions
-    
-    Parameters:
-    - num_rows: Number of rows to generate
-    - start_date: Optional start date for the date column (defaults to today if not specified)
-    
+
+from answer_times import (
+    component_cdfs,
+    draw_threshold_counts,
+    load_table,
+    normalize_thresholds,
+    slow_share,
+    threshold_counts,
+)
+from arrivals import EPOCH_WEEKDAY, as_rate_table
+from output_writer import ChunkWriter
+from profiling import NULL_PROFILER, StageProfiler
+
+# The interval lengths the volume data can be reported in, in seconds
+FREQUENCIES = {"D": 86400, "h": 3600, "15min": 900}
+
+VOLUME_COLUMNS = ["Date", "Recd_911", "Ab_9111", "Recd_Admin", "Ab_Admin", "Outbound", "pct_15", "pct_20"]
+
+# Mean daily volumes of a center of average size
+MEAN_DAILY_911 = 380
+MEAN_DAILY_ADMIN = 600
+MEAN_DAILY_OUTBOUND = 375
+
+# The share of received calls that are abandoned
+ABANDON_RATE_911 = 50 / 380
+ABANDON_RATE_ADMIN = 10 / 600
+
+# Seasonality: volume peaks this many days into the year (mid-July) and is this much above or below average at the
+# peak and trough
+SEASONAL_PEAK_DAY = 196
+SEASONAL_AMPLITUDE = 0.08
+
+# Busy and quiet days: every day of every center gets a gamma factor with mean 1 and this shape, shared by all of the
+# day's intervals. A shape of 35 gives daily 911 counts a spread close to the old normal draw (std 70 around 380).
+DAY_FACTOR_SHAPE = 35.0
+
+# Centers of different sizes: with more than one PSAP, each center's volume is scaled by a lognormal with this sigma
+PSAP_SCALE_SIGMA = 0.6
+
+# How the call_reception values of CAD calls count toward the volume columns. OFFICER calls are self-initiated and never
+# ring at the center, so they are left out.
+RECEPTION_911 = ("E-911", "TEXT")
+RECEPTION_ADMIN = ("PHONE", "C2C")
+
+# The answer-time thresholds, in seconds, behind the default pct_15 and pct_20 columns. Any thresholds can be asked for,
+# such as (10, 15, 20, 40), and each adds a pct_<seconds> column.
+ANSWER_THRESHOLDS = (15, 20)
+
+# Days are drawn in blocks of this many, each from its own seed, so the data does not depend on the chunk size
+_BLOCK_DAYS = 28
+
+_DAYS_PER_YEAR = 365.2425
+
+
+def _volume_columns(thresholds):
+    """
+    The volume columns with one pct column per answer-time threshold.
+    """
+    return VOLUME_COLUMNS[:6] + [f"pct_{threshold}" for threshold in thresholds]
+
+
+def _epoch_day(date):
+    """
+    Return the day of a date as days since 1970-01-01.
+    """
+    return int(np.datetime64(pd.Timestamp(date), "D").astype(np.int64))
+
+
+def _interval_rates(rate_table, step):
+    """
+    Spread the mean daily 911 volume over the intervals of each day of the week.
+
+    The rate table only sets the shape of the week and the day. It is scaled so that an average week has MEAN_DAILY_911
+    calls a day.
+
+    Returns:
+        numpy.ndarray: A 7 x intervals-per-day table of expected 911 calls per interval.
+    """
+    table = as_rate_table(rate_table)
+    hourly = table * (MEAN_DAILY_911 * 7 / table.sum())
+    if step == 86400:
+        return hourly.sum(axis=1, keepdims=True)
+    # A sub-hour interval gets its share of the hour's calls
+    return np.repeat(hourly, 3600 // step, axis=1) * (step / 3600)
+
+
+def _interval_hours(step):
+    """
+    The hours of the day each interval of a day covers, as an intervals-per-day x hours-per-interval array.
+    """
+    if step == 86400:
+        return np.arange(24)[None, :]
+    return np.repeat(np.arange(24), 3600 // step)[:, None]
+
+
+def _draw_block(rng, days, step, base_rates, psap_scale, growth, first_day, hourly_load, thresholds):
+    """
+    Draw the volumes of every interval of the given days for every center.
+
     Returns:
-    - pandas DataFrame with generated synthetic data
-    """
-    # Set a random seed for reproducibility
-    np.random.seed(42)
-    
-    # Generate date column
-    if start_date is None:
-        start_date = datetime.now()
-    
-    # Vectorized date generation
-    dates = pd.date_range(start=start_date, periods=num_rows, freq='D')
-    
-    # Example of generating an integer column with normal distribution
-    # Parameters: mean, standard deviation, min, max
-    def generate_normal_int_column(mean, std, min_val, max_val):
-        # Generate normal distribution
-        values = np.random.normal(mean, std, num_rows)
-        
-        # Clip values to specified min and max
-        values = np.clip(values, min_val, max_val)
-        
-        # Round to integers
-        return np.round(values).astype(int)
-    
-    # Example of generating float columns with uniform distribution within specified range
-    def generate_float_column(min_val, max_val):
-        # Generate uniform distribution within specified range
-        values = np.random.uniform(min_val, max_val, num_rows)
-        
-        # Round to 4 decimal places
-        return np.round(values, 4)
-    
-    # Create DataFrame
-    df = pd.DataFrame({
-        
-        # Generate the date fields.
-        'Date': dates,
-        
-        # Generate the call volume counts,
-        'Recd_911': generate_normal_int_column(mean=380, std=70, min_val=250, max_val=500),
-        'Ab_9111': generate_normal_int_column(mean=50, std=13, min_val=25, max_val=85),
-        'Recd_Admin': generate_normal_int_column(mean=600, std=82, min_val=450, max_val=900),
-        'Ab_Admin': generate_normal_int_column(mean=10, std=5, min_val=0, max_val=25),
-        'Outbound': generate_normal_int_column(mean=375, std=70, min_val=250, max_val=500),
-        'pct_15': generate_float_column(0.8200, 1.0000)
-        
-    })
-    
-    # Vectorized pct_20 calculation
-    # Logic: if pct_15 == 1.0000, then 1.0000
-    # else uniform(pct_15 + 0.0001, 1.0000)
-    
-    # Generate random values for the else case for all rows first
-    random_vals = np.random.uniform(df['pct_15'] + 0.0001, 1.0000)
-    
-    df['pct_20'] = np.where(
-        df['pct_15'] == 1.0000,
-        1.0000,
-        np.round(random_vals, 4)
+        dict: The columns of the block, with one row per interval and center, by time and then center.
+    """
+    num_days = len(days)
+    per_day = base_rates.shape[1]
+    num_psaps = len(psap_scale)
+
+    # Expected 911 calls for each (day, interval, center): the weekly and daily shape, the season, the trend, the
+    # center's size and the day's own busy or quiet factor
+    season = 1 + SEASONAL_AMPLITUDE * np.cos(2 * np.pi * (days % _DAYS_PER_YEAR - SEASONAL_PEAK_DAY) / _DAYS_PER_YEAR)
+    trend = (1 + growth) ** ((days - first_day) / _DAYS_PER_YEAR)
+    day_factor = rng.gamma(DAY_FACTOR_SHAPE, 1 / DAY_FACTOR_SHAPE, size=(num_days, 1, num_psaps))
+    expected = (
+        base_rates[(days + EPOCH_WEEKDAY) % 7][:, :, None]
+        * (season * trend)[:, None, None]
+        * psap_scale[None, None, :]
+        * day_factor
+    ).ravel()
+    num_rows = len(expected)
+
+    received_911 = rng.poisson(expected)
+    received_admin = rng.poisson(expected * (MEAN_DAILY_ADMIN / MEAN_DAILY_911))
+
+    # The answer times follow the same load-dependent mixture as the CAD answer_time column. The load of each hour an
+    # interval covers is the hour's relative rate times the season and the day's busy factor, but not the center's
+    # size or the trend, since staffing grows with those. A daily interval averages the hours, weighted by their calls.
+    weights = hourly_load[(days + EPOCH_WEEKDAY) % 7][:, _interval_hours(step)][..., None]
+    load = weights * season[:, None, None, None] * day_factor[:, :, None, :]
+    # Only the share of slow calls depends on the load, so it is averaged once and mixed into every threshold
+    share = ((weights * slow_share(load)).sum(axis=2) / weights.sum(axis=2)).ravel()
+    cdfs = [fast + share * (slow - fast) for fast, slow in map(component_cdfs, thresholds)]
+    within = dict(zip(thresholds, draw_threshold_counts(received_911, cdfs, rng)))
+
+    seconds = (days[:, None] * 86400 + np.arange(per_day) * step).ravel()
+    columns = {
+        "Date": np.repeat(seconds, num_psaps).view("datetime64[s]"),
+        "Recd_911": received_911,
+        "Ab_9111": rng.binomial(received_911, ABANDON_RATE_911),
+        "Recd_Admin": received_admin,
+        "Ab_Admin": rng.binomial(received_admin, ABANDON_RATE_ADMIN),
+        "Outbound": rng.poisson(expected * (MEAN_DAILY_OUTBOUND / MEAN_DAILY_911)),
+    }
+    # The share of the interval's 911 calls answered within each threshold, which is NaN when there were none
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for threshold in thresholds:
+            columns[f"pct_{threshold}"] = np.round(within[threshold] / received_911, 4)
+    if num_psaps > 1:
+        columns["PSAP"] = np.tile(np.arange(num_psaps, dtype=np.int32), num_days * per_day)
+    return columns
+
+
+def iter_volume_chunks(
+    num_rows=None,
+    start_date=None,
+    end_date=None,
+    freq="D",
+    psaps=1,
+    seed=42,
+    rng=None,
+    chunk_size=1000000,
+    rate_table=None,
+    growth=0.0,
+    thresholds=ANSWER_THRESHOLDS,
+    profiler=None,
+):
+    """
+    This function generates call center volume data one chunk at a time, so decades of hourly or 15-minute intervals
+    for many centers never have to be held in memory at once.
+
+    Each interval's expected 911 volume follows the day-of-week by hour-of-day rate table from arrivals.py, a yearly
+    seasonal swing peaking in July, an optional yearly growth, the size of the center and a random busy or quiet factor
+    per day. The counts are then Poisson draws around it, abandoned calls are binomial draws from the received calls,
+    and admin and outbound calls scale with the same expected volume. The pct columns are drawn as counts of the 911
+    calls answered within each threshold, from the answer-time mixture in answer_times.py at the interval's load, so
+    they are consistent with the call counts and never decrease from one threshold to the next.
+
+    The days are drawn in fixed blocks with their own seeds, so a seed gives the same data whatever the chunk size.
+
+    Args:
+        num_rows (int, optional): The number of intervals per center. Give this or end_date.
+        start_date (str or datetime, optional): The first day. Defaults to today. Only the date is used.
+        end_date (str or datetime, optional): The day after the last one. Used when num_rows is None.
+        freq (str, optional): The interval length, one of FREQUENCIES. Defaults to "D".
+        psaps (int, optional): The number of centers. With more than one, a PSAP column names the center. Defaults to 1.
+        seed (int, optional): Seed for reproducibility. Defaults to 42, pass None for a fresh random run.
+        rng (numpy.random.Generator, optional): An existing Generator to seed the run from instead of seed.
+        chunk_size (int, optional): The approximate number of rows per chunk. Chunks hold whole blocks of days.
+        rate_table (array-like, optional): A 7 x 24 table of relative rates, or 24 hourly rates. Defaults to
+            arrivals.DEFAULT_RATE_TABLE.
+        growth (float, optional): The yearly growth in volume, for example 0.02 for 2% a year. Defaults to 0.
+        thresholds (tuple, optional): Answer-time thresholds in seconds, one pct_<seconds> column each, in increasing
+            order. Negative or repeated thresholds raise a ValueError. Defaults to ANSWER_THRESHOLDS.
+        profiler (StageProfiler, optional): Records the volume stage of every chunk.
+
+    Yields:
+        pandas.DataFrame: The next chunk of intervals, in time order.
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency '{freq}'. Choose from {', '.join(FREQUENCIES)}.")
+    if psaps < 1:
+        raise ValueError("psaps must be at least 1")
+    if num_rows is None and end_date is None:
+        raise ValueError("Pass either num_rows or end_date")
+    thresholds = normalize_thresholds(thresholds)
+    profiler = profiler if profiler is not None else NULL_PROFILER
+    step = FREQUENCIES[freq]
+    per_day = 86400 // step
+
+    # Work in whole epoch days
+    first_day = _epoch_day("today" if start_date is None else start_date)
+    if num_rows is None:
+        num_rows = (_epoch_day(end_date) - first_day) * per_day
+        if num_rows <= 0:
+            raise ValueError("The end of the date range must be after the start")
+    num_rows = max(int(num_rows), 0)
+    num_days = -(-num_rows // per_day)
+
+    # Every block of days and the center sizes get their own seed from the root, found by index rather than spawned
+    # in order
+    if rng is not None:
+        seed = int(rng.integers(0, 2**63))
+    root = np.random.SeedSequence(seed)
+    if psaps > 1:
+        scale_rng = np.random.default_rng(np.random.SeedSequence(root.entropy, spawn_key=(0,)))
+        psap_scale = scale_rng.lognormal(-PSAP_SCALE_SIGMA**2 / 2, PSAP_SCALE_SIGMA, psaps)
+    else:
+        psap_scale = np.ones(1)
+    base_rates = _interval_rates(rate_table, step)
+    hourly_load = load_table(rate_table)
+
+    blocks_per_chunk = max(1, chunk_size // (_BLOCK_DAYS * per_day * psaps))
+    rows_left = num_rows
+    for chunk_start in range(0, num_days, _BLOCK_DAYS * blocks_per_chunk):
+        chunk_days = min(_BLOCK_DAYS * blocks_per_chunk, num_days - chunk_start)
+        with profiler.stage("volume", min(chunk_days * per_day, rows_left) * psaps):
+            parts = []
+            for block_start in range(chunk_start, chunk_start + chunk_days, _BLOCK_DAYS):
+                block = block_start // _BLOCK_DAYS
+                block_rng = np.random.default_rng(np.random.SeedSequence(root.entropy, spawn_key=(1, block)))
+                days = first_day + np.arange(block_start, min(block_start + _BLOCK_DAYS, num_days), dtype=np.int64)
+                parts.append(
+                    _draw_block(block_rng, days, step, base_rates, psap_scale, growth, first_day, hourly_load, thresholds)
+                )
+            columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+            # The last day is cut short when num_rows is not a whole number of days
+            rows = min(chunk_days * per_day, rows_left)
+            rows_left -= rows
+            if rows < chunk_days * per_day:
+                columns = {name: values[: rows * psaps] for name, values in columns.items()}
+
+            if psaps > 1:
+                psap_codes = columns.pop("PSAP")
+                names = [f"PSAP{number:03d}" for number in range(1, psaps + 1)]
+                columns = {"Date": columns.pop("Date"), "PSAP": pd.Categorical.from_codes(psap_codes, categories=names), **columns}
+            df = pd.DataFrame(columns, copy=False)
+        yield df
+
+
+def generate_synthetic_data(
+    num_rows, start_date=None, seed=42, rng=None, freq="D", psaps=1, rate_table=None, growth=0.0, thresholds=ANSWER_THRESHOLDS
+):
+    """
+    This function generates call center volume data in one DataFrame. See iter_volume_chunks for the model.
+
+    Args:
+        num_rows (int): The number of intervals per center.
+        start_date (str or datetime, optional): The first day. Defaults to today.
+        seed (int, optional): Seed for reproducibility. Defaults to 42, pass None for a fresh random run.
+        rng (numpy.random.Generator, optional): An existing Generator to seed the run from instead of seed.
+        freq (str, optional): The interval length, one of FREQUENCIES. Defaults to "D".
+        psaps (int, optional): The number of centers. Defaults to 1.
+        rate_table (array-like, optional): A 7 x 24 table of relative rates, or 24 hourly rates.
+        growth (float, optional): The yearly growth in volume. Defaults to 0.
+        thresholds (tuple, optional): Answer-time thresholds in seconds. Defaults to ANSWER_THRESHOLDS.
+
+    Returns:
+        pandas.DataFrame: The volume data.
+    """
+    chunks = list(
+        iter_volume_chunks(
+            num_rows=num_rows,
+            start_date=start_date,
+            freq=freq,
+            psaps=psaps,
+            seed=seed,
+            rng=rng,
+            rate_table=rate_table,
+            growth=growth,
+            thresholds=thresholds,
+            chunk_size=max(num_rows * psaps, 1),
+        )
     )
-    
-    output_path = './911_volume_data.csv'
-    df.to_csv(output_path, index=False)
-        
-    return df
-
-df = generate_synthetic_data(num_rows=366, start_date=datetime(2024, 1, 1))
-print("Synthetic data generated and saved to 911_volume_data.csv")
\ No newline at end of file
+    if not chunks:
+        return pd.DataFrame({name: [] for name in _volume_columns(normalize_thresholds(thresholds))})
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+class VolumeRollup:
+    """
+    This class rolls CAD calls up into interval volumes, so the volume data matches a CAD run call for call. Recd_911
+    and Recd_Admin count the calls by call_reception, and each pct column is the share of 911 calls whose answer_time
+    was at most that many seconds.
+
+    Chunks are added one at a time and only the per-interval counts are kept, updated with one np.bincount per chunk,
+    so the CAD table never has to be held in memory. The intervals run from the day of the earliest call to the day of
+    the latest one, and intervals without calls have zero counts.
+
+    Abandoned and outbound calls never become CAD events, so Ab_9111, Ab_Admin and Outbound are drawn from the received
+    counts with the same rates as iter_volume_chunks. The pct columns are NaN for an interval with no 911 calls, and
+    for CAD data without an answer_time column.
+
+    Args:
+        freq (str, optional): The interval length, one of FREQUENCIES. Defaults to "D".
+        seed (int, optional): Seed for the abandoned and outbound draws. Defaults to 42.
+        rng (numpy.random.Generator, optional): An existing Generator to draw from instead of a seed.
+        thresholds (tuple, optional): Answer-time thresholds in seconds, one pct_<seconds> column each, in increasing
+            order. Negative or repeated thresholds raise a ValueError. Defaults to ANSWER_THRESHOLDS.
+    """
+
+    def __init__(self, freq="D", seed=42, rng=None, thresholds=ANSWER_THRESHOLDS):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency '{freq}'. Choose from {', '.join(FREQUENCIES)}.")
+        self.freq = freq
+        self.step = FREQUENCIES[freq]
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.thresholds = normalize_thresholds(thresholds)
+        self.rows_added = 0
+        # The start of the first interval in epoch seconds, and per interval the 911 and admin calls, the 911 calls with
+        # an answer time and those answered within each threshold
+        self._origin = None
+        self._received = np.zeros((0, 2), dtype=np.int64)
+        self._timed = np.zeros(0, dtype=np.int64)
+        self._within = np.zeros((0, len(self.thresholds)), dtype=np.int64)
+
+    def add(self, df_full):
+        """
+        Count a chunk of CAD calls.
+
+        Args:
+            df_full (pandas.DataFrame): CAD calls with event_time and call_reception, and optionally answer_time.
+        """
+        if len(df_full) == 0:
+            return
+        seconds = df_full["event_time"].to_numpy().astype("datetime64[s]").view(np.int64)
+        self._cover(seconds.min(), seconds.max())
+        # Only the intervals this chunk touches are counted and added in, so a long run costs the same per chunk
+        interval = (seconds - self._origin) // self.step
+        lo = int(interval.min())
+        interval -= lo
+        size = int(interval.max()) + 1
+        span = slice(lo, lo + size)
+
+        # 0 for 911 calls, 1 for admin calls and 2 for the rest, looked up by category code
+        reception = df_full["call_reception"].astype("category")
+        kind_by_code = np.array(
+            [0 if value in RECEPTION_911 else 1 if value in RECEPTION_ADMIN else 2 for value in reception.cat.categories],
+            dtype=np.int64,
+        )
+        kind = kind_by_code[reception.cat.codes.to_numpy()]
+        self._received[span] += np.bincount(interval * 3 + kind, minlength=3 * size).reshape(size, 3)[:, :2]
+
+        if "answer_time" in df_full:
+            is_911 = kind == 0
+            answer_time = df_full["answer_time"].to_numpy(dtype=np.int64)[is_911]
+            interval = interval[is_911]
+            self._timed[span] += np.bincount(interval, minlength=size)
+            self._within[span] += threshold_counts(answer_time, interval, size, self.thresholds)
+        self.rows_added += len(df_full)
+
+    def observe(self, chunks):
+        """
+        Count every chunk as it passes through, for example on its way to write_911_chunks.
+
+        Args:
+            chunks (iterable): CAD chunks, or (calls, unit_responses) pairs, from iter_911_chunks.
+
+        Yields:
+            The chunks, unchanged.
+        """
+        for chunk in chunks:
+            self.add(chunk[0] if isinstance(chunk, tuple) else chunk)
+            yield chunk
+
+    def to_frame(self):
+        """
+        Build the volume table from the calls counted so far.
+
+        Returns:
+            pandas.DataFrame: One row per interval, with the volume columns and a pct column per threshold.
+        """
+        rng = self.rng
+        received_911 = self._received[:, 0]
+        received_admin = self._received[:, 1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pct = np.round(self._within / self._timed[:, None], 4)
+        seconds = (self._origin or 0) + np.arange(len(self._timed), dtype=np.int64) * self.step
+        columns = {
+            "Date": seconds.view("datetime64[s]"),
+            "Recd_911": received_911,
+            "Ab_9111": rng.binomial(received_911, ABANDON_RATE_911),
+            "Recd_Admin": received_admin,
+            "Ab_Admin": rng.binomial(received_admin, ABANDON_RATE_ADMIN),
+            "Outbound": rng.poisson(received_911 * (MEAN_DAILY_OUTBOUND / MEAN_DAILY_911)),
+        }
+        for column, threshold in enumerate(self.thresholds):
+            columns[f"pct_{threshold}"] = pct[:, column]
+        return pd.DataFrame(columns)
+
+    def _cover(self, first, last):
+        """
+        Grow the counts so the intervals run from the day of first to the end of the day of last.
+        """
+        per_day = 86400 // self.step
+        first_day = first // 86400
+        last_day = last // 86400
+        if self._origin is None:
+            self._origin = first_day * 86400
+        origin_day = self._origin // 86400
+        before = max(origin_day - first_day, 0) * per_day
+        after = max(last_day + 1 - (origin_day + len(self._timed) // per_day), 0) * per_day
+        if before or after:
+            self._received = np.pad(self._received, ((before, after), (0, 0)))
+            self._timed = np.pad(self._timed, (before, after))
+            self._within = np.pad(self._within, ((before, after), (0, 0)))
+            self._origin -= before * self.step
+
+
+def rollup_cad_volumes(chunks, freq="D", seed=42, rng=None, thresholds=ANSWER_THRESHOLDS):
+    """
+    This function rolls a CAD run up into interval volumes. See VolumeRollup.
+
+    Args:
+        chunks (pandas.DataFrame or iterable): A CAD table, or its chunks from iter_911_chunks.
+        freq (str, optional): The interval length, one of FREQUENCIES. Defaults to "D".
+        seed (int, optional): Seed for the abandoned and outbound draws. Defaults to 42.
+        rng (numpy.random.Generator, optional): An existing Generator to draw from instead of a seed.
+        thresholds (tuple, optional): Answer-time thresholds in seconds. Defaults to ANSWER_THRESHOLDS.
+
+    Returns:
+        pandas.DataFrame: One row per interval, with the volume columns and a pct column per threshold.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    rollup = VolumeRollup(freq, seed, rng, thresholds)
+    for _ in rollup.observe(chunks):
+        pass
+    return rollup.to_frame()
+
+
+def write_volume_data(output_file, chunks, output_format=None, profiler=None):
+    """
+    This function streams volume chunks to a file.
+
+    Args:
+        output_file (str): The output file path.
+        chunks (iterable): DataFrame chunks, such as the output of iter_volume_chunks.
+        output_format (str, optional): One of output_writer.OUTPUT_FORMATS. Defaults to the format matching the file extension.
+        profiler (StageProfiler, optional): Records the formatting and write stages.
+
+    Returns:
+        int: The number of rows written.
+    """
+    with ChunkWriter(output_file, output_format, categorical_columns=["PSAP"], profiler=profiler) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return writer.rows_written
+
+
+def run(settings):
+    """
+    This function generates and writes the volume data for a set of command line settings.
+
+    Args:
+        settings (argparse.Namespace): The settings from synth_cli.build_volume_parser.
+
+    Returns:
+        int: The number of rows written.
+    """
+    num_rows = settings.num_rows
+    if num_rows is None and settings.end_date is None:
+        num_rows = 366
+    profiler = StageProfiler() if settings.profile else None
+    chunks = iter_volume_chunks(
+        num_rows=num_rows,
+        start_date=settings.start_date,
+        end_date=settings.end_date,
+        freq=settings.freq,
+        psaps=settings.psaps,
+        seed=settings.seed,
+        chunk_size=settings.chunk_size,
+        growth=settings.growth,
+        thresholds=tuple(settings.thresholds),
+        profiler=profiler,
+    )
+    rows = write_volume_data(settings.output, chunks, settings.format, profiler)
+    if profiler is not None:
+        profiler.close()
+    if settings.quiet:
+        return rows
+    print(f"Synthetic data generated and saved to {settings.output} ({rows} rows)")
+    if profiler is not None:
+        print(profiler.report())
+    return rows
+
+
+def main(argv=None):
+    """
+    This is the main entry point of the script. See synth_cli.volume_main.
+    """
+    from synth_cli import volume_main
+
+    volume_main(argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from staffing_sim import serve_in_order
+
+# The unit types on the default roster: (agency, unit id prefix, first unit number, number of units)
+DEFAULT_UNIT_ROSTER = {
+    "PATROL": ("LAW", "P", 101, 40),
+    "MEDIC": ("EMS", "M", 1, 10),
+    "AMBULANCE": ("EMS", "A", 1, 12),
+    "ENGINE": ("FIRE", "E", 1, 12),
+    "TRUCK": ("FIRE", "T", 1, 5),
+    "RESCUE": ("FIRE", "R", 1, 2),
+    "BATTALION": ("FIRE", "BC", 1, 2),
+}
+
+# Which units each call gets. The first rule whose agency matches and which has a keyword in the problem wins, and a
+# rule with no keywords matches every problem of its agency. Keywords match whole words, allowing a plural S or a number
+# after them, so ALS matches ALS2 and WEAPON matches WEAPONS but FIRE would not match FIREARM. A plan lists (unit type, count, probability) entries, and
+# each unit in an entry is sent with that probability. An empty plan sends no units.
+RESPONSE_PLANS = [
+    ("FIRE", ("BUILDING FIRE", "STRUCTURE FIRE", "BOX ALARM", "GREATER ALARM"), [("ENGINE", 3, 1.0), ("TRUCK", 1, 1.0), ("RESCUE", 1, 1.0), ("BATTALION", 1, 1.0)]),
+    ("FIRE", ("ALARM", "ODOR OF SMOKE", "APPLIANCE FIRE", "GAS LEAK", "HAZMAT", "HAZ MAT"), [("ENGINE", 1, 1.0), ("TRUCK", 1, 1.0)]),
+    ("FIRE", ("MVC", "ENTRAPMENT", "RESCUE", "COLLAPSE"), [("ENGINE", 1, 1.0), ("RESCUE", 1, 0.5), ("MEDIC", 1, 1.0)]),
+    ("FIRE", (), [("ENGINE", 1, 1.0)]),
+    ("EMS", ("CARDIAC ARREST", "CPR"), [("MEDIC", 1, 1.0), ("ENGINE", 1, 1.0)]),
+    ("EMS", ("ALS",), [("MEDIC", 1, 1.0)]),
+    ("EMS", (), [("AMBULANCE", 1, 1.0)]),
+    ("LAW", ("DOMESTIC", "ASSAULT", "DISORDERLY", "MENTAL HEALTH", "FIGHT", "WEAPON", "ROBBERY"), [("PATROL", 2, 1.0)]),
+    ("LAW", (), [("PATROL", 1, 1.0), ("PATROL", 1, 0.25)]),
+]
+
+# The gamma (shape, scale) and clip range in seconds of each unit time. The CAD generator draws every call's ack_time,
+# enroute_time and on_scene_time from these, and extra units on a call draw their own from the same ones.
+UNIT_TIME_DISTRIBUTIONS = {
+    "ack_time": (2.0, 30.0, 2, 40),
+    "enroute_time": (6.0, 70.0, 300, 900),
+    "on_scene_time": (3.0, 800.0, 300, 7200),
+}
+
+# The CAD time stamps that follow the first unit on a call, and so move with that unit's unit_delay
+FIRST_UNIT_COLUMNS = ["time_call_acknowledged", "time_unit_enroute", "time_call_closed"]
+
+# Columns of the unit response table that the output writer should treat specially
+UNIT_CATEGORICAL_COLUMNS = ["unit_id", "unit_type"]
+UNIT_DATETIME_COLUMNS = [
+    "time_unit_dispatched",
+    "time_unit_enroute",
+    "time_unit_on_scene",
+    "time_unit_cleared",
+]
+
+
+class UnitRoster:
+    """
+    This class is a fixed roster of response units, grouped by unit type.
+
+    Args:
+        units (dict, optional): Unit type to (agency, id prefix, first number, count). Defaults to DEFAULT_UNIT_ROSTER.
+    """
+
+    def __init__(self, units=None):
+        units = DEFAULT_UNIT_ROSTER if units is None else units
+        self.unit_types = list(units)
+        self.unit_ids = []
+        self.codes_by_type = []
+        for unit_type, (agency, prefix, first, count) in units.items():
+            if count <= 0:
+                raise ValueError(f"The roster needs at least one {unit_type} unit")
+            start = len(self.unit_ids)
+            self.unit_ids.extend(f"{prefix}{number}" for number in range(first, first + count))
+            self.codes_by_type.append(list(range(start, start + count)))
+
+    def __len__(self):
+        return len(self.unit_ids)
+
+
+def draw_unit_times(column, rng, size):
+    """
+    This function draws whole-second unit times from UNIT_TIME_DISTRIBUTIONS.
+
+    Args:
+        column (str): ack_time, enroute_time or on_scene_time.
+        rng (numpy.random.Generator): The random stream.
+        size (int): The number of times.
+
+    Returns:
+        numpy.ndarray: int64 times in seconds.
+    """
+    shape, scale, low, high = UNIT_TIME_DISTRIBUTIONS[column]
+    return np.clip(rng.gamma(shape, scale, size=size).astype(np.int64), low, high)
+
+
+def _plan_pattern(keywords):
+    """
+    Compile one regular expression that finds any of the keywords as a whole word, with an optional plural S or number.
+    """
+    return re.compile(r"\b(?:" + "|".join(re.escape(keyword) for keyword in keywords) + r")(?:S|\d+)?\b")
+
+
+def _plan_table(plans, agencies, problems, unit_types):
+    """
+    Resolve the response plan of every (agency, problem) pair and flatten the plans into one table of unit slots.
+
+    Returns:
+        tuple: (plan_of_pair, slot_start, slot_count, slot_type, slot_probability), where plan_of_pair has one plan
+        index per agency x problem pair and the slots of plan i are slot_start[i] to slot_start[i] + slot_count[i].
+    """
+    type_code = {unit_type: code for code, unit_type in enumerate(unit_types)}
+    plan_of_pair = np.zeros(len(agencies) * len(problems), dtype=np.int64)
+    used_plans = {}
+    patterns = [_plan_pattern(keywords) if keywords else None for _, keywords, _ in plans]
+    for agency_code, agency in enumerate(agencies):
+        for problem_code, problem in enumerate(problems):
+            for rule, (rule_agency, _, plan) in enumerate(plans):
+                if rule_agency == agency and (patterns[rule] is None or patterns[rule].search(problem)):
+                    plan_of_pair[agency_code * len(problems) + problem_code] = used_plans.setdefault(rule, len(used_plans))
+                    break
+            else:
+                raise ValueError(f"No response plan for a {agency} call of type {problem}")
+
+    slot_start, slot_count, slot_type, slot_probability = [], [], [], []
+    for rule in used_plans:
+        slots = [(type_code[unit_type], probability) for unit_type, count, probability in plans[rule][2] for _ in range(count)]
+        slot_start.append(len(slot_type))
+        slot_count.append(len(slots))
+        slot_type.extend(code for code, _ in slots)
+        slot_probability.extend(probability for _, probability in slots)
+    return (
+        plan_of_pair,
+        np.array(slot_start, dtype=np.int64),
+        np.array(slot_count, dtype=np.int64),
+        np.array(slot_type, dtype=np.int64),
+        np.array(slot_probability, dtype=float),
+    )
+
+
+class UnitResponder:
+    """
+    This class builds the unit response records for CAD calls: one row per unit sent to a call, linked to the call by
+    call_id. Units are chosen from a fixed roster, and each unit is busy from its dispatch until it clears the scene,
+    so a call waits when every unit of a type is out and no unit is ever on two calls at once.
+
+    The first unit on a call uses the call's own ack_time, enroute_time and on_scene_time. Extra units draw their own
+    times from the same distributions as the CAD table. When the first unit has to wait for a free unit, respond adds
+    its unit_delay to the call's time_call_acknowledged, time_unit_enroute, time_call_closed and total_time, so the
+    CAD row and the unit row give the same times.
+
+    Calls are pushed one chunk at a time in event_time order, and the unit pools carry over between chunks. Within a
+    chunk, units are requested in order of the call's dispatch time.
+
+    Args:
+        roster (UnitRoster, optional): The units. Defaults to UnitRoster().
+        rng (numpy.random.Generator, optional): The random stream for optional units and extra unit times.
+        plans (list, optional): The response plans. Defaults to RESPONSE_PLANS.
+    """
+
+    def __init__(self, roster=None, rng=None, plans=None):
+        self.roster = roster if roster is not None else UnitRoster()
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.plans = RESPONSE_PLANS if plans is None else plans
+        for _, _, plan in self.plans:
+            for unit_type, _, _ in plan:
+                if unit_type not in self.roster.unit_types:
+                    raise ValueError(f"The response plans use {unit_type} units, which are not on the roster")
+        self._pools = [[(np.iinfo(np.int64).min, code) for code in codes] for codes in self.roster.codes_by_type]
+        self._plan_cache = {}
+
+    def respond(self, df_full):
+        """
+        Build the unit response records for a chunk of calls. The calls whose first unit was delayed have their later
+        time stamps and total_time moved back by that delay in df_full.
+
+        Args:
+            df_full (pandas.DataFrame): CAD calls with call_id, agency, problem, the duration columns, total_time and
+                the event time stamps.
+
+        Returns:
+            pandas.DataFrame: One row per responding unit, ordered by call and then by unit_seq.
+        """
+        rng = self.rng
+        agency = df_full["agency"].astype("category")
+        problem = df_full["problem"].astype("category")
+        plan_of_pair, slot_start, slot_count, slot_type, slot_probability = self._plans_for(
+            list(agency.cat.categories), list(problem.cat.categories)
+        )
+
+        # Expand every call into the slots of its plan, then keep the optional slots that come up
+        pair = agency.cat.codes.to_numpy().astype(np.int64) * len(problem.cat.categories) + problem.cat.codes.to_numpy()
+        plan = plan_of_pair[pair]
+        counts = slot_count[plan]
+        first = np.cumsum(counts) - counts
+        call = np.repeat(np.arange(len(df_full)), counts)
+        slot = np.repeat(slot_start[plan] - first, counts) + np.arange(counts.sum())
+        sent = rng.random(len(slot)) < slot_probability[slot]
+        # The first slot of every plan is always sent, so each call with a plan gets at least one unit
+        sent[first[counts > 0]] = True
+        call = call[sent]
+        unit_type = slot_type[slot[sent]]
+
+        # Number the units on each call from 0
+        call_start = np.flatnonzero(np.r_[True, call[1:] != call[:-1]])
+        unit_seq = np.arange(len(call)) - np.repeat(call_start, np.diff(np.r_[call_start, len(call)]))
+
+        # The first unit takes the call's own times, the others draw theirs
+        is_first = unit_seq == 0
+
+        def unit_times(column, draws):
+            times = draws(len(call))
+            times[is_first] = df_full[column].to_numpy(dtype=np.int64)[call[is_first]]
+            return times
+
+        ack = unit_times("ack_time", lambda n: draw_unit_times("ack_time", rng, n))
+        travel = unit_times("enroute_time", lambda n: draw_unit_times("enroute_time", rng, n))
+        on_scene = unit_times("on_scene_time", lambda n: draw_unit_times("on_scene_time", rng, n))
+
+        # Request the units in order of the call's dispatch time, and wait for one to clear when none is free
+        requested = df_full["time_call_dispatched"].to_numpy().astype("datetime64[s]").view(np.int64)[call]
+        order = np.argsort(requested, kind="stable")
+        dispatched = np.empty(len(call), dtype=np.int64)
+        unit = np.empty(len(call), dtype=np.int32)
+        dispatched[order], unit[order] = serve_in_order(
+            requested[order], unit_type[order], (ack + travel + on_scene)[order], self._pools
+        )
+
+        # A call's own time stamps follow its first unit, so move them by that unit's wait
+        unit_delay = dispatched - requested
+        call_delay = np.zeros(len(df_full), dtype=np.int64)
+        call_delay[call[is_first]] = unit_delay[is_first]
+        if call_delay.any():
+            for column in FIRST_UNIT_COLUMNS:
+                df_full[column] = df_full[column] + pd.to_timedelta(call_delay, unit="s")
+            df_full["total_time"] = df_full["total_time"] + call_delay
+
+        enroute = dispatched + ack
+        arrived = enroute + travel
+        cleared = arrived + on_scene
+        return pd.DataFrame(
+            {
+                "call_id": df_full["call_id"].to_numpy()[call],
+                "unit_seq": (unit_seq + 1).astype(np.int8),
+                "unit_id": pd.Categorical.from_codes(unit, categories=self.roster.unit_ids),
+                "unit_type": pd.Categorical.from_codes(unit_type, categories=self.roster.unit_types),
+                "unit_delay": unit_delay,
+                "time_unit_dispatched": dispatched.view("datetime64[s]"),
+                "time_unit_enroute": enroute.view("datetime64[s]"),
+                "time_unit_on_scene": arrived.view("datetime64[s]"),
+                "time_unit_cleared": cleared.view("datetime64[s]"),
+            }
+        )
+
+    def _plans_for(self, agencies, problems):
+        """
+        The plan table only depends on the categories, so it is built once per distinct set.
+        """
+        key = (tuple(agencies), tuple(problems))
+        if key not in self._plan_cache:
+            self._plan_cache[key] = _plan_table(self.plans, agencies, problems, self.roster.unit_types)
+        return self._plan_cache[key]
+
+
+def generate_unit_responses(df_full, roster=None, seed=None, rng=None):
+    """
+    This function builds the unit response table for a whole CAD table, such as the output of generate_911_data. Calls
+    whose first unit had to wait have their time stamps moved in df_full to match.
+
+    Args:
+        df_full (pandas.DataFrame): The CAD calls.
+        roster (UnitRoster, optional): The units. Defaults to UnitRoster().
+        seed (int, optional): Makes the run reproducible.
+        rng (numpy.random.Generator, optional): An existing Generator to draw from instead of a seed.
+
+    Returns:
+        pandas.DataFrame: One row per responding unit, linked to the calls by call_id.
+    """
+    if seed is not None and rng is not None:
+        raise ValueError("Pass either seed or rng, not both")
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    return UnitResponder(roster, rng).respond(df_full)
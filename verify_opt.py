@@ -2,7 +2,7 @@ import sys
 import os
 import pandas as pd
 import numpy as np
-from opt_synth911gen import generate_911_data
+from opt_synth911gen import generate_911_data, iter_911_chunks
 
 def verify_output():
     print("Running generate_911_data...")
@@ -60,6 +60,45 @@ def verify_output():
     else:
         print("PASSED: No null values found.")
 
+    # Check chunked generation
+    chunks = list(iter_911_chunks(num_records=5000, chunk_size=1000))
+    df_chunks = pd.concat(chunks, ignore_index=True)
+    if len(df_chunks) != 5000:
+        print(f"FAILED: Chunked generation produced {len(df_chunks)} records, expected 5000.")
+    elif not df_chunks["event_time"].is_monotonic_increasing:
+        print("FAILED: event_time is not sorted across chunks.")
+    else:
+        print(f"PASSED: Chunked generation produced {len(chunks)} sorted chunks.")
+
+    # Check that a seeded run is identical no matter how many workers generate it
+    serial = pd.concat(iter_911_chunks(num_records=3000, chunk_size=1000, seed=42, workers=1), ignore_index=True)
+    parallel = pd.concat(iter_911_chunks(num_records=3000, chunk_size=1000, seed=42, workers=2), ignore_index=True)
+    if not serial.equals(parallel):
+        print("FAILED: Seeded output differs between 1 and 2 workers.")
+    else:
+        print("PASSED: Seeded output identical with 1 and 2 workers.")
+
+    # Check that call IDs are unique and well formed across chunk boundaries and agencies
+    df_ids = pd.concat(iter_911_chunks(num_records=3000, chunk_size=1000), ignore_index=True)
+    well_formed = df_ids["call_id"].str.fullmatch(r"\d{2}-[LMF]\d{6}")
+    if not df_ids["call_id"].is_unique:
+        print(f"FAILED: {df_ids['call_id'].duplicated().sum()} duplicate call IDs across chunks.")
+    elif not well_formed.all():
+        print(f"FAILED: Malformed call IDs: {df_ids.loc[~well_formed, 'call_id'].head().tolist()}")
+    else:
+        print(f"PASSED: {len(df_ids)} call IDs unique and well formed across chunks.")
+
+    # Check that an empty run returns an empty frame
+    try:
+        df_empty, _, _ = generate_911_data(num_records=0)
+    except Exception as e:
+        print(f"FAILED: Empty run raised: {e!r}")
+    else:
+        if len(df_empty) != 0 or "call_id" not in df_empty.columns:
+            print(f"FAILED: Empty run produced {len(df_empty)} records.")
+        else:
+            print("PASSED: Empty run produced an empty frame.")
+
     print("Verification complete.")
 
 if __name__ == "__main__":